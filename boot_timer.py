@@ -0,0 +1,51 @@
+# boot_timer.py - Per-phase boot timing and a small boot report
+# Import this first: the clock starts when the module is loaded, and every
+# mark() records how long it took to reach that phase.
+import time
+
+MAX_PHASES = 12
+REPORT_PATH = "boot.txt"
+
+
+class BootTimer:
+    def __init__(self, max_phases=MAX_PHASES):
+        self.start = time.ticks_us()
+        self.names = [None] * max_phases
+        self.stamps = [0] * max_phases # Microseconds since start
+        self.count = 0
+
+    def mark(self, name):
+        """Records that phase `name` has just finished; ignored once the table is full."""
+        if self.count < len(self.names):
+            self.names[self.count] = name
+            self.stamps[self.count] = time.ticks_diff(time.ticks_us(), self.start)
+            self.count += 1
+
+    def elapsed_ms(self, name):
+        """Milliseconds from start to phase `name`, or None if it has not been reached."""
+        for i in range(self.count):
+            if self.names[i] == name:
+                return self.stamps[i] // 1000
+        return None
+
+    def report(self):
+        lines = []
+        previous = 0
+        for i in range(self.count):
+            lines.append("%-18s %7.1f ms  (+%.1f ms)" % (
+                self.names[i], self.stamps[i] / 1000, (self.stamps[i] - previous) / 1000))
+            previous = self.stamps[i]
+        return "\n".join(lines)
+
+    def save(self, path=REPORT_PATH):
+        """Prints the report and writes it to flash, replacing the previous boot's."""
+        text = self.report()
+        print("Boot report:\n" + text)
+        try:
+            with open(path, "w") as f:
+                f.write(text + "\n")
+        except OSError as e:
+            print("Could not write boot report: %s" % e)
+
+
+boot = BootTimer()
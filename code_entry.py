@@ -0,0 +1,53 @@
+# code_entry.py - Keypad code entry in preallocated buffers
+# The typed digits, the status line ("Code: 123") and the LCD echo ("123_")
+# are bytearrays allocated once and updated in place, and the expected code is
+# compared digit by digit, so typing does not grow or rebuild strings. Only
+# the copies handed to the web side (message(), text()) are new objects: they
+# have to outlive the next key press.
+
+PREFIX = b"Code: "
+
+
+class CodeEntry:
+    def __init__(self, length=5):
+        self.length = length
+        self.count = 0
+        self._line = bytearray(PREFIX + bytes(length)) # Status line; the digits follow the prefix
+        self.display = bytearray(length + 1)          # LCD echo: the digits, then the "_" cursor
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        display = self.display
+        display[0] = 0x5F # '_'
+        for i in range(1, len(display)):
+            display[i] = 0x20
+
+    def add(self, key):
+        """Appends digit key (a one-character str); returns True once the code is complete."""
+        if self.count == self.length:
+            self.clear()
+        c = ord(key)
+        self._line[len(PREFIX) + self.count] = c
+        self.display[self.count] = c
+        self.count += 1
+        self.display[self.count] = 0x5F if self.count < self.length else 0x20
+        return self.count == self.length
+
+    def matches(self, code):
+        """True if the digits typed so far are exactly code (a str)."""
+        if len(code) != self.count:
+            return False
+        line = self._line
+        for i in range(self.count):
+            if line[len(PREFIX) + i] != ord(code[i]):
+                return False
+        return True
+
+    def message(self):
+        """The status line as a new str, e.g. "Code: 123"."""
+        return self._line[:len(PREFIX) + self.count].decode()
+
+    def text(self):
+        """The typed digits as a new str."""
+        return self._line[len(PREFIX):len(PREFIX) + self.count].decode()
@@ -0,0 +1,135 @@
+# dual_core.py - Runs the hardware jobs on the RP2040's second core
+# Core 1 runs a plain polling loop (RFID, keypad, relay, LCD) while core 0 runs
+# WiFi and the web server under asyncio. The two sides share nothing but
+# MessageQueue and LatestValues objects, each guarded by one _thread lock, held
+# only while a slot is copied in or out. A MessageQueue is a fixed-size ring of
+# events, which drops the oldest when full; LatestValues holds one slot per
+# state field, which a newer value overwrites, so state is never lost. On a PC,
+# CPython's own _thread module is used, so the same code runs as two OS threads.
+#
+# A pass that raises is logged and the loop carries on after a backoff
+# (runtime.restart_delay_ms), as supervised tasks do on core 0: an exception
+# must not leave the door without RFID, keypad and lock auto-close.
+import time
+import _thread
+from runtime import restart_delay_ms
+
+QUEUE_SIZE = 32
+
+_running = False
+failures = 0 # Passes of the second core's loop that raised
+
+
+class MessageQueue:
+    """
+    Fixed-size queue of (kind, value, extra) messages from one core to the other.
+    Slots are preallocated; when the reader falls behind, the oldest message is
+    dropped (and counted) so the writer never waits on the other core.
+    """
+    def __init__(self, size=QUEUE_SIZE):
+        self._kinds = [None] * size
+        self._values = [None] * size
+        self._extras = [None] * size
+        self._head = 0
+        self._count = 0
+        self._lock = _thread.allocate_lock()
+        self.dropped = 0
+
+    def put(self, kind, value=None, extra=None):
+        size = len(self._kinds)
+        with self._lock:
+            if self._count == size:
+                self._head = (self._head + 1) % size
+                self._count -= 1
+                self.dropped += 1
+            i = (self._head + self._count) % size
+            self._kinds[i] = kind
+            self._values[i] = value
+            self._extras[i] = extra
+            self._count += 1
+
+    def drain(self, handler):
+        """Calls handler(kind, value, extra) for every queued message, oldest first; returns the count."""
+        size = len(self._kinds)
+        handled = 0
+        while True:
+            with self._lock:
+                if not self._count:
+                    return handled
+                i = self._head
+                kind = self._kinds[i]
+                value = self._values[i]
+                extra = self._extras[i]
+                self._values[i] = None
+                self._extras[i] = None
+                self._head = (i + 1) % size
+                self._count -= 1
+            # The handler runs outside the lock, so the other core is never kept waiting on it.
+            handler(kind, value, extra)
+            handled += 1
+
+
+class LatestValues:
+    """
+    The latest value of each of a fixed set of names, passed from one core to
+    the other. A value not read yet is overwritten (and counted) rather than
+    queued behind, so however far the reader falls behind it ends up with
+    every name's current value.
+    """
+    def __init__(self, names):
+        self._names = tuple(names)
+        self._values = [None] * len(self._names)
+        self._changed = [False] * len(self._names)
+        self._lock = _thread.allocate_lock()
+        self.coalesced = 0
+
+    def put(self, name, value):
+        i = self._names.index(name)
+        with self._lock:
+            if self._changed[i]:
+                self.coalesced += 1
+            self._values[i] = value
+            self._changed[i] = True
+
+    def drain(self, handler):
+        """Calls handler(name, value) for every name put since the last drain; returns the count."""
+        handled = 0
+        for i in range(len(self._names)):
+            with self._lock:
+                if not self._changed[i]:
+                    continue
+                value = self._values[i]
+                self._changed[i] = False
+            handler(self._names[i], value)
+            handled += 1
+        return handled
+
+
+def _loop(func, period_ms):
+    global failures
+    in_a_row = 0
+    while _running:
+        try:
+            func()
+            in_a_row = 0
+        except Exception as e:
+            failures += 1
+            in_a_row += 1
+            delay = restart_delay_ms(in_a_row)
+            print("Core 1 loop failed (%r); retrying in %d ms" % (e, delay))
+            time.sleep_ms(delay)
+            continue
+        time.sleep_ms(period_ms)
+
+
+def start(func, period_ms):
+    """Calls func() every period_ms on the second core until stop() is called."""
+    global _running
+    _running = True
+    _thread.start_new_thread(_loop, (func, period_ms))
+
+
+def stop():
+    """Ends the second core's loop after its current pass (core 1 keeps running across a soft reset otherwise)."""
+    global _running
+    _running = False
@@ -0,0 +1,203 @@
+# event_log.py - Structured access event log with batched flash writes
+# Events are packed into fixed-size records in a RAM ring buffer; record()
+# never touches the filesystem. maybe_flush() (run from its own task) appends
+# whole batches to rotating segment files, so flash sees one write per batch
+# instead of one per event.
+#
+# Record (20 bytes): seq (u32), unix time (u32), event type (u8, door number
+#                    in the high 4 bits), UID length (u8), UID (10 bytes, zero padded)
+import os
+import struct
+import time
+from tag_db import unix_time
+
+# --- Event types ---
+TAG_AUTHORIZED = 1
+TAG_UNAUTHORIZED = 2
+CODE_CORRECT = 3
+CODE_WRONG = 4
+LOCK_OPEN = 5
+LOCK_CLOSE = 6
+
+EVENT_NAMES = ('', 'tag_authorized', 'tag_unauthorized', 'code_correct', 'code_wrong', 'lock_open', 'lock_close')
+
+DOOR_SHIFT = 4 # Event type byte: door number << DOOR_SHIFT | event
+
+RECORD_FORMAT = '<IIBB'
+RECORD_SIZE = 20
+UID_OFFSET = 10
+MAX_UID_LEN = 10
+
+# --- Flush policy: larger batches and longer intervals mean fewer flash writes ---
+RING_SIZE = 64            # Events buffered in RAM
+FLUSH_BATCH = 16          # Flush as soon as this many events are waiting...
+FLUSH_INTERVAL_MS = 30000 # ...or when the oldest waiting event is this old
+SEGMENT_RECORDS = 512     # Records per segment file (10 KB)
+MAX_SEGMENTS = 8          # Oldest segment is deleted beyond this
+
+# --- /api/events ---
+PAGE_SIZE = 50
+
+
+def door_event(event, door):
+    """The event type byte for event at door number door (0-15); door 0 leaves it unchanged."""
+    return event | door << DOOR_SHIFT
+
+
+class EventLog:
+    def __init__(self, directory='log', ring_size=RING_SIZE, flush_batch=FLUSH_BATCH,
+                 flush_interval_ms=FLUSH_INTERVAL_MS, segment_records=SEGMENT_RECORDS,
+                 max_segments=MAX_SEGMENTS):
+        self.directory = directory
+        self.flush_batch = flush_batch
+        self.flush_interval_ms = flush_interval_ms
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self._ring = bytearray(ring_size * RECORD_SIZE)
+        self._ring_view = memoryview(self._ring)
+        self._capacity = ring_size
+        self._head = 0    # Oldest unflushed record
+        self._pending = 0 # Unflushed records
+        self._oldest_ms = 0
+        self._record = bytearray(RECORD_SIZE)
+        self.seq = 0
+        self.dropped = 0
+        self.flushes = 0
+        try:
+            os.mkdir(directory)
+        except OSError:
+            pass # Already exists
+        self._segments = self._list_segments()
+        self._segment_count = 0 # Records in the newest segment
+        if self._segments:
+            last = self._segment_path(self._segments[-1])
+            self._segment_count = os.stat(last)[6] // RECORD_SIZE
+            if self._segment_count:
+                with open(last, 'rb') as f:
+                    f.seek((self._segment_count - 1) * RECORD_SIZE)
+                    f.readinto(self._record)
+                self.seq = struct.unpack_from('<I', self._record, 0)[0]
+
+    def _list_segments(self):
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith('ev') and name.endswith('.bin'):
+                numbers.append(int(name[2:-4]))
+        numbers.sort()
+        return numbers
+
+    def _segment_path(self, number):
+        return '%s/ev%05d.bin' % (self.directory, number)
+
+    def record(self, event, uid=None):
+        """Adds an event to the RAM ring; never blocks on flash."""
+        capacity = self._capacity
+        if self._pending == capacity:
+            # Flushing has fallen behind: the oldest unflushed event is lost.
+            self._head = (self._head + 1) % capacity
+            self._pending -= 1
+            self.dropped += 1
+        if not self._pending:
+            self._oldest_ms = time.ticks_ms()
+        self.seq += 1
+        offset = ((self._head + self._pending) % capacity) * RECORD_SIZE
+        ring = self._ring
+        n = len(uid) if uid else 0
+        if n > MAX_UID_LEN:
+            n = MAX_UID_LEN
+        struct.pack_into(RECORD_FORMAT, ring, offset, self.seq, unix_time(), event, n)
+        for i in range(MAX_UID_LEN):
+            ring[offset + UID_OFFSET + i] = uid[i] if i < n else 0
+        self._pending += 1
+
+    def maybe_flush(self):
+        """Flushes when the batch is full or the oldest event has waited long enough."""
+        if self._pending and (self._pending >= self.flush_batch or
+                              time.ticks_diff(time.ticks_ms(), self._oldest_ms) >= self.flush_interval_ms):
+            self.flush()
+
+    def flush(self):
+        """Appends every unflushed event to the segment files."""
+        while self._pending:
+            if not self._segments or self._segment_count >= self.segment_records:
+                self._rotate()
+            # Contiguous run: bounded by the ring end and the space left in the segment.
+            count = min(self._pending, self._capacity - self._head,
+                        self.segment_records - self._segment_count)
+            start = self._head * RECORD_SIZE
+            with open(self._segment_path(self._segments[-1]), 'ab') as f:
+                f.write(self._ring_view[start:start + count * RECORD_SIZE])
+            self._segment_count += count
+            self._head = (self._head + count) % self._capacity
+            self._pending -= count
+        self.flushes += 1
+
+    def _rotate(self):
+        number = self._segments[-1] + 1 if self._segments else 0
+        self._segments.append(number)
+        self._segment_count = 0
+        while len(self._segments) > self.max_segments:
+            os.remove(self._segment_path(self._segments.pop(0)))
+
+    def query(self, since, limit, emit):
+        """
+        Calls emit(record) for up to limit events with seq > since, oldest first.
+        record is a reused buffer; unpack it before the next call. Returns the count.
+        """
+        sent = 0
+        record = self._record
+        for number in self._segments:
+            if sent >= limit:
+                return sent
+            try:
+                f = open(self._segment_path(number), 'rb')
+            except OSError:
+                continue
+            with f:
+                # Skip whole segments that end at or before `since`.
+                size = f.seek(0, 2)
+                if size < RECORD_SIZE:
+                    continue
+                f.seek(size - RECORD_SIZE)
+                f.readinto(record)
+                if struct.unpack_from('<I', record, 0)[0] <= since:
+                    continue
+                f.seek(0)
+                while sent < limit and f.readinto(record) == RECORD_SIZE:
+                    if struct.unpack_from('<I', record, 0)[0] > since:
+                        emit(record)
+                        sent += 1
+        for i in range(self._pending):
+            if sent >= limit:
+                break
+            offset = ((self._head + i) % self._capacity) * RECORD_SIZE
+            record[:] = self._ring_view[offset:offset + RECORD_SIZE]
+            if struct.unpack_from('<I', record, 0)[0] > since:
+                emit(record)
+                sent += 1
+        return sent
+
+    def respond(self, conn, request):
+        """
+        Serves /api/events?since=<seq>&limit=<n> as JSON, written one event at a time.
+        The length is not known up front, so the connection is closed afterwards (returns False).
+        """
+        since = request.query_int(b'since', 0)
+        limit = min(request.query_int(b'limit', PAGE_SIZE), PAGE_SIZE)
+        conn.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nCache-Control: no-cache\r\n'
+                   b'Connection: close\r\n\r\n{"events":[')
+        last = [since]
+
+        def emit(record):
+            seq, stamp, event, n = struct.unpack_from(RECORD_FORMAT, record, 0)
+            uid = ':'.join('%02x' % record[UID_OFFSET + i] for i in range(n))
+            door = event >> DOOR_SHIFT
+            event &= (1 << DOOR_SHIFT) - 1
+            name = EVENT_NAMES[event] if event < len(EVENT_NAMES) else str(event)
+            conn.write(b'%s{"seq":%d,"time":%d,"type":"%s","door":%d,"uid":"%s"}' % (
+                b',' if last[0] != since else b'', seq, stamp, name.encode(), door, uid.encode()))
+            last[0] = seq
+
+        self.query(since, limit, emit)
+        conn.write(b'],"next":%d,"latest":%d}' % (last[0], self.seq))
+        return False
@@ -0,0 +1,91 @@
+# event_stream.py - Server-Sent Events (SSE) push channel for live status updates
+# publish() formats each event once and hands the same bytes object to every
+# subscriber. Each subscriber owns a small fixed-size queue; when a slow client
+# falls behind, its oldest events are dropped instead of growing the heap.
+from runtime import asyncio
+
+MAX_SUBSCRIBERS = 3
+QUEUE_SIZE = 8
+KEEPALIVE_MS = 15000
+
+SSE_HEADER = (b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n'
+              b'Cache-Control: no-cache\r\nConnection: close\r\n\r\n')
+BUSY_RESPONSE = (b'HTTP/1.1 503 Service Unavailable\r\nRetry-After: 10\r\n'
+                 b'Content-Length: 0\r\nConnection: close\r\n\r\n')
+KEEPALIVE = b': keepalive\n\n'
+
+
+class Subscriber:
+    """Bounded queue of formatted events for one connected client."""
+    def __init__(self, size=QUEUE_SIZE):
+        self.queue = [None] * size
+        self.head = 0
+        self.count = 0
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def put(self, message):
+        size = len(self.queue)
+        if self.count == size:
+            # Drop-oldest backpressure: overwrite the head slot.
+            self.head = (self.head + 1) % size
+            self.count -= 1
+            self.dropped += 1
+        self.queue[(self.head + self.count) % size] = message
+        self.count += 1
+        self.ready.set()
+
+    def get(self):
+        """Returns the oldest queued event, or None if the queue is empty."""
+        if self.count == 0:
+            return None
+        message = self.queue[self.head]
+        self.queue[self.head] = None
+        self.head = (self.head + 1) % len(self.queue)
+        self.count -= 1
+        return message
+
+
+class EventBus:
+    def __init__(self, max_subscribers=MAX_SUBSCRIBERS, queue_size=QUEUE_SIZE):
+        self.subscribers = []
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+
+    def publish(self, event, data):
+        """Queues an event for every subscriber; cheap no-op when nobody is listening."""
+        if not self.subscribers:
+            return
+        message = b'event: %s\ndata: %s\n\n' % (event.encode(), str(data).encode())
+        for sub in self.subscribers:
+            sub.put(message)
+
+    async def serve(self, writer):
+        """Streams events to one client until it disconnects; the connection is never reused."""
+        if len(self.subscribers) >= self.max_subscribers:
+            writer.write(BUSY_RESPONSE)
+            return False
+        sub = Subscriber(self.queue_size)
+        self.subscribers.append(sub)
+        try:
+            writer.write(SSE_HEADER)
+            await writer.drain()
+            while True:
+                try:
+                    await asyncio.wait_for(sub.ready.wait(), KEEPALIVE_MS / 1000)
+                except asyncio.TimeoutError:
+                    # Idle streams still send a comment now and then so dead clients are noticed.
+                    writer.write(KEEPALIVE)
+                    await writer.drain()
+                    continue
+                sub.ready.clear()
+                message = sub.get()
+                while message is not None:
+                    writer.write(message)
+                    message = sub.get()
+                await writer.drain()
+        except OSError:
+            pass
+        finally:
+            self.subscribers.remove(sub)
+        return False
@@ -0,0 +1,120 @@
+# heap_monitor.py - Garbage collection in idle windows, plus heap telemetry
+# MicroPython collects whenever an allocation finds the heap full, which can
+# be in the middle of a relay timing window. HeapMonitor collects on purpose
+# while the door is idle, and raises gc.threshold() so the automatic
+# collection only runs if allocations since the last one reach a large share
+# of the free heap. Each collection is timed. The largest free block is
+# probed right after an idle collection and reported from that cache, so
+# reading /api/memory never allocates to measure it. The probe briefly takes
+# nearly all of the free heap, so it is turned off (probe=False) when the
+# other core is allocating at the same time.
+#
+# On CPython (host/) there are no heap figures; they are reported as null.
+import gc
+import time
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+IDLE_COLLECT_INTERVAL_MS = 5000 # At most one planned collection this often...
+IDLE_COLLECT_MIN_BYTES = 4096   # ...and only once this much has been allocated since the last
+AUTO_COLLECT_FRACTION = 2       # Automatic GC once 1/N of the free heap has been allocated
+LARGEST_BLOCK_STEP = 256        # Resolution of largest_free_block()
+
+
+def _heap(name):
+    func = getattr(gc, name, None)
+    return func() if func else None
+
+
+class HeapMonitor:
+    """
+    Planned collections and heap figures. With probe=False the largest free
+    block is never measured and reported as None.
+    """
+    def __init__(self, interval_ms=IDLE_COLLECT_INTERVAL_MS, probe=True):
+        self.interval_ms = interval_ms
+        self.probe = probe
+        self.collections = 0
+        self.last_pause_us = 0
+        self.max_pause_us = 0
+        self.total_pause_us = 0
+        self._last = time.ticks_ms()
+        self._allocated = 0 # mem_alloc() right after the last collection
+        self.largest_block = None # largest_free_block() after the last idle collection
+
+    def collect(self):
+        """Runs a full collection now and records how long it took."""
+        start = time.ticks_us()
+        gc.collect()
+        pause = time.ticks_diff(time.ticks_us(), start)
+        self._last = time.ticks_ms()
+        self.collections += 1
+        self.last_pause_us = pause
+        self.total_pause_us += pause
+        if pause > self.max_pause_us:
+            self.max_pause_us = pause
+        self._allocated = _heap('mem_alloc') or 0
+        free = _heap('mem_free')
+        if free is not None and hasattr(gc, 'threshold'):
+            gc.threshold(free // AUTO_COLLECT_FRACTION)
+
+    def collect_if_idle(self, idle):
+        """Collects when idle is true, the last collection is at least interval_ms old and there is garbage to find."""
+        if not idle or time.ticks_diff(time.ticks_ms(), self._last) < self.interval_ms:
+            return
+        allocated = _heap('mem_alloc')
+        if allocated is not None and allocated - self._allocated < IDLE_COLLECT_MIN_BYTES:
+            if self.probe and self.largest_block is None:
+                self.largest_block = self.largest_free_block() # Nothing to collect, but still no figure
+            return
+        self.collect()
+        if self.probe:
+            self.largest_block = self.largest_free_block()
+
+    def free(self):
+        return _heap('mem_free')
+
+    def allocated(self):
+        return _heap('mem_alloc')
+
+    def largest_free_block(self):
+        """
+        Largest single allocation that currently succeeds, found by trying
+        bytearrays of decreasing size. Slow and it allocates: only called from
+        collect_if_idle(); reports use largest_block.
+        """
+        free = _heap('mem_free')
+        if free is None:
+            return None
+        lo = 0
+        hi = free // LARGEST_BLOCK_STEP
+        while lo < hi:
+            mid = (lo + hi + 1) >> 1
+            try:
+                block = bytearray(mid * LARGEST_BLOCK_STEP)
+                del block
+                lo = mid
+            except MemoryError:
+                hi = mid - 1
+        return lo * LARGEST_BLOCK_STEP
+
+    def stats(self):
+        return {
+            "free": self.free(),
+            "allocated": self.allocated(),
+            "largest_free_block": self.largest_block,
+            "gc_count": self.collections,
+            "gc_last_us": self.last_pause_us,
+            "gc_max_us": self.max_pause_us,
+            "gc_total_us": self.total_pause_us,
+        }
+
+    def respond(self, conn, request):
+        """Writes GET /api/memory as JSON; returns True (the response has a Content-Length)."""
+        body = json.dumps(self.stats()).encode()
+        conn.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nCache-Control: no-store\r\n'
+                   b'Content-Length: %d\r\n\r\n' % len(body))
+        conn.write(body)
+        return True
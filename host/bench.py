@@ -0,0 +1,1218 @@
+# bench.py - Host-side benchmarks for the lock firmware
+# Usage: python host/bench.py [name ...]   (no names runs every benchmark)
+import sys
+import time
+import tracemalloc
+
+import hostenv
+
+hostenv.install()
+
+
+class ByteSink:
+    """Connection stand-in that counts what is written to it."""
+    def __init__(self):
+        self.bytes = 0
+        self.writes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+        self.writes += 1
+
+    send = write
+
+
+def measure(func, rounds):
+    """Returns (microseconds per call, peak heap bytes during one call) for func()."""
+    func()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    func()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return (elapsed / rounds * 1e6, peak)
+
+
+def report(label, result):
+    print("  %-28s %9.2f us/call %8d peak heap bytes" % ((label,) + result))
+
+
+# --- Status page rendering ---
+
+def legacy_serve_web_page(conn, ssid, ap_mac_formatted, ip_address, rssi, display_random_number, lock_status_message):
+    # serve_web_page() as it was before status_page.py: one big concatenated str per request.
+    html = """<!DOCTYPE html>
+<html>
+<head>
+    <title>Pico W Network & Lock Control</title>
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; background-color: #f0f0f0; color: #333; }
+        .container { background-color: #fff; padding: 20px; border-radius: 8px; box-shadow: 0 0 10px rgba(0,0,0,0.1); }
+        h1 { color: #0056b3; }
+        .network-details { font-size: 1.2em; line-height: 1.6; }
+        .random-number {
+            font-size: 4em;
+            font-weight: bold;
+            color: #d9534f;
+            text-align: center;
+            margin-top: 30px;
+            margin-bottom: 20px;
+        }
+        .label { font-weight: bold; }
+        .lock-status {
+            font-size: 1.5em;
+            font-weight: bold;
+            margin-top: 20px;
+            padding: 10px;
+            border: 2px solid;
+            border-radius: 5px;
+            text-align: center;
+        }
+        .lock-open { background-color: #d4edda; border-color: #28a745; color: #155724; }
+        .lock-closed { background-color: #f8d7da; border-color: #dc3545; color: #721c24; }
+        .lock-info { background-color: #ffeeba; border-color: #ffc107; color: #856404; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Raspberry Pi Pico W Security System</h1>
+
+        <h2>Network Status</h2>
+        <p class="network-details"><span class="label">Connected to:</span> """ + ssid + """</p>
+        <p class="network-details"><span class="label">AP MAC (BSSID):</span> """ + ap_mac_formatted + """</p>
+        <p class="network-details"><span class="label">IP Address:</span> """ + ip_address + """</p>
+        <p class="network-details"><span class="label">Signal Strength:</span> """ + str(rssi) + """ dBm</p>
+
+        <h2>Current Code for Entry</h2>
+        <div class="random-number">
+            """ + display_random_number + """
+        </div>
+        <p style="text-align: center; font-size: 0.9em; color: #666;">(This code changes upon RFID scan or page refresh. Enter it on the keypad after a valid RFID scan.)</p>
+
+        <h2>Lock Status</h2>
+        <div class="lock-status """ + ("lock-open" if "OPEN" in lock_status_message else ("lock-closed" if "Unauthorized" in lock_status_message else "lock-info")) + """">
+            """ + lock_status_message + """
+        </div>
+    </div>
+</body>
+</html>"""
+    response = "HTTP/1.0 200 OK\r\nContent-type: text/html\r\n\r\n" + html
+    conn.send(response.encode())
+
+
+def bench_page(rounds=20000):
+    import status_page
+
+    fields = ('Wifi', '3e:da:3d:76:c9:c8', '192.168.1.100', -55, '48213', 'Awaiting RFID/Keypad input...')
+    sink = ByteSink()
+
+    def legacy():
+        legacy_serve_web_page(sink, *fields)
+
+    def template():
+        status_page.STATUS_PAGE.render(sink, style=b'/static/style.css?v=0', script=b'/static/app.js?v=0',
+            ssid=fields[0], bssid=fields[1], ip=fields[2], rssi=fields[3], code=fields[4],
+            status_class=status_page.status_class('info'), status=fields[5])
+
+    print("Status page render (%d static bytes, %d slots):" % (status_page.STATUS_PAGE.static_size, len(status_page.STATUS_PAGE.slots)))
+    report("concatenated str", measure(legacy, rounds))
+    report("PageTemplate.render", measure(template, rounds))
+
+
+# Effective throughput of a weak WiFi link, used to turn bytes into transfer time.
+SLOW_LINK_BYTES_PER_S = 20000
+
+
+def bench_assets(requests=300):
+    import asyncio
+    import http_router
+    import sim
+    import status_page
+    import contextlib
+    import io
+
+    fields = ('Wifi', '3e:da:3d:76:c9:c8', '192.168.1.100', -55, '48213', 'Awaiting RFID/Keypad input...')
+    inline = ByteSink()
+    legacy_serve_web_page(inline, *fields)
+
+    gzip = http_router.Request(None)
+    gzip.headers[b'accept-encoding'] = b'gzip, deflate'
+    plain = http_router.Request(None)
+
+    def asset_bytes(asset, request):
+        sink = ByteSink()
+        sink.drain = lambda: asyncio.sleep(0)
+        asyncio.run(asset.respond(request, sink))
+        return sink.bytes
+
+    chatter = io.StringIO()
+    with contextlib.redirect_stdout(chatter):
+        s = sim.Simulator('main.py')
+    try:
+        page = len(s.get(s.fw.serve_web_page))
+        fw = s.fw
+        assets = (status_page.STYLE, status_page.SCRIPT)
+        first_gzip = page + sum(asset_bytes(a, gzip) for a in assets)
+        first_plain = page + sum(asset_bytes(a, plain) for a in assets)
+        with contextlib.redirect_stdout(chatter):
+            results = asyncio.run(serve_and_load(fw.router, ((b'/', requests, True), (status_page.STYLE.url, requests, True))))
+    finally:
+        s.close()
+
+    def row(label, size, fetches):
+        print("  %-34s %6d bytes %7.1f ms at %d kB/s, %d request%s" % (
+            label, size, size * 1000 / SLOW_LINK_BYTES_PER_S, SLOW_LINK_BYTES_PER_S // 1000, fetches, "" if fetches == 1 else "s"))
+
+    print("Status page bytes per visit (inline CSS/JS vs. cached static assets):")
+    row("inline page (original firmware)", inline.bytes, 1)
+    row("first visit, gzip assets", first_gzip, 3)
+    row("first visit, uncompressed assets", first_plain, 3)
+    row("later visits (assets cached)", page, 1)
+    print("  %-34s %6.0f req/s" % ("GET / keep-alive (loopback)", results[0][0]))
+    print("  %-34s %6.0f req/s" % ("GET /static/style.css (loopback)", results[1][0]))
+
+
+# --- /api/status polling ---
+
+def bench_api(rounds=20000):
+    import http_router
+    import status_api
+    import status_page
+
+    values = ('Wifi', '3e:da:3d:76:c9:c8', '192.168.1.100', -55, 'closed', 'Awaiting RFID/Keypad input...', '', 0)
+    api = status_api.StatusApi()
+    api.update(values)
+    cold = http_router.Request(None)
+    warm = http_router.Request(None)
+    warm.headers[b'if-none-match'] = api.etag
+
+    def page(sink):
+        status_page.STATUS_PAGE.render(sink, style=b'/static/style.css?v=0', script=b'/static/app.js?v=0', ssid=values[0], bssid=values[1], ip=values[2], rssi=values[3],
+            code='48213', status_class='lock-info', status=values[5])
+
+    print("Status polling (bytes on the wire per poll):")
+    for label, func in (("full HTML page", page),
+                        ("/api/status 200", lambda sink: api.respond(sink, cold, values)),
+                        ("/api/status 304", lambda sink: api.respond(sink, warm, values))):
+        sink = ByteSink()
+        func(sink)
+        result = measure(lambda: func(ByteSink()), rounds)
+        print("  %-28s %9.2f us/call %8d bytes" % (label, result[0], sink.bytes))
+
+
+# --- HTTP keep-alive ---
+
+async def _fetch(reader, writer, path, close):
+    """Sends one GET and reads the response; returns False if the server had closed the connection."""
+    writer.write(b'GET %s HTTP/1.1\r\nHost: pico\r\nUser-Agent: bench\r\nAccept: */*\r\n%s\r\n' % (
+        path, b'Connection: close\r\n' if close else b''))
+    length = 0
+    while True:
+        line = await reader.readline()
+        if not line:
+            return False
+        if line == b'\r\n':
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line[15:])
+    await reader.readexactly(length)
+    return True
+
+
+async def http_load(port, path, requests, keep_alive):
+    """One client sending requests GETs for path; returns (requests per second, TCP connections used)."""
+    import asyncio
+
+    start = time.perf_counter()
+    connections = 0
+    done = 0
+    reader = writer = None
+    while done < requests:
+        if writer is None:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            connections += 1
+        if await _fetch(reader, writer, path, not keep_alive):
+            done += 1
+        if not keep_alive or reader.at_eof():
+            writer.close()
+            await writer.wait_closed()
+            writer = None
+    if writer:
+        writer.close()
+        await writer.wait_closed()
+    return (requests / (time.perf_counter() - start), connections)
+
+
+async def serve_and_load(router, jobs):
+    """Serves router on a loopback port and runs http_load(port, *job) for each job; returns the results."""
+    import asyncio
+
+    server = await asyncio.start_server(router.serve_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    results = []
+    for job in jobs:
+        results.append(await http_load(port, *job))
+    await asyncio.sleep(0.1) # Let the server notice the last client has gone
+    server.close()
+    await server.wait_closed()
+    return results
+
+
+def bench_http(requests=500):
+    import asyncio
+    import http_router
+    import status_api
+
+    values = ('Wifi', '3e:da:3d:76:c9:c8', '192.168.1.100', -55, 'closed', 'Awaiting RFID/Keypad input...', '', 0)
+    api = status_api.StatusApi()
+
+    async def status(request, writer):
+        return api.respond(writer, request, values)
+
+    router = http_router.Router()
+    router.route(b'/api/status', status)
+
+    print("HTTP /api/status over loopback (%d requests, one client):" % requests)
+    modes = (("connection per request", False), ("keep-alive", True))
+    results = asyncio.run(serve_and_load(router, [(b'/api/status', requests, keep_alive) for _, keep_alive in modes]))
+    for (label, _), (rate, connections) in zip(modes, results):
+        print("  %-28s %9.0f req/s %6d TCP connections" % (label, rate, connections))
+
+
+# --- Dual-core split ---
+
+def bench_dualcore(seconds=2.0, load_ms=30):
+    import asyncio
+    import dual_core
+    import runtime
+
+    class Deadline:
+        """A lock-close deadline that re-arms itself; records how late each one was noticed."""
+        def __init__(self):
+            self.lateness = []
+            self.due = time.ticks_add(time.ticks_ms(), 50)
+
+        def check(self):
+            late = time.ticks_diff(time.ticks_ms(), self.due)
+            if late >= 0:
+                self.lateness.append(late)
+                self.due = time.ticks_add(time.ticks_ms(), 50)
+
+    async def network_load():
+        # Page renders and socket writes that do not yield; time.sleep() stands in
+        # for the CPU time so the CPython thread can run meanwhile, like core 1 would.
+        while True:
+            time.sleep(load_ms / 1000)
+            await runtime.sleep_ms(1)
+
+    async def run(deadline, dual):
+        tasks = [asyncio.ensure_future(network_load())]
+        if dual:
+            dual_core.start(deadline.check, 5)
+        else:
+            tasks.append(asyncio.ensure_future(runtime.every(20, deadline.check)))
+        await asyncio.sleep(seconds)
+        dual_core.stop()
+        for task in tasks:
+            task.cancel()
+
+    print("Lock deadline lateness with %d ms blocking network work per request:" % load_ms)
+    for label, dual in (("one core (asyncio task)", False), ("core 1 loop", True)):
+        deadline = Deadline()
+        asyncio.run(run(deadline, dual))
+        time.sleep(0.05)
+        late = sorted(deadline.lateness)
+        print("  %-28s %6.1f ms median %6d ms worst" % (label, late[len(late) // 2], late[-1]))
+
+    queue = dual_core.MessageQueue()
+    count = 20000
+    start = time.perf_counter()
+    for i in range(count):
+        queue.put("status", i)
+        if i % 16 == 15:
+            queue.drain(lambda kind, value, extra: None)
+    queue.drain(lambda kind, value, extra: None)
+    print("  %-28s %9.0f messages/s %6d dropped" % ("MessageQueue put+drain", count / (time.perf_counter() - start), queue.dropped))
+
+
+# --- LCD bus throughput ---
+
+# Rough cost of one call on MicroPython/RP2040 at 125 MHz, used to turn
+# counted bus operations into simulated time.
+PIN_WRITE_US = 1.5
+MEM32_WRITE_US = 2.0
+
+
+def bench_lcd(screens=200):
+    import machine
+    import lcd_transport
+    from lcd_api import LcdApi
+
+    class LegacyTransport(lcd_transport.PinTransport):
+        # Timings of LcdApi before lcd_transport.py: 100 us after every nibble, 50 us RS setup.
+        def write_nibble(self, nibble):
+            self._set_data(nibble)
+            self.e_pin.value(0)
+            time.sleep_us(1)
+            self.e_pin.value(1)
+            time.sleep_us(1)
+            self.e_pin.value(0)
+            time.sleep_us(100)
+
+        def write_byte(self, value, rs):
+            self.rs_pin.value(rs)
+            time.sleep_us(50)
+            self.write_nibble(value >> 4)
+            self.write_nibble(value & 0x0F)
+
+    slept = [0]
+    real_sleep_us, real_sleep_ms = time.sleep_us, time.sleep_ms
+    time.sleep_us = lambda us: slept.__setitem__(0, slept[0] + us)
+    time.sleep_ms = lambda ms: slept.__setitem__(0, slept[0] + ms * 1000)
+    lines = ("0123456789ABCDEF", "FEDCBA9876543210")
+    print("LCD throughput (simulated pins, %d full 16x2 screens):" % screens)
+    try:
+        for label, transport, rw_pin in (("legacy Pin timings", LegacyTransport, None),
+                                         ("PinTransport", lcd_transport.PinTransport, None),
+                                         ("busy flag (never busy)", lcd_transport.PinTransport, 10),
+                                         ("PortTransport", lcd_transport.PortTransport, None)):
+            lcd = LcdApi(0, 1, 6, 7, 8, 9, transport=transport, rw_pin=rw_pin, busy_flag=rw_pin is not None)
+            slept[0] = 0
+            pin_writes, mem_writes = machine.Pin.writes, machine.mem32.writes
+            for _ in range(screens):
+                for row in range(2):
+                    lcd.set_cursor(0, row)
+                    lcd.message(lines[row])
+            bus_us = ((machine.Pin.writes - pin_writes) * PIN_WRITE_US +
+                      (machine.mem32.writes - mem_writes) * MEM32_WRITE_US)
+            total_s = (slept[0] + bus_us) / 1e6
+            print("  %-28s %9.0f chars/s" % (label, screens * 32 / total_s))
+    finally:
+        time.sleep_us, time.sleep_ms = real_sleep_us, real_sleep_ms
+
+
+# --- Authorized tag lookup ---
+
+def bench_tags(rounds=2000):
+    import random
+    import tag_store
+
+    rng = random.Random(1)
+    print("Tag lookup (7-byte UIDs, half hits / half misses):")
+    for count in (10, 1000, 10000):
+        uids = [[rng.getrandbits(8) for _ in range(7)] for _ in range(count)]
+        probes = [rng.choice(uids) if i % 2 else [rng.getrandbits(8) for _ in range(7)] for i in range(64)]
+        tracemalloc.start()
+        as_list = [list(uid) for uid in uids]
+        list_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracemalloc.start()
+        index = tag_store.TagIndex(uids)
+        index_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        n = max(1, rounds * 10 // count)
+        for label, table, size in (("list of lists", as_list, list_bytes), ("TagIndex", index, index_bytes)):
+            start = time.perf_counter()
+            for _ in range(n):
+                for uid in probes:
+                    uid in table
+            per_lookup = (time.perf_counter() - start) / (n * len(probes)) * 1e6
+            print("  %6d tags %-16s %10.2f us/lookup %9d bytes" % (count, label, per_lookup, size))
+
+
+# --- Flash tag database lookup ---
+
+def bench_tagdb(lookups=2000):
+    import os
+    import random
+    import tempfile
+    import tag_db
+
+    rng = random.Random(2)
+    print("Flash tag database (seek/readinto binary search):")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (10, 1000, 10000):
+            uids = [bytes(rng.getrandbits(8) for _ in range(7)) for _ in range(count)]
+            path = os.path.join(tmp, 'tags%d.db' % count)
+            tag_db.write_database(path, (tag_db.pack_record(uid, 'badge %d' % i) for i, uid in enumerate(uids)))
+            db = tag_db.TagDatabase(path)
+            misses = sum(1 for uid in uids[:200] if uid not in db)
+            probes = [rng.choice(uids) for _ in range(lookups)]
+            start = time.perf_counter()
+            for uid in probes:
+                db.find(uid)
+            per_lookup = (time.perf_counter() - start) / lookups * 1e6
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+            for uid in probes[:100]:
+                db.find(uid)
+            peak = tracemalloc.get_traced_memory()[1] - base
+            tracemalloc.stop()
+            db.close()
+            print("  %6d tags %10.2f us/lookup %6d peak heap bytes %8d file bytes %d misses" % (
+                count, per_lookup, peak, os.path.getsize(path), misses))
+
+
+# --- Access event log ---
+
+def bench_eventlog(events=20000):
+    import os
+    import tempfile
+    import event_log
+
+    uid = [0x04, 0x1A, 0x2B, 0x3C, 0x4D, 0x5E, 0x6F]
+    print("Access event log (%d events):" % events)
+    for batch in (1, 16, 64):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = event_log.EventLog(os.path.join(tmp, 'log'), ring_size=max(64, batch), flush_batch=batch)
+            start = time.perf_counter()
+            for _ in range(events):
+                log.record(event_log.TAG_AUTHORIZED, uid)
+            record_s = time.perf_counter() - start
+            log.flush()
+            log = event_log.EventLog(os.path.join(tmp, 'log2'), ring_size=max(64, batch), flush_batch=batch)
+            start = time.perf_counter()
+            for _ in range(events):
+                log.record(event_log.TAG_AUTHORIZED, uid)
+                log.maybe_flush()
+            total_s = time.perf_counter() - start
+            print("  batch %3d: record() %8.0f events/s, with flushes %8.0f events/s, %5d flash writes" % (
+                batch, events / record_s, events / total_s, log.flushes))
+
+
+
+# --- Whole firmware on the simulator ---
+
+def bench_firmware(loops=5000, requests=300):
+    import asyncio
+    import contextlib
+    import io
+    import machine
+    import sim
+
+    def bus_ops():
+        return machine.Pin.writes + machine.mem32.writes
+
+    for script in ('main.py', 'LCD version.py'):
+        print("Firmware on the simulator (%s):" % script)
+        chatter = io.StringIO() # The firmware's print() output
+        with contextlib.redirect_stdout(chatter):
+            s = sim.Simulator(script)
+        fw = s.fw
+        try:
+            with contextlib.redirect_stdout(chatter):
+                start = time.perf_counter()
+                for _ in range(loops):
+                    fw.hardware_loop()
+                idle_rate = loops / (time.perf_counter() - start)
+
+                # Keypad-to-action latency in virtual time: from the last key going down until the relay is on.
+                s.present(fw.AUTHORIZED_TAGS[0])
+                code = fw.active_door.code
+                s.enter(code[:-1])
+                ops = bus_ops()
+                s.matrix.down(code[-1])
+                unlock_ms = s.run_until(lambda: fw.doors[0].relay.value() == 1)
+                unlock_ops = bus_ops() - ops
+                s.matrix.up(code[-1])
+                s.step(100)
+                s.matrix.down('*')
+                clear_ms = s.run_until(lambda: fw.state.get('status') == "Input cleared.")
+                s.matrix.up('*')
+                s.step(100)
+
+                fw.setup_network()
+                page = s.get(fw.serve_web_page)
+                results = asyncio.run(serve_and_load(fw.router, ((b'/', requests, True), (b'/api/status', requests, True))))
+            print("  %-28s %9.0f loops/s" % ("idle hardware_loop()", idle_rate))
+            print("  %-28s %9.1f ms (virtual)" % ("last key -> relay on", unlock_ms))
+            print("  %-28s %9.1f ms (virtual)" % ("'*' -> input cleared", clear_ms))
+            print("  %-28s %9d pin/register writes" % ("bus writes for that key", unlock_ops))
+            print("  %-28s %9.0f req/s %6d bytes" % ("GET / keep-alive", results[0][0], len(page)))
+            print("  %-28s %9.0f req/s" % ("GET /api/status keep-alive", results[1][0]))
+            if hasattr(fw, 'lcd'):
+                lcd = fw.lcd
+                with contextlib.redirect_stdout(chatter):
+                    lcd.render(("Enter Code:", "1_"))
+                    ops = bus_ops()
+                    lcd.render(("Enter Code:", "12_"))
+                    typed = bus_ops() - ops
+                    ops = bus_ops()
+                    lcd.render(("RFID Authorized!", "Code: 12345"))
+                    full = bus_ops() - ops
+                    ops = bus_ops()
+                    lcd.render(("RFID Authorized!", "Code: 12345"))
+                    same = bus_ops() - ops
+                print("  %-28s %9d bus writes" % ("LCD: one more digit typed", typed))
+                print("  %-28s %9d bus writes" % ("LCD: new screen", full))
+                print("  %-28s %9d bus writes" % ("LCD: unchanged screen", same))
+        finally:
+            s.close()
+
+
+def bench_metrics(loops=20000, requests=300):
+    import asyncio
+    import contextlib
+    import io
+    import metrics
+    import sim
+
+    h = metrics.Histogram(b'x')
+    samples = [37, 180, 900, 4200, 70000]
+    print("metrics.Histogram.observe():") # Heap bytes here are CPython boxing large ints; MicroPython's small ints are not allocated
+    report("one sample", measure(lambda: h.observe(samples[h.count % 5]), 100000))
+
+    chatter = io.StringIO()
+    with contextlib.redirect_stdout(chatter):
+        s = sim.Simulator('main.py')
+    fw = s.fw
+    try:
+        def loop_us():
+            start = time.perf_counter()
+            for _ in range(loops):
+                fw.hardware_loop()
+            return (time.perf_counter() - start) / loops * 1e6
+
+        with contextlib.redirect_stdout(chatter):
+            fw.hardware_loop()
+            plain = loop_us()
+            fw.setup_metrics()
+            fw.hardware_loop()
+            timed = loop_us()
+            fw.setup_network()
+            fw.instrument_routes()
+            results = asyncio.run(serve_and_load(fw.router, ((b'/api/status', requests, True), (b'/metrics', 1, False))))
+            body = s.get(fw.metrics_registry.respond)
+        print("Idle hardware_loop() on the simulator (main.py):")
+        print("  %-28s %9.2f us/loop" % ("METRICS = False", plain))
+        print("  %-28s %9.2f us/loop  (+%.2f us, %d timed stages)" % ("METRICS = True", timed, timed - plain, 7))
+        print("GET /metrics: %d bytes, %d lines" % (len(body), body.count(b'\n')))
+        for line in body.split(b'\n'):
+            if line.startswith(b'door_http_handler_duration_seconds_count'):
+                print("  " + line.decode())
+    finally:
+        s.close()
+
+
+def bench_rfid(hold_ms=3000):
+    import contextlib
+    import io
+    import sim
+
+    # The stand-in tag follows the ISO 14443-3 states, so a selected card ignores REQA as a real one does.
+    chatter = io.StringIO()
+    for label, halts in (("driver with halt()", True), ("driver without halt()", False)):
+        with contextlib.redirect_stdout(chatter):
+            s = sim.Simulator('main.py')
+        fw = s.fw
+        seen = fw.doors[0].presence
+        if not halts:
+            s.reader.halt = None
+        try:
+            with contextlib.redirect_stdout(chatter):
+                # The badge stays on the reader while the code is typed.
+                s.reader.present(fw.AUTHORIZED_TAGS[0])
+                s.step(100)
+                code = fw.active_door.code
+                s.enter(code)
+                opened = fw.doors[0].relay.value() == 1
+                s.step(hold_ms - 100 - len(code) * 120)
+                s.reader.remove()
+                s.step(100)
+            held_polls = seen.selects + seen.selects_skipped
+            print("Badge held on the reader for %d ms (virtual) while typing the code, %s:" % (hold_ms, label))
+            print("  %-28s %9d" % ("reader polls", seen.requests))
+            print("  %-28s %9d  (one per answered poll before)" % ("select exchanges", seen.selects))
+            print("  %-28s %9d" % ("select exchanges skipped", seen.selects_skipped))
+            print("  %-28s %9d  (%d before)" % ("presentations handled", seen.presentations, held_polls))
+            print("  %-28s %9s  (code changed on every answered poll before)" % ("code accepted", "yes" if opened else "NO"))
+        finally:
+            s.close()
+
+
+def bench_polling(arrivals=20):
+    import contextlib
+    import io
+    import random
+    import poll_schedule
+    import sim
+
+    def run_trace(fixed):
+        chatter = io.StringIO()
+        with contextlib.redirect_stdout(chatter):
+            s = sim.Simulator('main.py', loop_period_ms=1)
+        fw = s.fw
+        if fixed:
+            fw.doors[0].schedule = poll_schedule.PollSchedule(fw.RFID_POLL_INTERVAL_MS, fw.RFID_POLL_INTERVAL_MS)
+        schedule = fw.doors[0].schedule
+        rng = random.Random(1) # Same trace for both runs
+        latencies = []
+        try:
+            with contextlib.redirect_stdout(chatter):
+                for _ in range(arrivals):
+                    s.step(rng.randint(5000, 40000)) # Empty lobby
+                    before = fw.doors[0].presence.presentations
+                    s.reader.present(fw.AUTHORIZED_TAGS[0])
+                    latencies.append(s.run_until(lambda: fw.doors[0].presence.presentations > before, 2000))
+                    s.step(300)
+                    s.reader.remove()
+                    s.enter(fw.active_door.code)
+            minutes = s.now_ms() / 60000
+            return (latencies, schedule.polls / minutes, schedule.bursts)
+        finally:
+            s.close()
+
+    print("RFID polling over a simulated trace (%d visitors, 5-40 s apart):" % arrivals)
+    for label, fixed in (("fixed 10 ms", True), ("adaptive 10/100 ms", False)):
+        latencies, polls_per_min, bursts = run_trace(fixed)
+        latencies.sort()
+        print("  %-20s %7.0f polls/min  detection %5.1f ms mean %5.1f ms worst  %3d bursts" % (
+            label, polls_per_min, sum(latencies) / len(latencies), latencies[-1], bursts))
+
+
+def bench_alloc(rounds=20000):
+    import contextlib
+    import io
+    import code_entry
+    import sim
+
+    # The original keypad path: the typed code grows as a str, the status and LCD lines are new strings.
+    legacy = {'buffer': ''}
+
+    def legacy_digit():
+        buffer = legacy['buffer'] + '7'
+        status = f"Code: {buffer}"
+        line = buffer + "_"
+        legacy['buffer'] = '' if len(buffer) == 5 else buffer
+        return status, line
+
+    entry = code_entry.CodeEntry()
+
+    def entry_digit():
+        entry.add('7')
+        return entry.display
+
+    def entry_digit_message():
+        entry.add('7')
+        return entry.message()
+
+    print("Peak heap bytes per typed digit (CPython; MicroPython allocates less per object, but the same objects):")
+    report("str buffer + f-strings", measure(legacy_digit, rounds))
+    report("CodeEntry, LCD echo", measure(entry_digit, rounds))
+    report("CodeEntry + status message", measure(entry_digit_message, rounds))
+
+    chatter = io.StringIO()
+    with contextlib.redirect_stdout(chatter):
+        s = sim.Simulator('LCD version.py')
+    fw = s.fw
+
+    def minute(visit):
+        # collect_garbage() runs once a second, as its task would.
+        before = fw.heap.collections
+        for _ in range(60):
+            fw.collect_garbage()
+            if visit:
+                s.present(fw.AUTHORIZED_TAGS[0], 300)
+                s.press('1', 60, 640)
+            else:
+                s.step(1000)
+        return fw.heap.collections - before
+
+    try:
+        with contextlib.redirect_stdout(chatter):
+            s.step(6000) # Long enough for the RFID poll to back off
+            idle = measure(fw.hardware_loop, rounds)
+            idle_gcs = minute(False)
+            busy_gcs = minute(True)
+    finally:
+        s.close()
+    fw.heap.collect() # On the real clock again, so the pause is measured
+    report("idle hardware_loop() (LCD)", idle)
+    print("  (CPython boxes every int above 256, ticks values included; MicroPython's small ints are free)")
+    # On CPython there is no mem_alloc(), so every idle window collects; the Pico skips those with little garbage.
+    print("Planned GC: %d in an idle minute, %d in a minute with someone at the door; one pause %d us" % (
+        idle_gcs, busy_gcs, fw.heap.last_pause_us))
+
+
+def bench_timers(rounds=20000):
+    import contextlib
+    import io
+    import sim
+    import timer_wheel
+
+    print("TimerWheel schedule + cancel (cost should not grow with the number pending):")
+    for pending in (10, 1000):
+        wheel = timer_wheel.TimerWheel()
+        for i in range(pending):
+            wheel.schedule(timer_wheel.Timer(None), (i * 37) % 60000)
+        t = timer_wheel.Timer(None)
+        delays = [5000, 60000, 10000, 1000]
+
+        def schedule_cancel():
+            wheel.schedule(t, delays[wheel.pending % 4])
+            wheel.cancel(t)
+        report("%d timers pending" % pending, measure(schedule_cancel, rounds))
+
+    chatter = io.StringIO()
+    with contextlib.redirect_stdout(chatter):
+        s = sim.Simulator('LCD version.py', loop_period_ms=1)
+    fw = s.fw
+
+    def lcd_shows(text):
+        return bytes(fw.lcd._shadow[0]).startswith(text)
+
+    def timed(start, condition, timeout_ms):
+        taken = s.run_until(condition, timeout_ms)
+        return None if taken is None else start + taken
+
+    rows = []
+    try:
+        with contextlib.redirect_stdout(chatter):
+            s.step(100)
+            # Lock auto-close: from the relay switching on to it switching off.
+            s.present(fw.AUTHORIZED_TAGS[0])
+            code = fw.active_door.code
+            s.enter(code[:-1])
+            s.matrix.down(code[-1])
+            s.run_until(lambda: fw.doors[0].relay.value() == 1)
+            s.matrix.up(code[-1])
+            rows.append(("lock auto-close", fw.LOCK_OPEN_DURATION_MS, s.run_until(lambda: fw.doors[0].relay.value() == 0, 10000)))
+            s.step(2000)
+
+            # LCD message: from "Input Cleared!" going up to "Waiting for RFID" coming back.
+            s.matrix.down('*')
+            s.run_until(lambda: lcd_shows(b"Input Cleared!"))
+            s.matrix.up('*')
+            polls = fw.doors[0].presence.requests
+            rows.append(("LCD message reversion", fw.MESSAGE_HOLD_MS, s.run_until(lambda: lcd_shows(b"Waiting for RFID"), 3000)))
+            polls = fw.doors[0].presence.requests - polls
+
+            # Input timeout: from the last key press to the half-typed code being dropped.
+            s.press('4', 60, 0)
+            rows.append(("input timeout (from key down)", fw.INPUT_TIMEOUT_MS, 60 + s.run_until(lambda: fw.entry.count == 0, 20000)))
+
+            # Code expiry: from the badge scan to the code being withdrawn.
+            s.reader.present(fw.AUTHORIZED_TAGS[0])
+            s.run_until(lambda: fw.doors[0].presence.holding)
+            s.reader.remove()
+            rows.append(("code expiry", fw.CODE_VALID_MS, s.run_until(lambda: fw.active_door.code == "", 90000)))
+    finally:
+        s.close()
+    print("Timeouts in the LCD firmware on a virtual clock (1 ms loop, %d ms timer tick):" % fw.TIMER_TICK_MS)
+    for label, expected, taken in rows:
+        print("  %-30s %7d ms set %9.1f ms measured  (%+.1f ms)" % (label, expected, taken, taken - expected))
+    print("  %-30s %7d RFID polls while the message was up (the old sleep(1) allowed none)" % ("", polls))
+
+
+def bench_doors(visits=40, request_us=1500, select_us=4000):
+    import contextlib
+    import io
+    import random
+    import mfrc522
+    import sim
+
+    # Each reader exchange takes SPI time on the clock, as on the Pico.
+    mfrc522.MFRC522.request_us = request_us
+    mfrc522.MFRC522.select_us = select_us
+
+    def run_trace(count, every_pass):
+        chatter = io.StringIO()
+        with contextlib.redirect_stdout(chatter):
+            s = sim.Simulator('main.py', loop_period_ms=5) # HARDWARE_CORE_PERIOD_MS
+        fw = s.fw
+        for i in range(1, count):
+            fw.add_door("Door %d" % (i + 1), 100 + i, 200 + i)
+        if every_pass:
+            # The obvious way to add doors: poll every reader on every pass of the loop.
+            class EveryPass:
+                def run(self):
+                    for door in fw.doors:
+                        fw.poll_rfid(door)
+            fw.readers = EveryPass()
+
+        # Longest single pass of the hardware loop: that is how long the keypad and timers wait.
+        loop = fw.hardware_loop
+        longest = [0]
+
+        def timed_loop():
+            start = s.clock.us
+            loop()
+            if s.clock.us - start > longest[0]:
+                longest[0] = s.clock.us - start
+        fw.hardware_loop = timed_loop
+
+        rng = random.Random(count) # Same visits for both strategies
+        latencies = []
+        requests = 0
+        try:
+            with contextlib.redirect_stdout(chatter):
+                s.step(6000) # Every reader backs off to its idle rate
+                start_ms = s.now_ms()
+                before = sum(door.presence.requests for door in fw.doors)
+                for _ in range(visits):
+                    s.step(rng.randint(1000, 8000))
+                    door = fw.doors[rng.randrange(count)]
+                    seen = door.presence.presentations
+                    door.reader.present(fw.AUTHORIZED_TAGS[0])
+                    latencies.append(s.run_until(lambda: door.presence.presentations > seen, 2000))
+                    s.step(300)
+                    door.reader.remove()
+                requests = sum(door.presence.requests for door in fw.doors) - before
+                minutes = (s.now_ms() - start_ms) / 60000
+        finally:
+            s.close()
+        latencies.sort()
+        return (sum(latencies) / len(latencies), latencies[-1], longest[0] / 1000, requests / minutes / count)
+
+    try:
+        print("Tag detection with several readers on one SPI bus (%d visits at random doors; %.1f ms per reader poll):" % (
+            visits, request_us / 1000))
+        for count in (1, 2, 4, 8):
+            for label, every_pass in (("scheduler", False), ("every reader, every pass", True)):
+                mean, worst, longest, polls = run_trace(count, every_pass)
+                print("  %d reader%s  %-25s detection %5.1f ms mean %6.1f ms worst  longest loop pass %5.1f ms  %5.0f polls/min per reader" % (
+                    count, "s" if count > 1 else " ", label, mean, worst, longest, polls))
+        print("  (scheduler: one reader per pass, so worst case = idle interval + (N - 1) polls; the keypad never waits for more than one)")
+    finally:
+        mfrc522.MFRC522.request_us = 0
+        mfrc522.MFRC522.select_us = 0
+
+
+# --- Fleet polling ---
+
+def bench_fleet(sizes=(10, 100, 300), rounds=5, busy=0.05, delay_ms=20):
+    import asyncio
+    import contextlib
+    import io
+    import os
+    import random
+    import tempfile
+    import fleet_standin
+    sys.path.insert(0, os.path.join(hostenv.FIRMWARE_DIR, 'tools'))
+    import fleet
+
+    async def naive_round(standins):
+        # One device after another, a new connection and the full body every time.
+        done = 0
+        for standin in standins:
+            reader, writer = await asyncio.open_connection('127.0.0.1', standin.port)
+            await _fetch(reader, writer, b'/api/status', True)
+            writer.close()
+            done += 1
+        return done
+
+    async def run(count, log_dir):
+        standins = await fleet_standin.start_fleet(count, log_dir, delay_s=delay_ms / 1000)
+        rng = random.Random(count)
+        received = [0]
+
+        def on_event(controller, kind, detail):
+            if kind == 'access':
+                received[0] += 1
+        controllers = [fleet.Controller('127.0.0.1', s.port, s.name) for s in standins]
+        watcher = fleet.Fleet(controllers, timeout=1.0, on_event=on_event)
+        try:
+            await watcher.poll_all() # Baseline: connections opened, ETags and log positions known
+            connections = sum(c.connections for c in controllers)
+            sent = sum(c.bytes for c in controllers)
+            logged = 0
+            elapsed = 0.0
+            for _ in range(rounds):
+                for standin in rng.sample(standins, max(1, int(count * busy))):
+                    logged += standin.settle() if standin.values[4] == 'open' else standin.visit(rng)
+                start = time.perf_counter()
+                await watcher.poll_all()
+                elapsed += time.perf_counter() - start
+            connections = sum(c.connections for c in controllers) - connections
+            sent = sum(c.bytes for c in controllers) - sent
+
+            start = time.perf_counter()
+            await naive_round(standins)
+            naive = time.perf_counter() - start
+
+            # A few controllers stop answering: the round waits one timeout, not one per stalled controller.
+            stalled = rng.sample(standins, max(1, count // 20))
+            for standin in stalled:
+                standin.stalled = True
+            start = time.perf_counter()
+            await watcher.poll_all()
+            stall = time.perf_counter() - start
+            offline = sum(1 for c in controllers if c.online is False)
+            for standin in stalled:
+                standin.stalled = False
+        finally:
+            await watcher.close()
+            await asyncio.sleep(0.1) # Let the servers notice the clients have gone
+            for standin in standins:
+                await standin.stop()
+        return (elapsed / rounds, connections / rounds, sent / rounds / count, received[0], logged,
+                naive, stall, len(stalled), offline, watcher.timeout)
+
+    print("tools/fleet.py against stand-in controllers on loopback (%d ms per response, %d rounds, %d%% of doors" % (
+        delay_ms, rounds, busy * 100))
+    print("  busy per round; client and servers share this one process and core):")
+    for count in sizes:
+        chatter = io.StringIO() # Stalled stand-ins complain when they finally answer a client that gave up
+        with tempfile.TemporaryDirectory() as log_dir, contextlib.redirect_stdout(chatter):
+            (per_round, connections, per_device, received, logged, naive, stall, stalled, offline,
+             timeout) = asyncio.run(run(count, log_dir))
+        print("  %3d controllers  fleet %7.1f ms/round %5.1f new TCP/round %4.0f bytes/device  events %d/%d" % (
+            count, per_round * 1000, connections, per_device, received, logged))
+        print("  %3s              one at a time, new connection, full body %7.1f ms/round" % ("", naive * 1000))
+        print("  %3s              %d stalled: round %.0f ms (timeout %.0f ms), %d marked offline" % (
+            "", stalled, stall * 1000, timeout * 1000, offline))
+
+
+def bench_upload(sizes=(1000, 10000, 50000), segment=1460):
+    import asyncio
+    import os
+    import random
+    import tempfile
+    import http_router
+    import tag_db
+    import tag_store
+    import tag_upload
+    sys.path.insert(0, os.path.join(hostenv.FIRMWARE_DIR, 'tools'))
+    import upload_tags
+
+    class SegmentReader:
+        """Stream reader stand-in handing out a prebuilt request one TCP segment at a time."""
+        def __init__(self, data):
+            self._data = memoryview(data)
+            self._pos = 0
+            self._pending = b''
+
+        def _fill(self):
+            if not self._pending and self._pos < len(self._data):
+                self._pending = bytes(self._data[self._pos:self._pos + segment])
+                self._pos += segment
+
+        async def read(self, n):
+            self._fill()
+            data = self._pending[:n]
+            self._pending = self._pending[n:]
+            return data
+
+        async def readline(self):
+            line = b''
+            while True:
+                self._fill()
+                if not self._pending:
+                    return line
+                end = self._pending.find(b'\n')
+                if end >= 0:
+                    line += self._pending[:end + 1]
+                    self._pending = self._pending[end + 1:]
+                    return line
+                line += self._pending
+                self._pending = b''
+
+    def chunked_request(lines, token=b'secret'):
+        parts = [b'PUT /api/tags HTTP/1.1\r\nHost: door\r\nAuthorization: Bearer %s\r\n'
+                 b'Transfer-Encoding: chunked\r\n\r\n' % token]
+        for i in range(0, len(lines), upload_tags.LINES_PER_CHUNK):
+            chunk = ''.join(lines[i:i + upload_tags.LINES_PER_CHUNK]).encode()
+            parts.append(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+        parts.append(b'0\r\n\r\n')
+        return b''.join(parts)
+
+    async def put(store, data, traced):
+        sink = ByteSink()
+        sink.drain = lambda: asyncio.sleep(0)
+        reply = []
+        sink.write = lambda d: reply.append(bytes(d))
+        request = http_router.Request(SegmentReader(data))
+        if traced:
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        await request.read_head(1000)
+        await tag_upload.receive(request, sink, store, b'secret')
+        elapsed = time.perf_counter() - start
+        peak = 0
+        if traced:
+            peak = tracemalloc.get_traced_memory()[1] - base
+            tracemalloc.stop()
+        return b''.join(reply).split(b' ', 2)[1], elapsed, peak
+
+    def upload(store, data, traced=False):
+        return asyncio.run(put(store, data, traced))
+
+    rng = random.Random(24)
+    print("PUT /api/tags, chunked, %d-byte segments (handler and flash writes; request prebuilt):" % segment)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tags.db')
+        for count in sizes:
+            uids = set()
+            while len(uids) < count:
+                uids.add(bytes(rng.getrandbits(8) for _ in range(rng.choice((4, 7)))))
+            records = upload_tags.sorted_records(tag_db.pack_record(uid, 'badge %d' % i) for i, uid in enumerate(uids))
+            lines = [upload_tags.record_line(r) for r in records]
+            data = chunked_request(lines)
+            store = tag_db.CredentialStore(path, tag_store.TagIndex([]))
+            status, elapsed, _ = upload(store, data)
+            _, _, peak = upload(store, data, traced=True)
+            found = sum(1 for uid in list(uids)[:200] if uid in store)
+
+            # The same badges held in RAM and sorted there: what the endpoint would need without streaming.
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+            body = bytes(data)
+            tag_db.write_database(os.path.join(tmp, 'ram.db'), (tag_upload.parse_line(line.encode()) for line in lines))
+            in_ram = tracemalloc.get_traced_memory()[1] - base
+            tracemalloc.stop()
+            del body
+            print("  %6d tags %s %8.0f tags/s %7d peak heap bytes (all in RAM: %9d)  %d/200 found  %d body bytes" % (
+                count, status.decode(), count / elapsed, peak, in_ram, found, len(data)))
+
+        # A failed upload leaves the database that was there before.
+        before = len(store)
+        bad = chunked_request(lines[:-1] + [lines[0]])
+        status, _, _ = upload(store, bad)
+        cut = chunked_request(lines)[:len(data) // 2]
+        cut_status, _, _ = upload(store, cut)
+        wrong = chunked_request(lines[:10], token=b'guess!')
+        wrong_status, _, _ = upload(store, wrong)
+        print("  out of order %s, cut short %s, wrong token %s: %d tags still served, temp file %s" % (
+            status.decode(), cut_status.decode(), wrong_status.decode(), len(store),
+            "left behind" if os.path.exists(path + tag_upload.TMP_SUFFIX) else "removed"))
+        assert len(store) == before
+
+
+def bench_state(rounds=5000, visits=5, poll_ms=100):
+    import contextlib
+    import io
+    import http_router
+    import sim
+    import status_api
+    import status_page
+
+    def run_handler(handler, request):
+        # The page and status handlers never await, so one send() runs them to the end.
+        try:
+            handler(request, ByteSink()).send(None)
+        except StopIteration:
+            pass
+
+    for script in ('main.py', 'LCD version.py'):
+        chatter = io.StringIO()
+        with contextlib.redirect_stdout(chatter):
+            s = sim.Simulator(script)
+        fw = s.fw
+        try:
+            with contextlib.redirect_stdout(chatter):
+                fw.setup_network()
+                fw.set_code(fw.active_door, '48213')
+            request = http_router.Request(None)
+            legacy_api = status_api.StatusApi()
+
+            def page_per_request(sink):
+                # What every request did before the store: gather, classify by substring, encode.
+                status = fw.web_state.get('status')
+                values = dict(style=status_page.STYLE.link(), script=status_page.SCRIPT.link(), ssid=fw.ssid,
+                              bssid=fw.web_state.get('bssid'), ip=fw.wifi.ip, rssi=fw.wifi.rssi,
+                              code=fw.web_state.get('code'),
+                              status_class="lock-open" if "OPEN" in status else (
+                                  "lock-closed" if "Unauthorized" in status else "lock-info"),
+                              status=status)
+                http_router.write_head(sink, 200, b'text/html', status_page.STATUS_PAGE.length(**values))
+                status_page.STATUS_PAGE.render(sink, **values)
+
+            def api_per_request(sink):
+                ws = fw.web_state
+                values = (fw.ssid, ws.get('bssid'), fw.wifi.ip, fw.wifi.rssi, ws.get('lock'), ws.get('status'),
+                          ws.get('code'), fw.access_log.seq)
+                legacy_api.respond(sink, request, values)
+
+            print("Shared state store (%s):" % script)
+            report("GET / values per request", measure(lambda: page_per_request(ByteSink()), rounds))
+            report("GET / cached per version", measure(lambda: run_handler(fw.serve_web_page, request), rounds))
+            report("  (handler call overhead)", measure(lambda: run_handler(fw.serve_favicon, request), rounds))
+            report("/api/status tuple per req", measure(lambda: api_per_request(ByteSink()), rounds))
+            report("/api/status cached", measure(
+                lambda: fw.status_endpoint.respond(ByteSink(), request, fw.current_status()), rounds))
+
+            # Visits while a dashboard polls the page and the API every poll_ms (virtual).
+            pushed = []
+            publish = fw.events.publish
+            fw.events.publish = lambda kind, value: pushed.append(kind)
+            renders = [0]
+            if hasattr(fw, 'lcd'):
+                render = fw.lcd.render
+
+                def counted(lines):
+                    renders[0] += 1
+                    render(lines)
+                fw.lcd.render = counted
+            page_builds = fw.page_view.builds
+            api_builds = fw.api_view.builds
+            version = fw.state.version
+            polls = 0
+            keys = 0
+            with contextlib.redirect_stdout(chatter):
+                for _ in range(visits):
+                    s.present(fw.AUTHORIZED_TAGS[0])
+                    code = fw.active_door.code
+                    for key in code:
+                        s.press(key)
+                        keys += 1
+                        run_handler(fw.serve_web_page, request)
+                        run_handler(fw.serve_status_api, request)
+                        polls += 1
+                    while fw.any_lock_open():
+                        s.step(poll_ms)
+                        run_handler(fw.serve_web_page, request)
+                        run_handler(fw.serve_status_api, request)
+                        polls += 1
+                    for _ in range(10): # The door sits idle for a second
+                        s.step(poll_ms)
+                        run_handler(fw.serve_web_page, request)
+                        run_handler(fw.serve_status_api, request)
+                        polls += 1
+            fw.events.publish = publish
+            print("  %d visits, %d key presses, %d page + %d API polls: %d state changes, page built %d times,"
+                  % (visits, keys, polls, polls, fw.state.version - version, fw.page_view.builds - page_builds))
+            print("  API body built %d times, %d events pushed%s" % (
+                fw.api_view.builds - api_builds, len(pushed),
+                ", %d LCD renders" % renders[0] if hasattr(fw, 'lcd') else ""))
+        finally:
+            s.close()
+
+
+BENCHMARKS = {
+    'page': bench_page,
+    'api': bench_api,
+    'http': bench_http,
+    'dualcore': bench_dualcore,
+    'lcd': bench_lcd,
+    'tags': bench_tags,
+    'tagdb': bench_tagdb,
+    'eventlog': bench_eventlog,
+    'firmware': bench_firmware,
+    'metrics': bench_metrics,
+    'rfid': bench_rfid,
+    'polling': bench_polling,
+    'assets': bench_assets,
+    'alloc': bench_alloc,
+    'timers': bench_timers,
+    'doors': bench_doors,
+    'fleet': bench_fleet,
+    'upload': bench_upload,
+    'state': bench_state,
+}
+
+
+def main(argv):
+    names = argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,126 @@
+# fleet_standin.py - Many controllers' web APIs on loopback ports, for tools/fleet.py
+# Usage: python host/fleet_standin.py [count] [first port]
+#
+# Each stand-in serves /api/status and /api/events with the firmware's own
+# http_router, status_api and event_log, but has no hardware: visit() plays a
+# badge-and-code visit into its status and access log instead. Run as a
+# script, it starts count stand-ins on consecutive ports, writes their
+# addresses to fleet_hosts.txt and keeps a few visits a second going, so
+#   python tools/fleet.py fleet_hosts.txt --table 10
+# has a fleet to watch.
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+import hostenv
+
+hostenv.install()
+
+import event_log  # noqa: E402
+import http_router  # noqa: E402
+import status_api  # noqa: E402
+
+IDLE_STATUS = "Awaiting RFID/Keypad input..."
+
+
+class StandIn:
+    """One controller's web API; each response takes delay_s, like a round trip over WiFi."""
+    def __init__(self, number, log_dir, delay_s=0):
+        self.name = 'door-%03d' % number
+        # Field order of status_api.API_FIELDS
+        self.values = ['Wifi', '3e:da:3d:76:c9:c8', '10.0.%d.%d' % (number // 250, number % 250 + 2), -55,
+                       'closed', IDLE_STATUS, '', 0]
+        self.api = status_api.StatusApi()
+        self.log = event_log.EventLog(os.path.join(log_dir, self.name))
+        self.delay_s = delay_s
+        self.stalled = False # Accepts connections but never answers, like a wedged controller
+        self.router = http_router.Router()
+        self.router.route(b'/api/status', self._status)
+        self.router.route(b'/api/events', self._events)
+        self.server = None
+        self.port = None
+
+    async def _status(self, request, writer):
+        while self.stalled:
+            await asyncio.sleep(0.1)
+        if self.delay_s:
+            await asyncio.sleep(self.delay_s)
+        self.values[7] = self.log.seq
+        return self.api.respond(writer, request, tuple(self.values))
+
+    async def _events(self, request, writer):
+        if self.delay_s:
+            await asyncio.sleep(self.delay_s)
+        return self.log.respond(writer, request)
+
+    async def start(self, port=0):
+        self.server = await asyncio.start_server(self.router.serve_connection, '127.0.0.1', port, backlog=16)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def visit(self, rng):
+        """A badge is scanned and a code typed; returns the number of access events logged."""
+        uid = bytes(rng.randrange(256) for _ in range(7))
+        self.log.record(event_log.TAG_AUTHORIZED, uid)
+        if rng.random() < 0.8:
+            self.log.record(event_log.CODE_CORRECT)
+            self.log.record(event_log.LOCK_OPEN)
+            self.values[4] = 'open'
+            self.values[5] = "Lock is OPEN!"
+            return 3
+        self.log.record(event_log.CODE_WRONG)
+        self.values[5] = "Incorrect code. Try again."
+        return 2
+
+    def settle(self):
+        """The lock closes again; returns the number of access events logged."""
+        if self.values[4] == 'closed':
+            self.values[5] = IDLE_STATUS
+            return 0
+        self.log.record(event_log.LOCK_CLOSE)
+        self.values[4] = 'closed'
+        self.values[5] = IDLE_STATUS
+        return 1
+
+
+async def start_fleet(count, log_dir, first_port=0, delay_s=0):
+    """Starts count stand-ins, on consecutive ports from first_port (any free ports with 0)."""
+    fleet = [StandIn(i, log_dir, delay_s) for i in range(count)]
+    for i, standin in enumerate(fleet):
+        await standin.start(first_port + i if first_port else 0)
+    return fleet
+
+
+async def serve(count, first_port):
+    with tempfile.TemporaryDirectory() as log_dir:
+        fleet = await start_fleet(count, log_dir, first_port)
+        with open('fleet_hosts.txt', 'w') as f:
+            for standin in fleet:
+                f.write('127.0.0.1:%d %s\n' % (standin.port, standin.name))
+        print("%d stand-ins on ports %d-%d; addresses in fleet_hosts.txt" % (count, fleet[0].port, fleet[-1].port))
+        rng = random.Random()
+        while True:
+            await asyncio.sleep(1)
+            for standin in rng.sample(fleet, max(1, count // 50)):
+                if standin.values[4] == 'open':
+                    standin.settle()
+                else:
+                    standin.visit(rng)
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 50
+    first_port = int(argv[2]) if len(argv) > 2 else 9000
+    try:
+        asyncio.run(serve(count, first_port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,71 @@
+# hostenv.py - Makes a desktop CPython look enough like MicroPython to run the firmware
+# Adds the MicroPython-only helpers to the time module and puts the firmware
+# directory on sys.path, next to the stand-in modules in this folder. With a
+# VirtualClock, ticks only move when the clock is advanced (or something
+# sleeps), so timing-dependent code runs deterministically and instantly.
+import os
+import sys
+import time
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+FIRMWARE_DIR = os.path.dirname(HOST_DIR)
+TICKS_PERIOD = 1 << 30
+
+
+def _ticks_ms():
+    return int(time.monotonic() * 1000) & (TICKS_PERIOD - 1)
+
+
+def _ticks_us():
+    return int(time.monotonic() * 1000000) & (TICKS_PERIOD - 1)
+
+
+def _ticks_diff(end, start):
+    return ((end - start + TICKS_PERIOD // 2) & (TICKS_PERIOD - 1)) - TICKS_PERIOD // 2
+
+
+def _ticks_add(ticks, delta):
+    return (ticks + delta) & (TICKS_PERIOD - 1)
+
+
+class VirtualClock:
+    """Simulated time in microseconds; sleeping advances it instead of waiting."""
+    def __init__(self):
+        self.us = 0
+
+    def advance_us(self, us):
+        self.us += int(us)
+
+    def advance_ms(self, ms):
+        self.us += int(ms * 1000)
+
+    def ticks_ms(self):
+        return (self.us // 1000) & (TICKS_PERIOD - 1)
+
+    def ticks_us(self):
+        return self.us & (TICKS_PERIOD - 1)
+
+
+_real_sleep = time.sleep
+
+
+def install(clock=None):
+    """Patches the time module and sys.path; safe to call more than once. Pass clock=None for real time."""
+    time.ticks_diff = _ticks_diff
+    time.ticks_add = _ticks_add
+    if clock is None:
+        time.ticks_ms = _ticks_ms
+        time.ticks_us = _ticks_us
+        time.sleep = _real_sleep
+        time.sleep_ms = lambda ms: _real_sleep(ms / 1000)
+        time.sleep_us = lambda us: _real_sleep(us / 1000000)
+    else:
+        time.ticks_ms = clock.ticks_ms
+        time.ticks_us = clock.ticks_us
+        time.sleep = lambda s: clock.advance_us(s * 1000000)
+        time.sleep_ms = clock.advance_ms
+        time.sleep_us = clock.advance_us
+    if HOST_DIR not in sys.path:
+        sys.path.insert(0, HOST_DIR) # Stand-ins must win even when the working directory changes
+    if FIRMWARE_DIR not in sys.path:
+        sys.path.append(FIRMWARE_DIR)
@@ -0,0 +1,105 @@
+# machine.py - Host stand-in for the MicroPython machine module
+# Pins remember their last value and can be driven from a script, which is all
+# the lock firmware needs to run on a PC. An input's level can also come from a
+# reader function (see sim.KeyMatrix). Pin.writes and mem32.writes count bus
+# activity for the benchmarks.
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    writes = 0 # Output writes across all pins
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        # Inputs with a pull-up idle high, like the keypad columns.
+        self._value = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            self._value = value
+        self.reader = None # Called for the level of an input, when set
+
+    def init(self, mode=-1, pull=-1, value=None):
+        self.mode = mode
+        if mode == Pin.IN:
+            # Nothing drives a freshly switched input: it reads its pull level.
+            self._value = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        if v is None:
+            return self.reader() if self.reader else self._value
+        Pin.writes += 1
+        self._value = 1 if v else 0
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(not self._value)
+
+    def __repr__(self):
+        return "Pin(%r)" % (self.id,)
+
+
+class Timer:
+    PERIODIC = 1
+    ONE_SHOT = 0
+
+    def __init__(self, id=-1):
+        self.freq = None
+        self.callback = None
+
+    def init(self, mode=PERIODIC, freq=None, period=None, callback=None):
+        # Periodic callbacks only blink the status LED, so they are recorded, not run.
+        self.freq = freq
+        self.callback = callback
+
+    def deinit(self):
+        self.callback = None
+
+
+class SPI:
+    def __init__(self, id, baudrate=1000000, **kwargs):
+        self.id = id
+        self.baudrate = baudrate
+
+
+class _Mem32:
+    """Word-addressed memory stand-in that models the RP2040 SIO GPIO output registers."""
+    GPIO_OUT = 0xD0000010
+    GPIO_OUT_SET = 0xD0000014
+    GPIO_OUT_CLR = 0xD0000018
+    GPIO_OUT_XOR = 0xD000001C
+
+    def __init__(self):
+        self.words = {}
+        self.writes = 0
+
+    def __getitem__(self, addr):
+        return self.words.get(addr, 0)
+
+    def __setitem__(self, addr, value):
+        self.writes += 1
+        out = self.words.get(self.GPIO_OUT, 0)
+        if addr == self.GPIO_OUT_SET:
+            out |= value
+        elif addr == self.GPIO_OUT_CLR:
+            out &= ~value
+        elif addr == self.GPIO_OUT_XOR:
+            out ^= value
+        else:
+            self.words[addr] = value & 0xFFFFFFFF
+            return
+        self.words[self.GPIO_OUT] = out & 0xFFFFFFFF
+
+
+mem32 = _Mem32()
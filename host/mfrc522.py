@@ -0,0 +1,85 @@
+# mfrc522.py - Host stand-in for the MFRC522 RFID reader driver
+# present(uid) puts a tag on the reader until remove() is called. Set
+# request_us, select_us and halt_us to charge each exchange's SPI time to the
+# clock (the simulator's virtual one), as a real reader would take it.
+#
+# The tag follows the ISO 14443-3 type A states, so firmware polling it sees
+# what a real card would answer:
+#   IDLE   --REQA/WUPA--> READY --select--> ACTIVE --HLTA--> HALT
+#   HALT   --WUPA-------> READY* (a card woken from HALT)
+# Any other command in READY or ACTIVE sends the card back to IDLE (HALT for
+# READY*/ACTIVE*) without an answer; a card in HALT ignores REQA. So REQA to
+# a card that is already selected gets no answer, and the next one does.
+import time
+
+IDLE = 0
+READY = 1
+ACTIVE = 2
+HALT = 3
+
+
+class MFRC522:
+    OK = 0
+    NOTAGERR = 1
+    ERR = 2
+
+    REQIDL = 0x26 # REQA: wakes cards in IDLE only
+    REQALL = 0x52 # WUPA: also wakes cards in HALT
+
+    request_us = 0
+    select_us = 0
+    halt_us = 0
+
+    def __init__(self, spi_id=0, sck=None, mosi=None, miso=None, rst=None, cs=None, **kwargs):
+        self.uid = None
+        self.state = IDLE
+        self._from_halt = False # In READY*/ACTIVE*: unexpected commands go back to HALT
+
+    def init(self):
+        pass
+
+    def present(self, uid):
+        self.uid = list(uid)
+        self.state = IDLE # Powered up by the field
+        self._from_halt = False
+
+    def remove(self):
+        self.uid = None
+
+    def _unexpected(self):
+        if self.state != HALT:
+            self.state = HALT if self._from_halt else IDLE
+
+    def request(self, mode):
+        if self.request_us:
+            time.sleep_us(self.request_us)
+        if self.uid is None:
+            return (self.NOTAGERR, None)
+        if self.state == IDLE or (self.state == HALT and mode == self.REQALL):
+            self._from_halt = self.state == HALT
+            self.state = READY
+            return (self.OK, 0x10)
+        self._unexpected()
+        return (self.NOTAGERR, None)
+
+    def SelectTag(self, tag_type):
+        if self.select_us:
+            time.sleep_us(self.select_us)
+        if self.uid is None:
+            return (self.ERR, [])
+        if self.state != READY:
+            self._unexpected()
+            return (self.ERR, [])
+        self.state = ACTIVE
+        return (self.OK, list(self.uid))
+
+    def halt(self):
+        """HLTA: never answered. Puts a selected card (and a woken one) in HALT."""
+        if self.halt_us:
+            time.sleep_us(self.halt_us)
+        if self.uid is None:
+            return
+        if self.state == ACTIVE or self._from_halt:
+            self.state = HALT
+        else:
+            self._unexpected()
@@ -0,0 +1,54 @@
+# network.py - Host stand-in for the MicroPython network module
+# The station "connects" immediately and reports a loopback address. Set
+# reachable = False to make connection attempts fail, and call drop() to
+# simulate the access point going away.
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_NO_AP_FOUND = -2
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_GOT_IP = 3
+
+
+class WLAN:
+    def __init__(self, interface_id=STA_IF):
+        self._active = False
+        self._connected = False
+        self._failed = False
+        self.reachable = True
+        self.rssi = -55
+        self.ip = '127.0.0.1'
+        self.static_config = None
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        self._active = bool(is_active)
+
+    def connect(self, ssid=None, key=None, bssid=None):
+        self._connected = self._active and self.reachable
+        self._failed = not self._connected
+
+    def disconnect(self):
+        self._connected = False
+
+    def drop(self):
+        self._connected = False
+        self.reachable = False
+
+    def isconnected(self):
+        return self._connected
+
+    def ifconfig(self, config=None):
+        if config is None:
+            return self.static_config or (self.ip, '255.255.255.0', '127.0.0.1', '127.0.0.1')
+        self.static_config = None if config == 'dhcp' else tuple(config)
+
+    def status(self, param=None):
+        if param == 'rssi':
+            return self.rssi
+        if self._failed:
+            return STAT_NO_AP_FOUND
+        return STAT_GOT_IP if self._connected else STAT_IDLE
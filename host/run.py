@@ -0,0 +1,28 @@
+# run.py - Runs a firmware script on a PC against the stand-in modules in host/
+# Usage: python host/run.py [main.py | "LCD version.py"] [web port]
+import importlib.util
+import os
+import sys
+
+import hostenv
+
+hostenv.install()
+
+
+def load_firmware(script='main.py', name='firmware'):
+    """Imports a firmware script as a module without starting its main loop."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(hostenv.FIRMWARE_DIR, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main(argv):
+    firmware = load_firmware(argv[1] if len(argv) > 1 else 'main.py')
+    # Port 80 needs root on most desktops, so serve on 8080 unless told otherwise.
+    firmware.WEB_PORT = int(argv[2]) if len(argv) > 2 else 8080
+    firmware.main()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,141 @@
+# sim.py - Scriptable simulation of the lock hardware around a firmware script
+# Loads main.py (or "LCD version.py") unmodified on a virtual clock, wires a
+# simulated 4x4 key matrix to its keypad pins and lets a script present tags,
+# press keys and let time pass. step() drives the firmware's own
+# hardware_loop(), the way its polling tasks would on the Pico.
+#
+#   sim = Simulator()
+#   sim.present(sim.fw.AUTHORIZED_TAGS[0])
+#   sim.enter(sim.fw.active_door.code)
+#   sim.fw.doors[0].relay.value()  # -> 1
+import asyncio
+import os
+import tempfile
+
+import hostenv
+import run
+
+
+class KeyMatrix:
+    """
+    Pressed keys connect their row and column, so a column input reads 0 while
+    any pressed key in it sits on a row that is driven low.
+    """
+    def __init__(self, rows, cols, keys):
+        self.rows = rows
+        self.pressed = set()
+        self._where = {}
+        for r in range(len(keys)):
+            for c in range(len(keys[r])):
+                self._where[keys[r][c]] = (r, c)
+        for c in range(len(cols)):
+            cols[c].reader = self._reader(c)
+
+    def _reader(self, col):
+        def level():
+            for r, c in self.pressed:
+                if c == col and self.rows[r].value() == 0:
+                    return 0
+            return 1
+        return level
+
+    def down(self, key):
+        self.pressed.add(self._where[key])
+
+    def up(self, key):
+        self.pressed.discard(self._where[key])
+
+
+class ByteWriter:
+    """StreamWriter stand-in that keeps what a handler writes."""
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+
+class Simulator:
+    """
+    One firmware instance on its own virtual clock. Files the firmware writes
+    (log/, tags.db lookups, boot.txt) go to workdir, a fresh temporary
+    directory unless one is given.
+    """
+    def __init__(self, script='main.py', workdir=None, loop_period_ms=None):
+        self.clock = hostenv.VirtualClock()
+        hostenv.install(self.clock)
+        self._tmp = None
+        if workdir is None:
+            self._tmp = tempfile.TemporaryDirectory()
+            workdir = self._tmp.name
+        self._cwd = os.getcwd()
+        os.chdir(workdir)
+        self.fw = run.load_firmware(script, 'sim_' + script.replace(' ', '_').replace('.', '_'))
+        self.matrix = KeyMatrix(self.fw.rows, self.fw.cols, self.fw.keys)
+        self.reader = self.fw.doors[0].reader # present() uses the first door's reader
+        self.loop_period_ms = loop_period_ms or self.fw.KEYPAD_POLL_INTERVAL_MS
+        self.loops = 0
+
+    def close(self):
+        """Restores the real clock and working directory."""
+        os.chdir(self._cwd)
+        hostenv.install()
+        if self._tmp:
+            self._tmp.cleanup()
+
+    def now_ms(self):
+        return self.clock.us // 1000
+
+    # --- Time ---
+
+    def step(self, ms):
+        """Lets ms of virtual time pass, running hardware_loop() once per loop period."""
+        end = self.clock.us + int(ms * 1000)
+        while self.clock.us < end:
+            self.fw.hardware_loop()
+            self.loops += 1
+            self.clock.advance_ms(self.loop_period_ms)
+
+    def run_until(self, condition, timeout_ms=5000):
+        """Steps until condition() is true; returns the virtual ms it took, or None on timeout."""
+        start = self.clock.us
+        while not condition():
+            if self.clock.us - start >= timeout_ms * 1000:
+                return None
+            self.step(self.loop_period_ms)
+        return (self.clock.us - start) / 1000
+
+    # --- Inputs ---
+
+    def present(self, uid, hold_ms=50):
+        """Holds a tag on the reader for hold_ms, then takes it away."""
+        self.reader.present(uid)
+        self.step(hold_ms)
+        self.reader.remove()
+
+    def press(self, key, hold_ms=60, gap_ms=60):
+        """Presses and releases one key, leaving gap_ms before the next input."""
+        self.matrix.down(key)
+        self.step(hold_ms)
+        self.matrix.up(key)
+        self.step(gap_ms)
+
+    def enter(self, keys, hold_ms=60, gap_ms=60):
+        for key in keys:
+            self.press(key, hold_ms, gap_ms)
+
+    # --- Web side ---
+
+    def get(self, handler, request=None):
+        """Runs one of the firmware's async HTTP handlers and returns the response bytes."""
+        if not hasattr(self.fw, 'router'):
+            self.fw.setup_network()
+        if request is None:
+            import http_router
+            request = http_router.Request(None)
+        writer = ByteWriter()
+        asyncio.run(handler(request, writer))
+        return bytes(writer.data)
@@ -0,0 +1,2 @@
+# urandom.py - Host stand-in for the MicroPython urandom module
+from random import getrandbits, randint, random, seed, choice  # noqa: F401
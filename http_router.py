@@ -0,0 +1,295 @@
+# http_router.py - Small HTTP/1.1 server with path routing and keep-alive
+# One Request object is allocated per connection and reused for every request
+# on it. Only the request line and the few headers the handlers need are kept;
+# every other header line is dropped as soon as it has been read. Lines are read
+# with reads of at most MAX_LINE bytes, so a client that never sends a newline
+# cannot fill the heap. Handlers that take a request body read it in pieces
+# through a BodyReader. Whatever of a body the handler left unread is skipped
+# before the next request on the connection is read (or, past
+# MAX_SKIPPED_BODY, the connection is closed), so a body is never taken for a
+# pipelined request.
+from runtime import asyncio
+
+# --- Limits and timeouts ---
+MAX_LINE = 512                  # Longest request or header line accepted
+MAX_HEADERS = 32                # More header lines than this is a bad request
+FIRST_REQUEST_TIMEOUT_MS = 2000 # A new connection must send its request within this
+IDLE_TIMEOUT_MS = 5000          # A kept-alive connection is closed after this much silence
+MAX_REQUESTS_PER_CONNECTION = 100
+MAX_SKIPPED_BODY = 1024         # Unread body bytes dropped to keep a connection; a longer body closes it
+
+# Headers kept on Request.headers (lower case); everything else is skipped.
+WANTED_HEADERS = (b'connection', b'if-none-match', b'content-length', b'transfer-encoding', b'authorization',
+                  b'accept-encoding', b'expect')
+
+_REASONS = {
+    200: b'OK', 204: b'No Content', 304: b'Not Modified', 400: b'Bad Request',
+    401: b'Unauthorized', 404: b'Not Found', 405: b'Method Not Allowed',
+    409: b'Conflict', 411: b'Length Required', 413: b'Payload Too Large', 414: b'URI Too Long',
+    431: b'Request Header Fields Too Large', 500: b'Internal Server Error', 503: b'Service Unavailable',
+}
+
+
+class LineTooLong(ValueError):
+    """A request line (414) or header line (431) longer than MAX_LINE; status is the answer."""
+    def __init__(self, status):
+        super().__init__("line longer than %d bytes" % MAX_LINE)
+        self.status = status
+
+
+class Request:
+    """Parsed request line plus the wanted headers; reused across keep-alive requests."""
+    def __init__(self, reader):
+        self.reader = reader
+        self.method = b''
+        self.path = b''
+        self.query = b''
+        self.http11 = False
+        self.headers = {}
+        self.body = None    # The BodyReader of the current request, once a handler made one
+        self._pending = b'' # Read past the last line: the next line, the body or the next request
+
+    def _reset(self):
+        self.method = b''
+        self.path = b''
+        self.query = b''
+        self.http11 = False
+        self.headers.clear()
+        self.body = None
+
+    def header(self, name, default=None):
+        """Returns a wanted header's value (name in lower case), or default."""
+        return self.headers.get(name, default)
+
+    def query_int(self, name, default):
+        """Returns query parameter name (bytes) as an int, or default."""
+        for pair in self.query.split(b'&'):
+            eq = pair.find(b'=')
+            if eq > 0 and pair[:eq] == name:
+                try:
+                    return int(pair[eq + 1:])
+                except ValueError:
+                    return default
+        return default
+
+    def keep_alive(self):
+        connection = self.headers.get(b'connection', b'').lower()
+        if self.http11:
+            return connection != b'close'
+        return connection == b'keep-alive'
+
+    async def readline(self, timeout_ms, too_long_status=431):
+        """
+        Returns the next line, newline included, or what is left (maybe b'') at the end of
+        the stream. Raises LineTooLong as soon as MAX_LINE bytes pass without a newline.
+        """
+        data = self._pending
+        while True:
+            end = data.find(b'\n')
+            if end >= 0:
+                self._pending = data[end + 1:]
+                return data[:end + 1]
+            if len(data) >= MAX_LINE:
+                self._pending = b''
+                raise LineTooLong(too_long_status)
+            self._pending = data
+            more = await asyncio.wait_for(self.reader.read(MAX_LINE - len(data)), timeout_ms / 1000)
+            if not more:
+                self._pending = b''
+                return data
+            data += more
+
+    async def read(self, n, timeout_ms):
+        """Returns up to n bytes of what follows the head, b'' at the end of the stream."""
+        data = self._pending
+        if data:
+            self._pending = data[n:]
+            return data[:n]
+        return await asyncio.wait_for(self.reader.read(n), timeout_ms / 1000)
+
+    async def skip_body(self, limit=MAX_SKIPPED_BODY):
+        """
+        Reads and drops what the handler left of the body. Returns False if more
+        than limit bytes were left or the body is malformed: the connection cannot
+        be reused then, as the rest would be read as the next request.
+        """
+        body = self.body
+        if body is None and b'content-length' not in self.headers and b'transfer-encoding' not in self.headers:
+            return True # No body at all: the common case, with nothing to allocate
+        try:
+            body = body or BodyReader(self)
+            skipped = 0
+            while not body.done:
+                skipped += len(await body.read(limit + 1 - skipped))
+                if skipped > limit:
+                    return False
+        except ValueError:
+            return False
+        return True
+
+    async def read_head(self, timeout_ms):
+        """
+        Reads the request line and headers. Returns False when the client closed the
+        connection, raises ValueError for a malformed request (LineTooLong for an overlong line).
+        """
+        self._reset()
+        line = await self.readline(timeout_ms, 414)
+        if not line:
+            return False
+        if not line.endswith(b'\n'):
+            raise ValueError
+        first = line.find(b' ')
+        second = line.find(b' ', first + 1)
+        if first <= 0 or second < 0:
+            raise ValueError
+        self.method = line[:first]
+        target = line[first + 1:second]
+        self.http11 = line[second + 1:].rstrip() == b'HTTP/1.1'
+        mark = target.find(b'?')
+        if mark >= 0:
+            self.path = target[:mark]
+            self.query = target[mark + 1:]
+        else:
+            self.path = target
+        for _ in range(MAX_HEADERS):
+            line = await self.readline(FIRST_REQUEST_TIMEOUT_MS)
+            if line == b'\r\n' or line == b'\n' or not line:
+                return True
+            colon = line.find(b':')
+            if colon <= 0:
+                raise ValueError
+            name = line[:colon].lower()
+            if name in WANTED_HEADERS:
+                self.headers[name] = line[colon + 1:].strip()
+        raise ValueError
+
+
+class BodyReader:
+    """
+    A request's body, sent with a Content-Length or chunked, handed out in
+    pieces of at most the size asked for; read() returns b'' at its end.
+    Raises ValueError for a malformed body or one cut short.
+    """
+    def __init__(self, request, timeout_ms=IDLE_TIMEOUT_MS):
+        self._request = request
+        self._timeout_ms = timeout_ms
+        self.chunked = b'chunked' in request.header(b'transfer-encoding', b'').lower()
+        length = request.header(b'content-length')
+        self.has_length = self.chunked or length is not None
+        self._left = 0 if self.chunked or length is None else int(length) # Of the body, or of the current chunk
+        if self._left < 0:
+            raise ValueError
+        self.done = not self.chunked and not self._left
+        self.received = 0
+        request.body = self # So the router knows how much is left to skip
+
+    async def _line(self):
+        line = await self._request.readline(self._timeout_ms)
+        if not line.endswith(b'\n'):
+            raise ValueError
+        return line
+
+    async def read(self, n):
+        if self.done:
+            return b''
+        if not self._left:
+            # Chunked: a hex size line (extensions after ';' are ignored), or 0 and the trailers.
+            line = await self._line()
+            end = line.find(b';')
+            size = int((line if end < 0 else line[:end]).strip().decode(), 16)
+            if not size:
+                while (await self._line()).strip():
+                    pass
+                self.done = True
+                return b''
+            self._left = size
+        data = await self._request.read(min(n, self._left), self._timeout_ms)
+        if not data:
+            raise ValueError # Connection closed mid-body
+        self._left -= len(data)
+        self.received += len(data)
+        if not self._left:
+            if not self.chunked:
+                self.done = True
+            elif (await self._line()).strip():
+                raise ValueError # Chunk data must be followed by CRLF
+        return data
+
+
+def write_head(writer, status, content_type=None, length=None, extra=b''):
+    """Writes a status line and headers; length=None means the body runs until the connection closes."""
+    writer.write(b'HTTP/1.1 %d %s\r\n' % (status, _REASONS.get(status, b'')))
+    if content_type:
+        writer.write(b'Content-Type: %s\r\n' % content_type)
+    if length is not None:
+        writer.write(b'Content-Length: %d\r\n' % length)
+    writer.write(extra)
+    writer.write(b'\r\n')
+
+
+def write_error(writer, status, extra=b''):
+    """Writes a complete, body-less error response (keeps the connection usable)."""
+    write_head(writer, status, length=0, extra=extra)
+
+
+async def _close_writer(writer):
+    try:
+        writer.close()
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+
+class Router:
+    """
+    Maps exact paths to handlers. A handler is `async def handler(request, writer)`
+    and returns True if its response carried a Content-Length (or no body), so
+    the connection can be kept open for the next request.
+    """
+    def __init__(self):
+        self.routes = {}
+        self.requests = 0
+
+    def route(self, path, handler, methods=(b'GET',)):
+        self.routes[path] = (methods, handler)
+
+    async def serve_connection(self, reader, writer):
+        request = Request(reader)
+        timeout_ms = FIRST_REQUEST_TIMEOUT_MS
+        try:
+            for _ in range(MAX_REQUESTS_PER_CONNECTION):
+                try:
+                    if not await request.read_head(timeout_ms):
+                        break
+                except LineTooLong as e:
+                    write_error(writer, e.status, b'Connection: close\r\n')
+                    break
+                except ValueError:
+                    write_error(writer, 400, b'Connection: close\r\n')
+                    break
+                self.requests += 1
+                keep = await self._dispatch(request, writer) and request.keep_alive()
+                await writer.drain()
+                if keep:
+                    keep = await request.skip_body()
+                if not keep:
+                    break
+                timeout_ms = IDLE_TIMEOUT_MS
+        except asyncio.TimeoutError:
+            pass # Idle or stalled client; only this connection's task was waiting
+        except OSError as e:
+            if e.args and e.args[0] not in (104, 110): # ECONNRESET / ETIMEDOUT are normal for browsers
+                print('Error serving connection: %s' % str(e))
+        finally:
+            await _close_writer(writer)
+
+    async def _dispatch(self, request, writer):
+        entry = self.routes.get(request.path)
+        if entry is None:
+            write_error(writer, 404)
+            return True
+        methods, handler = entry
+        if request.method not in methods:
+            write_error(writer, 405, b'Allow: %s\r\n' % b', '.join(methods))
+            return True
+        return await handler(request, writer)
@@ -0,0 +1,125 @@
+# keypad_scanner.py - Non-blocking 4x4 matrix keypad scanner
+# scan() does one bounded pass over the matrix and never sleeps: debouncing
+# and hold detection are tracked per key across calls, and the results are
+# queued as (event, key) pairs for the main loop to drain with get().
+import time
+
+# --- Event types ---
+PRESS = 1
+RELEASE = 2
+HOLD = 3
+
+# --- Per-key states ---
+_UP = 0
+_DEBOUNCE_DOWN = 1
+_DOWN = 2
+_HELD = 3
+_DEBOUNCE_UP = 4
+_DEBOUNCE_UP_HELD = 5
+
+
+class KeypadScanner:
+    """
+    rows are output Pins, cols are input Pins with pull-ups, keys is a
+    rows x cols table of key labels. Call scan() every few milliseconds.
+    """
+    def __init__(self, rows, cols, keys, debounce_ms=20, hold_ms=1000, queue_size=16):
+        self.rows = rows
+        self.cols = cols
+        self.keys = keys
+        self.debounce_ms = debounce_ms
+        self.hold_ms = hold_ms
+        n = len(rows) * len(cols)
+        self._state = bytearray(n)
+        self._since = [0] * n
+        self._active = 0 # Keys not in the _UP state
+        # Event ring buffer
+        self._events = [None] * queue_size
+        self._head = 0
+        self._count = 0
+        self.overflows = 0
+        self._drive_all(0)
+
+    def _drive_all(self, level):
+        for row_pin in self.rows:
+            row_pin.value(level)
+
+    def _push(self, event, key):
+        size = len(self._events)
+        if self._count == size:
+            self.overflows += 1 # Queue full: newer events are dropped, order is kept
+            return
+        self._events[(self._head + self._count) % size] = (event, key)
+        self._count += 1
+
+    def get(self):
+        """Returns the oldest (event, key) pair, or None if nothing happened."""
+        if self._count == 0:
+            return None
+        item = self._events[self._head]
+        self._events[self._head] = None
+        self._head = (self._head + 1) % len(self._events)
+        self._count -= 1
+        return item
+
+    def scan(self):
+        """One scan step; cheap (one read per column) while no key is down."""
+        cols = self.cols
+        if not self._active:
+            # Idle: all rows are held low, so any pressed key pulls its column low.
+            for col_pin in cols:
+                if col_pin.value() == 0:
+                    break
+            else:
+                return
+            self._drive_all(1) # Rows stay high between scans while keys are active
+
+        now = time.ticks_ms()
+        num_cols = len(cols)
+        for r in range(len(self.rows)):
+            row_pin = self.rows[r]
+            row_pin.value(0)
+            for c in range(num_cols):
+                self._update(r * num_cols + c, cols[c].value() == 0, now)
+            row_pin.value(1)
+
+        if not self._active:
+            self._drive_all(0) # Back to the cheap idle check
+
+    def _update(self, i, pressed, now):
+        state = self._state[i]
+        if state == _UP:
+            if pressed:
+                self._set(i, _DEBOUNCE_DOWN, now)
+                self._active += 1
+            return
+        elapsed = time.ticks_diff(now, self._since[i])
+        if state == _DEBOUNCE_DOWN:
+            if not pressed:
+                self._set(i, _UP, now)
+                self._active -= 1
+            elif elapsed >= self.debounce_ms:
+                self._set(i, _DOWN, now)
+                self._push(PRESS, self._key(i))
+        elif state == _DOWN or state == _HELD:
+            if not pressed:
+                self._set(i, _DEBOUNCE_UP_HELD if state == _HELD else _DEBOUNCE_UP, now)
+            elif state == _DOWN and elapsed >= self.hold_ms:
+                self._state[i] = _HELD
+                self._push(HOLD, self._key(i))
+        else: # _DEBOUNCE_UP / _DEBOUNCE_UP_HELD
+            if pressed:
+                # Contact bounce while releasing; the key is still down.
+                self._state[i] = _HELD if state == _DEBOUNCE_UP_HELD else _DOWN
+            elif elapsed >= self.debounce_ms:
+                self._set(i, _UP, now)
+                self._active -= 1
+                self._push(RELEASE, self._key(i))
+
+    def _set(self, i, state, now):
+        self._state[i] = state
+        self._since[i] = now
+
+    def _key(self, i):
+        num_cols = len(self.cols)
+        return self.keys[i // num_cols][i % num_cols]
@@ -1,20 +1,27 @@
 # lcd_api.py - Basic API for HD44780 LCD in 4-bit mode
-from machine import Pin
 import time
+from lcd_transport import PinTransport
 
 class LcdApi:
     """
     Generic LCD API for HD44780 compatible displays.
     Supports 4-bit mode.
     """
-    def __init__(self, rs_pin, e_pin, d4_pin, d5_pin, d6_pin, d7_pin, num_lines=2, num_columns=16):
-        self.rs_pin = Pin(rs_pin, Pin.OUT)
-        self.e_pin = Pin(e_pin, Pin.OUT)
-        # Data pins are listed from D4 to D7, so index 0 is D4, 1 is D5, etc.
-        self.data_pins = [Pin(d4_pin, Pin.OUT), Pin(d5_pin, Pin.OUT), Pin(d6_pin, Pin.OUT), Pin(d7_pin, Pin.OUT)]
+    def __init__(self, rs_pin, e_pin, d4_pin, d5_pin, d6_pin, d7_pin, num_lines=2, num_columns=16,
+                 transport=PinTransport, rw_pin=None, busy_flag=False):
+        # The transport owns the pins; pass PortTransport for single-write data lines.
+        # Timed waits are the default; busy_flag=True with rw_pin polls the busy flag
+        # instead, which is only safe with a 3.3V display (see lcd_transport.py).
+        self.transport = transport(rs_pin, e_pin, d4_pin, d5_pin, d6_pin, d7_pin, rw_pin, busy_flag)
         self.num_lines = num_lines
         self.num_columns = num_columns
 
+        # Shadow copy of what is on screen, one bytearray per line, plus the
+        # cursor position, so render() can skip cells that already match.
+        self._shadow = [bytearray(b' ' * num_columns) for _ in range(num_lines)]
+        self._cursor_col = 0
+        self._cursor_row = 0
+
         # HD44780 commands
         self.CMD_CLEAR_DISPLAY = 0x01
         self.CMD_RETURN_HOME = 0x02
@@ -36,30 +43,14 @@ class LcdApi:
 
         self.init_display()
 
-    def _pulse_enable(self):
-        """Puts a short pulse on the Enable pin."""
-        self.e_pin.value(0)
-        time.sleep_us(1)
-        self.e_pin.value(1) # High pulse
-        time.sleep_us(1)
-        self.e_pin.value(0)
-        time.sleep_us(100) # Commands need this time to settle
-
     def _send_4_bits(self, data):
-        """Sends 4 bits of data to the LCD data pins."""
-        for i in range(4):
-            self.data_pins[i].value((data >> i) & 0x01) # Set D4-D7 based on data bits
-        self._pulse_enable()
+        """Sends 4 bits of data to the LCD data pins (only used during initialization)."""
+        self.transport.write_nibble(data)
+        time.sleep_us(100) # Commands need this time to settle
 
     def _send_byte(self, value, mode):
-        """Sends a full byte (8 bits) by splitting it into two 4-bit nibbles."""
-        self.rs_pin.value(mode) # Set RS pin for Command or Data mode
-        time.sleep_us(50) # RS setup time
-
-        # Send high nibble first (D7-D4)
-        self._send_4_bits(value >> 4)
-        # Send low nibble second (D3-D0)
-        self._send_4_bits(value & 0x0F)
+        """Sends a full byte (8 bits); the transport handles nibbles and command timing."""
+        self.transport.write_byte(value, mode)
 
     def command(self, cmd):
         """Sends a command byte to the LCD."""
@@ -73,8 +64,7 @@ class LcdApi:
         """Initializes the LCD into 4-bit mode."""
         time.sleep_ms(50) # Power-on delay according to HD44780 datasheet
 
-        self.rs_pin.value(0) # Start in Command mode
-        self.e_pin.value(0)
+        self.transport.set_rs(self.RS_COMMAND) # Start in Command mode
 
         # Required initialization sequence for 4-bit mode (see HD44780 datasheet)
         # Send 0x03 three times (these are 8-bit commands, but only D4-D7 are used)
@@ -106,13 +96,18 @@ class LcdApi:
 
     def clear(self):
         """Clears the LCD display."""
-        self.command(self.CMD_CLEAR_DISPLAY)
-        time.sleep_ms(2) # Clear display requires longer time
+        self.command(self.CMD_CLEAR_DISPLAY) # The transport waits the long clear time
+        for line in self._shadow:
+            for i in range(len(line)):
+                line[i] = 0x20
+        self._cursor_col = 0
+        self._cursor_row = 0
 
     def home(self):
         """Sets the cursor to the home position (0,0)."""
-        self.command(self.CMD_RETURN_HOME)
-        time.sleep_ms(2) # Return home requires longer time
+        self.command(self.CMD_RETURN_HOME) # The transport waits the long home time
+        self._cursor_col = 0
+        self._cursor_row = 0
 
     def set_cursor(self, col, row):
         """Sets the cursor position (column, row)."""
@@ -120,8 +115,42 @@ class LcdApi:
             self.command(self.CMD_SET_DDRAM_ADDR | (col & 0x7F))
         elif row == 1:
             self.command(self.CMD_SET_DDRAM_ADDR | (0x40 + (col & 0x7F))) # Second line address offset
+        self._cursor_col = col
+        self._cursor_row = row
+
+    def _write_char(self, char_code):
+        """Writes one character at the cursor and keeps the shadow buffer in step."""
+        self.data(char_code)
+        col = self._cursor_col
+        if col < self.num_columns and self._cursor_row < self.num_lines:
+            self._shadow[self._cursor_row][col] = char_code
+        self._cursor_col = col + 1
 
     def message(self, text):
         """Writes a string message to the LCD at the current cursor position."""
         for char in text:
-            self.data(ord(char)) # Send ASCII value of character
+            self._write_char(ord(char)) # Send ASCII value of character
+
+    def write_line(self, row, text):
+        """
+        Makes line `row` show `text`, a str or bytes-like (padded or cut to the display width),
+        sending only the characters that differ from what is already on screen.
+        Each run of changed cells costs one set_cursor plus one write per cell.
+        """
+        shadow = self._shadow[row]
+        width = self.num_columns
+        n = len(text)
+        chars = isinstance(text, str) # Otherwise bytes/bytearray, whose items are already codes
+        col = 0
+        while col < width:
+            code = (ord(text[col]) if chars else text[col]) if col < n else 0x20
+            if shadow[col] != code:
+                if self._cursor_row != row or self._cursor_col != col:
+                    self.set_cursor(col, row)
+                self._write_char(code)
+            col += 1
+
+    def render(self, lines):
+        """Shows one string per display line, updating only the cells that changed."""
+        for row in range(self.num_lines):
+            self.write_line(row, lines[row] if row < len(lines) else "")
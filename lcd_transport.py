@@ -0,0 +1,112 @@
+# lcd_transport.py - Bus back-ends for LcdApi (HD44780 in 4-bit mode)
+# LcdApi decides *what* to send; a transport decides *how* the bits reach the
+# display pins and how long to wait for the controller afterwards.
+#
+# Timed mode (sleeping from the datasheet's timing table) is the default and
+# never turns the data pins into inputs. Busy-flag mode has the LCD drive
+# D4-D7, so it is only safe with a 3.3V display or a level shifter: a 5V
+# HD44780 would drive 5V into the RP2040's GPIOs, which are not 5V tolerant.
+from machine import Pin, mem32
+import time
+
+# --- HD44780 timing (microseconds) ---
+EXEC_US_SHORT = 40     # Data writes and most commands (datasheet: 37 us)
+EXEC_US_LONG = 1600    # Clear display / return home (datasheet: 1.52 ms)
+BUSY_TIMEOUT_US = 5000 # Give up on the busy flag after this long
+
+# --- RP2040 SIO registers used by PortTransport ---
+SIO_GPIO_OUT = 0xD0000010
+SIO_GPIO_OUT_XOR = 0xD000001C
+
+
+def exec_time_us(value, rs):
+    """Timing table: only clear (0x01) and home (0x02/0x03) need the long wait."""
+    if rs == 0 and value < 0x04:
+        return EXEC_US_LONG
+    return EXEC_US_SHORT
+
+
+class PinTransport:
+    """
+    Drives D4-D7 with one Pin.value() call per line, so it works with any wiring.
+    With busy_flag=True (and RW wired to rw_pin) the busy flag is polled instead of
+    sleeping from the timing table; 3.3V displays only (see above). An rw_pin without
+    busy_flag is just held low, so the display is only ever written to.
+    """
+    def __init__(self, rs_pin, e_pin, d4_pin, d5_pin, d6_pin, d7_pin, rw_pin=None, busy_flag=False):
+        if busy_flag and rw_pin is None:
+            raise ValueError("busy_flag needs rw_pin")
+        self.rs_pin = Pin(rs_pin, Pin.OUT)
+        self.e_pin = Pin(e_pin, Pin.OUT)
+        # Data pins are listed from D4 to D7, so index 0 is D4, 1 is D5, etc.
+        self.data_pins = [Pin(d4_pin, Pin.OUT), Pin(d5_pin, Pin.OUT), Pin(d6_pin, Pin.OUT), Pin(d7_pin, Pin.OUT)]
+        self.rw_pin = Pin(rw_pin, Pin.OUT) if rw_pin is not None else None
+        if self.rw_pin:
+            self.rw_pin.value(0)
+        self.busy_flag = busy_flag
+        self._rs = -1
+
+    def _set_data(self, nibble):
+        for i in range(4):
+            self.data_pins[i].value((nibble >> i) & 0x01) # Set D4-D7 based on data bits
+
+    def set_rs(self, rs):
+        """Selects command (0) or data (1) mode; skipped when already set."""
+        if rs != self._rs:
+            self.rs_pin.value(rs)
+            self._rs = rs
+
+    def write_nibble(self, nibble):
+        """Puts a nibble on D4-D7 and clocks it in with one Enable pulse."""
+        self._set_data(nibble)
+        # A Pin.value() call already takes longer than the 450 ns minimum pulse width.
+        self.e_pin.value(1)
+        self.e_pin.value(0)
+
+    def write_byte(self, value, rs):
+        """Sends a full byte as two nibbles, then waits until the controller is ready."""
+        self.set_rs(rs)
+        self.write_nibble(value >> 4)   # High nibble first (D7-D4)
+        self.write_nibble(value & 0x0F) # Low nibble second (D3-D0)
+        if self.busy_flag:
+            self.wait_ready()
+        else:
+            time.sleep_us(exec_time_us(value, rs))
+
+    def wait_ready(self):
+        """Polls the busy flag on D7 until the controller has finished the last instruction (busy_flag mode)."""
+        for pin in self.data_pins:
+            pin.init(Pin.IN)
+        self.set_rs(0)
+        self.rw_pin.value(1)
+        e = self.e_pin
+        d7 = self.data_pins[3]
+        start = time.ticks_us()
+        while True:
+            e.value(1)
+            busy = d7.value()
+            e.value(0)
+            e.value(1) # Second nibble carries the address counter, which is not needed
+            e.value(0)
+            if not busy or time.ticks_diff(time.ticks_us(), start) > BUSY_TIMEOUT_US:
+                break
+        self.rw_pin.value(0)
+        for pin in self.data_pins:
+            pin.init(Pin.OUT)
+
+
+class PortTransport(PinTransport):
+    """
+    RP2040 back-end that updates D4-D7 with a single SIO register write.
+    D4-D7 must be wired to consecutive GPIOs (GP6-GP9 in the default wiring).
+    """
+    def __init__(self, rs_pin, e_pin, d4_pin, d5_pin, d6_pin, d7_pin, rw_pin=None, busy_flag=False):
+        if (d5_pin, d6_pin, d7_pin) != (d4_pin + 1, d4_pin + 2, d4_pin + 3):
+            raise ValueError("PortTransport needs D4-D7 on consecutive GPIOs")
+        super().__init__(rs_pin, e_pin, d4_pin, d5_pin, d6_pin, d7_pin, rw_pin, busy_flag)
+        self.shift = d4_pin
+        self.mask = 0x0F << d4_pin
+
+    def _set_data(self, nibble):
+        # XOR-ing in the difference flips exactly the data lines that must change.
+        mem32[SIO_GPIO_OUT_XOR] = (mem32[SIO_GPIO_OUT] ^ (nibble << self.shift)) & self.mask
@@ -1,8 +1,22 @@
-import network
-import time
+from boot_timer import boot # First, so the boot clock starts as early as possible
 from machine import Pin, Timer, SPI
-import usocket as socket
 import urandom
+import runtime
+import event_stream
+import keypad_scanner
+import tag_store
+import tag_db
+import tag_presence
+import code_entry
+import poll_schedule
+import event_log
+import dual_core
+import heap_monitor
+import timer_wheel
+import multi_door
+import state_store
+# The web side (network, status_page, http_router, ...) is imported later, in setup_network().
+boot.mark("imports")
 
 # --- Network Configuration ---
 ssid = 'Wifi'
@@ -18,18 +32,32 @@ KNOWN_AP_MAC_BYTES = b'\x3e\xda\x3d\x76\xc9\xc8generate ' # <--- CONFIRM AND REP
 WEB_PORT = 80
 MAX_CONNECTIONS = 5
 
+# The last DHCP-assigned address is cached here and reused as a static configuration,
+# which skips DHCP on the next connect. Set to None to always use DHCP.
+IP_CACHE_PATH = "wifi.cfg"
+
 # --- LED Configuration ---
 led = Pin("LED", Pin.OUT)
 timer = Timer()
 
-# --- Global variables to store network details and dynamic data ---
-ip_address = "N/A"
-ap_mac_formatted = "N/A"
-rssi = "N/A"
-random_number_for_keypad = ""
-keypad_input_buffer = ""
-lock_status_message = "Awaiting RFID/Keypad input..."
-last_lock_action_time = 0
+# --- Shared state ---
+# What the LCD, the web page, /api/status and /events show lives in one StateStore
+# (state_store.py): typed fields, a version counter and subscribers told about changes.
+IDLE_STATUS = "Awaiting RFID/Keypad input..."
+STATE_FIELDS = (
+    ('ssid', str, ssid),
+    ('bssid', str, "N/A"),
+    ('ip', str, "N/A"),
+    ('rssi', (int, str), "N/A"), # "N/A" while WiFi is down
+    ('lock', str, "closed"),
+    ('status', str, IDLE_STATUS),
+    ('code', str, ""),           # The active door's code
+    ('events', int, 0),          # seq of the latest access event
+    ('tone', str, "info"),       # info, open or denied: colours the status line
+    ('keypad', str, ""),         # Digits typed so far
+)
+# Written by the door logic; the other fields are the network side's.
+HARDWARE_FIELDS = ('lock', 'status', 'tone', 'code', 'keypad')
 
 # --- Hardware Pin Assignments ---
 RFID_SCK_PIN = 2
@@ -49,20 +77,66 @@ KEYPAD_C4 = 26
 
 RELAY_PIN = 15
 
+# --- Doors ---
+# One (name, RFID SDA/chip select pin, relay pin) entry per door, up to 16. The readers
+# share the SPI bus and reset pins above; each one needs its own chip select and relay.
+DOORS = [
+    ("Front door", RFID_SDA_PIN, RELAY_PIN),
+    # ("Back door", 10, 11),
+]
+
 # --- Lock Configuration ---
 LOCK_OPEN_DURATION_MS = 5000
+CODE_VALID_MS = 60000       # An issued entry code stops working after this long
+INPUT_TIMEOUT_MS = 10000    # A half-typed code is dropped after this long without a key press
+
+# --- Task Scheduling (milliseconds between polls) ---
+RFID_POLL_INTERVAL_MS = 10          # While someone is at the door...
+RFID_IDLE_POLL_INTERVAL_MS = 100    # ...and after RFID_IDLE_AFTER_MS without a tag or key press
+RFID_IDLE_AFTER_MS = 5000
+KEYPAD_POLL_INTERVAL_MS = 10
+KEYPAD_DEBOUNCE_MS = 20
+TIMER_TICK_MS = 10          # Resolution of the timeouts above (see timer_wheel.py)
+LOG_FLUSH_CHECK_INTERVAL_MS = 1000
+IDLE_GC_CHECK_INTERVAL_MS = 1000 # How often to look for an idle moment to collect garbage
+
+# --- Dual-core mode ---
+# With DUAL_CORE = True, the RFID, keypad and relay jobs run in their own loop on the
+# second core, so lock timing no longer depends on how busy the web server is. The two
+# cores then only talk through hardware_state and hardware_messages (see dual_core.py).
+DUAL_CORE = False
+HARDWARE_CORE_PERIOD_MS = 5
+MESSAGE_DRAIN_INTERVAL_MS = 20
+
+# --- Metrics ---
+# With METRICS = True, every hardware stage and web handler is timed into fixed-bucket
+# histograms, served on /metrics in Prometheus text format (see metrics.py). With it off,
+# metrics.py is never imported and nothing is wrapped, so there is no overhead at all.
+METRICS = False
 
 # --- Authorized RFID UIDs ---
 AUTHORIZED_TAGS = [
     [0x04, 0x1A, 0x2B, 0x3C, 0x4D, 0x5E, 0x6F, 0x70] # Replace with your RFID tag UID!
 ]
 
+# Badges come from tags.db in flash (built with tools/build_tag_db.py) when it is present,
+# otherwise from a packed, sorted copy of AUTHORIZED_TAGS.
+TAG_DB_PATH = "tags.db"
+authorized_tags = tag_db.CredentialStore(TAG_DB_PATH, tag_store.TagIndex(AUTHORIZED_TAGS))
+
+# PUT /api/tags replaces tags.db with an uploaded list while the door keeps running
+# (tools/upload_tags.py sends one). Set a long random token, e.g. b"...", to turn it on;
+# None leaves the endpoint off.
+UPLOAD_TOKEN = None
+
 # --- Hardware Initialization ---
-relay = Pin(RELAY_PIN, Pin.OUT)
-relay.value(0)
+# Relays off and every reader deselected before anything else, so no lock clicks open at
+# boot and only the reader being set up answers on the shared SPI bus.
+for _, cs_pin, relay_pin in DOORS:
+    Pin(relay_pin, Pin.OUT, value=0)
+    Pin(cs_pin, Pin.OUT, value=1)
 
 from mfrc522 import MFRC522
-rdr = MFRC522(spi_id=0, sck=Pin(RFID_SCK_PIN), mosi=Pin(RFID_MOSI_PIN), miso=Pin(RFID_MISO_PIN), rst=Pin(RFID_RST_PIN), cs=Pin(RFID_SDA_PIN))
 
 rows = [Pin(KEYPAD_R1, Pin.OUT), Pin(KEYPAD_R2, Pin.OUT), Pin(KEYPAD_R3, Pin.OUT), Pin(KEYPAD_R4, Pin.OUT)]
 cols = [Pin(KEYPAD_C1, Pin.IN, Pin.PULL_UP), Pin(KEYPAD_C2, Pin.IN, Pin.PULL_UP), Pin(KEYPAD_C3, Pin.IN, Pin.PULL_UP), Pin(KEYPAD_C4, Pin.IN, Pin.PULL_UP)]
@@ -72,236 +146,435 @@ keys = [
     ['7', '8', '9', 'C'],
     ['*', '0', '#', 'D']
 ]
+keypad = keypad_scanner.KeypadScanner(rows, cols, keys, debounce_ms=KEYPAD_DEBOUNCE_MS)
+entry = code_entry.CodeEntry() # Digits typed so far, for the door whose badge was scanned last
+
+# Lock auto-close, code expiry and input timeouts (and LCD messages) run off one timer wheel.
+timers = timer_wheel.TimerWheel(TIMER_TICK_MS)
+
+boot.mark("hardware")
+
+# Live status push channel (/events)
+events = event_stream.EventBus()
+
+# Access event log (RAM ring, flushed to log/ in batches; served on /api/events)
+access_log = event_log.EventLog()
+
+# Hardware side -> network side: state changes (only the latest value of each field),
+# and log records and rfid moments
+hardware_state = dual_core.LatestValues(HARDWARE_FIELDS)
+hardware_messages = dual_core.MessageQueue()
+
+# Planned garbage collection and heap figures (/api/memory)
+heap = heap_monitor.HeapMonitor(probe=not DUAL_CORE) # Core 1 must not meet a heap the probe has filled
+
+# The door logic writes state. In dual-core mode the web side reads its own copy, web_state,
+# which hears of the hardware side's changes through hardware_state; only core 0 touches it.
+state = state_store.StateStore(STATE_FIELDS)
+web_state = state_store.StateStore(STATE_FIELDS) if DUAL_CORE else state
+
+# --- WiFi supervision ---
+# The supervisor connects in the background and keeps retrying (with backoff) while the link
+# is down; the web server only runs while it is up. Access control never waits on WiFi.
+known_mac_display = ':'.join('{:02x}'.format(b) for b in KNOWN_AP_MAC_BYTES)
+web_server = None
+wifi = None # Created by setup_network()
+
+async def on_wifi_up(supervisor):
+    global web_server
+    web_state.set('bssid', known_mac_display)
+    web_state.set('ip', supervisor.ip)
+    web_state.set('rssi', supervisor.rssi)
+
+    print("\nWiFi Connection Details:")
+    print("------------------------")
+    print("Connected to:", ssid)
+    print("AP MAC (BSSID):", known_mac_display)
+    print("IP Address:", supervisor.ip)
+    print("Signal Strength:", supervisor.rssi, "dBm")
+    print("------------------------")
 
-# --- Function to connect to WiFi ---
-def connect_to_wifi():
-    global ip_address, ap_mac_formatted, rssi
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-
-    known_mac_display = ':'.join('{:02x}'.format(b) for b in KNOWN_AP_MAC_BYTES)
-    print(f"Attempting to connect to SSID: {ssid} with known BSSID: {known_mac_display}")
-
-    if not wlan.isconnected():
-        print("Connecting to WiFi...")
-        try:
-            # Connect using SSID, password, AND the specific BSSID.
-            # If wlan.connect() succeeds and wlan.isconnected() is True,
-            # it means it has connected to this specific BSSID.
-            wlan.connect(ssid, password, bssid=KNOWN_AP_MAC_BYTES)
-        except OSError as e:
-            # Handle potential immediate connection errors (e.g., if BSSID not found at all)
-            print(f"Initial connection attempt failed: {e}. BSSID might not be available or incorrect.")
-            return False
-
-        # Wait for connection (max 10 seconds)
-        for _ in range(100):
-            if wlan.isconnected():
-                break # If connected, we assume it's to the specified BSSID
-            time.sleep(0.1)
-
-    # Final check if truly connected.
-    # Since we used bssid in wlan.connect(), if wlan.isconnected() is True,
-    # we're connected to the desired specific access point.
-    if wlan.isconnected():
-        ip_address = wlan.ifconfig()[0]
-        rssi = wlan.status('rssi')
-        # For displaying the AP MAC, we can directly use the KNOWN_AP_MAC_BYTES
-        # converted to string, as that's what we connected to.
-        ap_mac_formatted = known_mac_display
-            
-        print("\nWiFi Connection Details:")
-        print("------------------------")
-        print("Connected to:", ssid)
-        print("AP MAC (BSSID):", ap_mac_formatted)
-        print("IP Address:", ip_address)
-        print("Signal Strength:", rssi, "dBm")
-        print("------------------------")
-        return True
-    else:
-        print("\nFailed to connect to WiFi with specified BSSID.")
-        print("Connection Status:", wlan.status())
-        # Ensure it's disconnected if any partial/improper connection occurred
-        if wlan.isconnected():
-            wlan.disconnect()
-        return False
+    timer.init(freq=2.5, mode=Timer.PERIODIC, callback=lambda t: led.toggle())
+    first_boot = boot.elapsed_ms("web server") is None
+    if first_boot:
+        boot.mark("wifi (cached IP)" if supervisor.static else "wifi (DHCP)")
+    if web_server: # The WiFi task was restarted while the link stayed up
+        web_server.close()
+    web_server = await runtime.serve(router.serve_connection, WEB_PORT, MAX_CONNECTIONS)
+    print("Web server listening on http://%s:%s" % (supervisor.ip, WEB_PORT))
+    if first_boot:
+        boot.mark("web server")
+        boot.save()
+
+async def on_wifi_down(supervisor):
+    global web_server
+    web_state.set('bssid', "N/A")
+    web_state.set('ip', "N/A")
+    web_state.set('rssi', "N/A")
+    print("WiFi connection lost; web server stopped.")
 
-# --- Rest of the functions (generate_random_5digit_number, open_lock, close_lock, read_keypad, hardware_loop, serve_web_page)
-#    remain UNCHANGED.
+    timer.init(freq=1, mode=Timer.PERIODIC, callback=lambda t: led.toggle())
+    if web_server:
+        # Stops accepting; open connections fail on their own once the link is gone.
+        web_server.close()
+        web_server = None
 
 def generate_random_5digit_number():
     return str(urandom.getrandbits(14) % 90000 + 10000)
 
-def open_lock():
-    global last_lock_action_time, lock_status_message
-    print("Lock opened!")
-    relay.value(1)
-    lock_status_message = "Lock is OPEN!"
-    last_lock_action_time = time.ticks_ms()
-
-def close_lock():
-    global lock_status_message
-    print("Lock closed!")
-    relay.value(0)
-    lock_status_message = "Awaiting RFID/Keypad input..."
-
-def read_keypad():
-    for r_idx, row_pin in enumerate(rows):
-        row_pin.value(0)
-        for c_idx, col_pin in enumerate(cols):
-            if col_pin.value() == 0:
-                time.sleep_ms(20)
-                if col_pin.value() == 0:
-                    key = keys[r_idx][c_idx]
-                    while col_pin.value() == 0:
-                        time.sleep_ms(10)
-                    row_pin.value(1)
-                    return key
-        row_pin.value(1)
-    return None
+def set_status(message, tone="info"):
+    state.set('status', message)
+    state.set('tone', tone)
 
-def hardware_loop():
-    global keypad_input_buffer, random_number_for_keypad, lock_status_message
-
-    if relay.value() == 1 and (time.ticks_ms() - last_lock_action_time) > LOCK_OPEN_DURATION_MS:
-        close_lock()
-
-    (status, tag_type) = rdr.request(rdr.REQIDL)
-    if status == rdr.OK:
-        (status, uid) = rdr.SelectTag(tag_type)
-        if status == rdr.OK:
-            if uid in AUTHORIZED_TAGS:
-                print("Authorized RFID Tag detected! Enter 5-digit number on keypad.")
-                lock_status_message = "Authorized RFID. Enter code on keypad."
-                random_number_for_keypad = generate_random_5digit_number()
-                keypad_input_buffer = ""
-            else:
-                print("Unauthorized RFID Tag.")
-                lock_status_message = "Unauthorized RFID Tag."
-                random_number_for_keypad = ""
-                keypad_input_buffer = ""
-    
-    key = read_keypad()
+def set_door_status(door, message, tone="info"):
+    # With several doors, the status line says which one it is about.
+    set_status(message if len(doors) == 1 else door.name + ": " + message, tone)
+
+def set_code(door, code):
+    door.code = code
+    if code:
+        timers.schedule(door.code_timer, CODE_VALID_MS)
+    else:
+        timers.cancel(door.code_timer)
+    if door is active_door: # The code shown is the one the keypad answers; other doors keep theirs
+        state.set('code', code)
+
+def notify(kind, value=None, extra=None):
+    # Log records and rfid moments (not state). On one core this is a plain call;
+    # in dual-core mode the message crosses over through the queue.
+    if DUAL_CORE:
+        hardware_messages.put(kind, value, extra)
+    else:
+        on_hardware_message(kind, value, extra)
+
+def on_hardware_message(kind, value, extra):
+    # Runs on the network side (core 0).
+    if kind == "log":
+        access_log.record(value, extra)
+        web_state.set('events', access_log.seq)
+    else:
+        events.publish(kind, value)
+
+def forward_state(name, value):
+    hardware_state.put(name, value)
+
+def push_state(name, value):
+    if name == "code" and not value:
+        return # A cleared code is not pushed; the page keeps showing the last one
+    events.publish(name, value)
+
+if DUAL_CORE:
+    state.subscribe(HARDWARE_FIELDS, forward_state)
+web_state.subscribe(HARDWARE_FIELDS, push_state)
+
+def drain_hardware_messages():
+    hardware_state.drain(web_state.set)
+    hardware_messages.drain(on_hardware_message)
+
+def open_lock(door):
+    print("Lock opened!", door.name)
+    notify("log", event_log.door_event(event_log.LOCK_OPEN, door.number))
+    door.relay.value(1)
+    set_door_status(door, "Lock is OPEN!", "open")
+    state.set('lock', "open")
+    timers.schedule(door.lock_timer, LOCK_OPEN_DURATION_MS)
+
+def close_lock(door):
+    print("Lock closed!", door.name)
+    notify("log", event_log.door_event(event_log.LOCK_CLOSE, door.number))
+    timers.cancel(door.lock_timer)
+    door.relay.value(0)
+    set_door_status(door, IDLE_STATUS)
+    state.set('lock', "open" if any_lock_open() else "closed") # The web side shows one lock: open while any door is
+
+def any_lock_open():
+    for door in doors:
+        if door.is_open():
+            return True
+    return False
+
+# --- Timeouts (run from timers.advance()) ---
+
+def code_expired(door):
+    print("Entry code expired.", door.name)
+    set_code(door, "")
+    if door is active_door:
+        clear_entry() # The half-typed code was for this door
+    set_door_status(door, "Code expired. Scan RFID again.")
+
+def input_timed_out():
+    print("Keypad input timed out.")
+    clear_entry()
+    set_status("Input timed out.")
+    state.set('keypad', "")
+
+def clear_entry():
+    entry.clear()
+    timers.cancel(input_timer)
+
+input_timer = timer_wheel.Timer(input_timed_out)
+
+def poll_rfid(door):
+    global active_door
+    # A badge left on the reader is one presentation: no new code, no wiped input.
+    uid = door.presence.scan(door.reader)
+    if door.presence.holding:
+        door.schedule.activity()
+    if uid is None:
+        return
+    if uid in authorized_tags:
+        print("Authorized RFID Tag detected! Enter 5-digit number on keypad.", door.name)
+        notify("log", event_log.door_event(event_log.TAG_AUTHORIZED, door.number), uid)
+        set_door_status(door, "Authorized RFID. Enter code on keypad.")
+        active_door = door # The keypad now answers this door's challenge
+        clear_entry()
+        notify("rfid", "authorized")
+        set_code(door, generate_random_5digit_number())
+    else:
+        print("Unauthorized RFID Tag.", door.name)
+        notify("log", event_log.door_event(event_log.TAG_UNAUTHORIZED, door.number), uid)
+        set_door_status(door, "Unauthorized RFID Tag.", "denied")
+        set_code(door, "")
+        if door is active_door:
+            clear_entry()
+        notify("rfid", "unauthorized")
+
+# --- Doors ---
+
+doors = []
+
+def add_door(name, cs_pin, relay_pin):
+    reader = MFRC522(spi_id=0, sck=Pin(RFID_SCK_PIN), mosi=Pin(RFID_MOSI_PIN), miso=Pin(RFID_MISO_PIN), rst=Pin(RFID_RST_PIN), cs=Pin(cs_pin))
+    # Setting up a reader pulses the shared reset line, which resets the readers set up before it too.
+    for door in doors:
+        door.reader.init()
+    schedule = poll_schedule.PollSchedule(RFID_POLL_INTERVAL_MS, RFID_IDLE_POLL_INTERVAL_MS, RFID_IDLE_AFTER_MS)
+    door = multi_door.Door(len(doors), name, reader, Pin(relay_pin, Pin.OUT, value=0), tag_presence.TagPresence(), schedule,
+                           close_lock, code_expired)
+    doors.append(door)
+    return door
+
+for name, cs_pin, relay_pin in DOORS:
+    add_door(name, cs_pin, relay_pin)
+active_door = doors[0] # The door the keypad answers: the one whose badge was scanned last
+readers = multi_door.ReaderScheduler(doors, poll_rfid)
+
+def poll_keypad():
+    # One bounded scan step, then handle whatever the scanner queued up.
+    keypad.scan()
+    event = keypad.get()
+    while event is not None:
+        if event[0] == keypad_scanner.PRESS:
+            active_door.schedule.activity() # Someone is at the door: a badge may be next
+            handle_key(event[1])
+        event = keypad.get()
+
+def handle_key(key):
     if key:
         print("Keypad Input:", key)
         if '0' <= key <= '9':
-            keypad_input_buffer += key
-            lock_status_message = f"Code: {keypad_input_buffer}"
-            if len(keypad_input_buffer) == 5:
-                if keypad_input_buffer == random_number_for_keypad:
+            complete = entry.add(key)
+            timers.schedule(input_timer, INPUT_TIMEOUT_MS)
+            set_status(entry.message())
+            if complete:
+                if entry.matches(active_door.code):
                     print("Correct 5-digit number entered!")
-                    open_lock()
+                    notify("log", event_log.door_event(event_log.CODE_CORRECT, active_door.number))
+                    open_lock(active_door)
                 else:
                     print("Incorrect 5-digit number.")
-                    lock_status_message = "Incorrect code. Try again."
-                keypad_input_buffer = ""
-                random_number_for_keypad = ""
-            elif len(keypad_input_buffer) > 5:
-                keypad_input_buffer = ""
+                    notify("log", event_log.door_event(event_log.CODE_WRONG, active_door.number))
+                    set_status("Incorrect code. Try again.")
+                clear_entry()
+                set_code(active_door, "")
         elif key == '*':
-            keypad_input_buffer = ""
-            random_number_for_keypad = ""
-            lock_status_message = "Input cleared."
-
-def serve_web_page(conn):
-    global ip_address, ap_mac_formatted, rssi, random_number_for_keypad, lock_status_message
-    
-    display_random_number = random_number_for_keypad if random_number_for_keypad else generate_random_5digit_number()
-
-    html = """<!DOCTYPE html>
-<html>
-<head>
-    <title>Pico W Network & Lock Control</title>
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <style>
-        body { font-family: Arial, sans-serif; margin: 20px; background-color: #f0f0f0; color: #333; }
-        .container { background-color: #fff; padding: 20px; border-radius: 8px; box-shadow: 0 0 10px rgba(0,0,0,0.1); }
-        h1 { color: #0056b3; }
-        .network-details { font-size: 1.2em; line-height: 1.6; }
-        .random-number { 
-            font-size: 4em;
-            font-weight: bold;
-            color: #d9534f;
-            text-align: center;
-            margin-top: 30px;
-            margin-bottom: 20px;
-        }
-        .label { font-weight: bold; }
-        .lock-status { 
-            font-size: 1.5em; 
-            font-weight: bold; 
-            margin-top: 20px; 
-            padding: 10px; 
-            border: 2px solid; 
-            border-radius: 5px; 
-            text-align: center;
-        }
-        .lock-open { background-color: #d4edda; border-color: #28a745; color: #155724; }
-        .lock-closed { background-color: #f8d7da; border-color: #dc3545; color: #721c24; }
-        .lock-info { background-color: #ffeeba; border-color: #ffc107; color: #856404; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Raspberry Pi Pico W Security System</h1>
-        
-        <h2>Network Status</h2>
-        <p class="network-details"><span class="label">Connected to:</span> """ + ssid + """</p>
-        <p class="network-details"><span class="label">AP MAC (BSSID):</span> """ + ap_mac_formatted + """</p>
-        <p class="network-details"><span class="label">IP Address:</span> """ + ip_address + """</p>
-        <p class="network-details"><span class="label">Signal Strength:</span> """ + str(rssi) + """ dBm</p>
-        
-        <h2>Current Code for Entry</h2>
-        <div class="random-number">
-            """ + display_random_number + """
-        </div>
-        <p style="text-align: center; font-size: 0.9em; color: #666;">(This code changes upon RFID scan or page refresh. Enter it on the keypad after a valid RFID scan.)</p>
-
-        <h2>Lock Status</h2>
-        <div class="lock-status """ + ("lock-open" if "OPEN" in lock_status_message else ("lock-closed" if "Unauthorized" in lock_status_message else "lock-info")) + """">
-            """ + lock_status_message + """
-        </div>
-    </div>
-</body>
-</html>"""
-    
-    response = "HTTP/1.0 200 OK\r\nContent-type: text/html\r\n\r\n" + html
-    conn.send(response)
+            clear_entry()
+            set_code(active_door, "")
+            set_status("Input cleared.")
+        state.set('keypad', entry.text())
+
+def door_idle():
+    # Nobody at any door (every RFID poll has backed off), nothing typed and the locks shut:
+    # a GC pause now delays nobody.
+    if entry.count:
+        return False
+    for door in doors:
+        if door.schedule.interval_ms != door.schedule.slow_ms or door.is_open():
+            return False
+    return True
 
-# --- Main Program Logic ---
+def collect_garbage():
+    heap.collect_if_idle(door_idle())
 
-if connect_to_wifi():
-    addr = socket.getaddrinfo('0.0.0.0', WEB_PORT)[0][-1]
-    s = socket.socket()
-    s.bind(addr)
-    s.listen(MAX_CONNECTIONS)
-    print("Web server listening on http://%s:%s" % (ip_address, WEB_PORT))
+def hardware_loop():
+    timers.advance()
+    readers.run()
+    poll_keypad()
+
+async def serve_web_page(request, writer):
+    refresh_network_state()
+    values = page_view.get() # Encoded again only after a field the page shows has changed
+    if not web_state.get('code'):
+        values = dict(values) # The cached dict is shared by every visit; the decoy is for this one only
+        values['code'] = generate_random_5digit_number().encode() # No code yet: a new decoy on every visit
+    http_router.write_head(writer, 200, b'text/html', status_page.STATUS_PAGE.length(**values))
+    status_page.STATUS_PAGE.render(writer, **values)
+    return True
+
+def refresh_network_state():
+    # The supervisor re-reads rssi on its own schedule; the store picks it up when someone looks.
+    web_state.set('rssi', wifi.rssi)
+
+def current_status():
+    # Field order is status_api.API_FIELDS; the tuple is rebuilt only after one of them changes.
+    refresh_network_state()
+    return api_view.get()
+
+async def serve_status_api(request, writer):
+    return status_endpoint.respond(writer, request, current_status())
+
+async def serve_event_log(request, writer):
+    return access_log.respond(writer, request)
+
+async def serve_event_stream(request, writer):
+    return await events.serve(writer)
+
+async def serve_memory(request, writer):
+    return heap.respond(writer, request)
+
+async def serve_tag_upload(request, writer):
+    keep = await tag_upload.receive(request, writer, authorized_tags, UPLOAD_TOKEN)
+    if keep:
+        print("Badge database replaced: %d badges" % len(authorized_tags))
+    return keep
+
+async def serve_favicon(request, writer):
+    # Browsers ask for this on every visit; an empty, cacheable answer stops them re-asking.
+    http_router.write_head(writer, 204, extra=b'Cache-Control: max-age=86400\r\n')
+    return True
+
+# --- Metrics ---
+
+def setup_metrics():
+    # Swaps each stage for a timed wrapper; the loop itself is unchanged.
+    global metrics_registry, poll_keypad, hardware_loop
+    import metrics
+    metrics_registry = metrics.Registry()
+    stages = metrics_registry.family("door_stage_duration_seconds", "Time spent in each hardware stage.", "stage")
+    rfid_request = stages.histogram("rfid_request")
+    rfid_select = stages.histogram("rfid_select")
+    for door in doors:
+        door.reader.request = metrics.timed(rfid_request, door.reader.request)
+        door.reader.SelectTag = metrics.timed(rfid_select, door.reader.SelectTag)
+    keypad.scan = metrics.timed(stages.histogram("keypad_scan"), keypad.scan)
+    timers.advance = metrics.timed(stages.histogram("timers"), timers.advance)
+    readers.poll = metrics.timed(stages.histogram("rfid_poll"), readers.poll)
+    poll_keypad = metrics.timed(stages.histogram("keypad_poll"), poll_keypad)
+    hardware_loop = metrics.timed(stages.histogram("hardware_loop"), hardware_loop) # Dual-core mode only
+    heap.collect = metrics.timed(stages.histogram("gc_collect"), heap.collect)
+
+    # Existing counters, read only when /metrics is scraped.
+    # Summed over the doors.
+    metrics_registry.counter("door_rfid_requests_total", "RFID reader polls.", lambda: sum(d.presence.requests for d in doors))
+    metrics_registry.counter("door_rfid_selects_total", "Anticollision/select exchanges run.", lambda: sum(d.presence.selects for d in doors))
+    metrics_registry.counter("door_rfid_selects_skipped_total", "Select exchanges skipped because the tag was still on the reader.", lambda: sum(d.presence.selects_skipped for d in doors))
+    metrics_registry.counter("door_rfid_presentations_total", "New tag presentations.", lambda: sum(d.presence.presentations for d in doors))
+    metrics_registry.counter("door_rfid_polls_total", "RFID polls run by the adaptive schedule.", lambda: readers.polls)
+    metrics_registry.counter("door_rfid_poll_bursts_total", "Switches from the idle to the fast RFID poll rate.", lambda: sum(d.schedule.bursts for d in doors))
+    metrics_registry.counter("door_rfid_poll_backoffs_total", "Switches from the fast to the idle RFID poll rate.", lambda: sum(d.schedule.backoffs for d in doors))
+    metrics_registry.gauge("door_rfid_poll_interval_ms", "Shortest current RFID poll interval.", lambda: min(d.schedule.interval_ms for d in doors))
+    metrics_registry.gauge("door_rfid_poll_late_max_ms", "Furthest past its due time an RFID poll has run.", lambda: readers.max_late_ms)
+    metrics_registry.counter("door_gc_collections_total", "Planned garbage collections.", lambda: heap.collections)
+    metrics_registry.gauge("door_heap_free_bytes", "Free heap after the last check.", heap.free)
+    metrics_registry.gauge("door_heap_allocated_bytes", "Allocated heap.", heap.allocated)
+    metrics_registry.counter("door_keypad_overflows_total", "Key events dropped because the keypad queue was full.", lambda: keypad.overflows)
+    metrics_registry.counter("door_hardware_messages_dropped_total", "Messages dropped between the cores.", lambda: hardware_messages.dropped)
+    metrics_registry.counter("door_core1_failures_total", "Passes of the second core's hardware loop that raised.", lambda: dual_core.failures)
+    metrics_registry.counter("door_event_log_dropped_total", "Access log records dropped before a flush.", lambda: access_log.dropped)
+    metrics_registry.counter("door_http_requests_total", "HTTP requests served.", lambda: router.requests)
+    metrics_registry.counter("door_wifi_attempts_total", "WiFi connection attempts.", lambda: wifi.attempts)
+    metrics_registry.counter("door_wifi_drops_total", "WiFi links lost after being up.", lambda: wifi.drops)
+
+def instrument_routes():
+    import metrics
+    handlers = metrics_registry.family("door_http_handler_duration_seconds", "Time from dispatch to the response being written.", "path")
+    for path in router.routes:
+        methods, handler = router.routes[path]
+        router.routes[path] = (methods, metrics.timed_handler(handlers.histogram(path.decode()), handler))
+    router.route(b'/metrics', metrics_registry.respond)
 
-    timer.init(freq=2.5, mode=Timer.PERIODIC, callback=lambda t: led.toggle())
+# --- Main Program Logic ---
 
-    random_number_for_keypad = generate_random_5digit_number()
-    print("Initial 5-digit code for keypad:", random_number_for_keypad)
-
-    while True:
-        try:
-            conn, addr = s.accept()
-            request = conn.recv(1024)
-            serve_web_page(conn)
-            conn.close()
-        except OSError as e:
-            if e.args[0] == 110:
-                pass
-            elif e.args[0] == 104:
-                pass
-            else:
-                print('Error accepting connection: %s' % str(e))
-
-        hardware_loop()
-        
-        time.sleep_ms(10)
-else:
-    timer.init(freq=1, mode=Timer.PERIODIC, callback=lambda t: led.toggle())
-    print("Web server not started due to WiFi connection failure.")
-    while True:
-        hardware_loop()
-        time.sleep_ms(100)
+def hardware_tasks():
+    # Dual-core: one queue-draining task here, the hardware loop itself on core 1.
+    # Each is a function returning the task's coroutine, so the runtime can restart it.
+    if DUAL_CORE:
+        dual_core.start(hardware_loop, HARDWARE_CORE_PERIOD_MS)
+        return (lambda: runtime.every(MESSAGE_DRAIN_INTERVAL_MS, drain_hardware_messages),)
+    return (lambda: runtime.every(TIMER_TICK_MS, timers.advance),
+            lambda: runtime.paced(readers, readers.run),
+            lambda: runtime.every(KEYPAD_POLL_INTERVAL_MS, poll_keypad))
+
+def setup_network():
+    # Deferred until the door is already working: these imports (the page template
+    # in particular) are the slowest part of boot.
+    global network, status_page, http_router, tag_upload, status_endpoint, page_view, api_view, router, wifi
+    import network
+    import status_page
+    import status_api
+    import http_router
+    import tag_upload
+    import wifi_supervisor
+
+    status_endpoint = status_api.StatusApi()
+    page_view = state_store.View(web_state, status_page.PAGE_FIELDS, status_page.page_values)
+    api_view = state_store.View(web_state, status_api.API_FIELDS, lambda s: s.values(status_api.API_FIELDS))
+
+    # Handlers return True when their response is length-delimited, so HTTP/1.1 clients can keep the connection open.
+    router = http_router.Router()
+    router.route(b'/', serve_web_page)
+    router.route(b'/api/status', serve_status_api)
+    router.route(b'/api/events', serve_event_log)
+    router.route(b'/events', serve_event_stream)
+    router.route(b'/api/memory', serve_memory)
+    router.route(b'/favicon.ico', serve_favicon)
+    if UPLOAD_TOKEN:
+        router.route(b'/api/tags', serve_tag_upload, methods=(b'PUT',))
+    for asset in (status_page.STYLE, status_page.SCRIPT):
+        router.route(asset.url, asset.respond)
+    if METRICS:
+        instrument_routes()
+
+    wifi = wifi_supervisor.WifiSupervisor(network.WLAN(network.STA_IF), ssid, password, bssid=KNOWN_AP_MAC_BYTES,
+                                          on_up=on_wifi_up, on_down=on_wifi_down, cache_path=IP_CACHE_PATH)
+
+async def start_network():
+    # Scheduled after the hardware tasks, so each of them has already run once: the door is live.
+    # A restart after a failure goes straight back to supervising WiFi.
+    if wifi is None:
+        boot.mark("door ready")
+        setup_network()
+        boot.mark("web modules")
+    await wifi.run()
+
+def main():
+    timer.init(freq=1, mode=Timer.PERIODIC, callback=lambda t: led.toggle()) # Slow blink until WiFi is up
+    set_code(active_door, generate_random_5digit_number())
+    print("Initial 5-digit code for keypad:", active_door.code)
+    print(f"Connecting to SSID: {ssid} with known BSSID: {known_mac_display}")
+
+    heap.collect() # Start from a clean heap, with the automatic GC threshold raised
+
+    # Each job is its own task, so neither a slow web client nor a WiFi outage holds up the door.
+    runtime.run(
+        *hardware_tasks(),
+        lambda: runtime.every(LOG_FLUSH_CHECK_INTERVAL_MS, access_log.maybe_flush),
+        lambda: runtime.every(IDLE_GC_CHECK_INTERVAL_MS, collect_garbage),
+        start_network
+    )
+
+if METRICS:
+    setup_metrics()
+
+if __name__ == "__main__":
+    main()
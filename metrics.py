@@ -0,0 +1,130 @@
+# metrics.py - Stage timing histograms and counters in Prometheus text format
+# Every histogram is a few preallocated arrays, and observe() only increments
+# them, so recording a sample never allocates. Instrumentation is attached by
+# wrapping existing functions with timed(); firmware built without it (its
+# METRICS switch off) never imports this module and pays nothing.
+#
+# Samples may be recorded on core 1 and read on core 0 without a lock: a scrape
+# can see a sample half-recorded (count updated, sum not yet), which is fine
+# for monitoring.
+import time
+from array import array
+
+# Upper bucket bounds in microseconds; the +Inf bucket is implicit.
+BUCKETS_US = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+CONTENT_TYPE = b'text/plain; version=0.0.4'
+
+
+class Histogram:
+    """Fixed-bucket latency histogram for one label value of a family."""
+    def __init__(self, label, buckets=BUCKETS_US):
+        self.label = label
+        self.buckets = buckets
+        self.counts = array('I', [0] * (len(buckets) + 1)) # Per bucket, not cumulative
+        self.sum = array('I', [0, 0]) # Seconds, microseconds; keeps every value a small int
+        self.count = 0
+
+    def observe(self, us):
+        buckets = self.buckets
+        i = 0
+        n = len(buckets)
+        while i < n and us > buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        total = self.sum[1] + us
+        if total >= 1000000:
+            self.sum[0] += total // 1000000
+            total %= 1000000
+        self.sum[1] = total
+        self.count += 1
+
+
+class Family:
+    """A metric name with its help text and one Histogram per label value."""
+    def __init__(self, name, help, label_name, buckets=BUCKETS_US):
+        self.name = name.encode()
+        self.help = help.encode()
+        self.label_name = label_name.encode()
+        self.buckets = buckets
+        # "le" label values, formatted once.
+        self._le = [b'%d.%06d' % (b // 1000000, b % 1000000) for b in buckets] + [b'+Inf']
+        self.histograms = []
+
+    def histogram(self, label):
+        h = Histogram(label.encode(), self.buckets)
+        self.histograms.append(h)
+        return h
+
+    def write(self, conn):
+        name = self.name
+        conn.write(b'# HELP %s %s\n# TYPE %s histogram\n' % (name, self.help, name))
+        for h in self.histograms:
+            cumulative = 0
+            for i in range(len(self._le)):
+                cumulative += h.counts[i]
+                conn.write(b'%s_bucket{%s="%s",le="%s"} %d\n' % (name, self.label_name, h.label, self._le[i], cumulative))
+            conn.write(b'%s_sum{%s="%s"} %d.%06d\n' % (name, self.label_name, h.label, h.sum[0], h.sum[1]))
+            conn.write(b'%s_count{%s="%s"} %d\n' % (name, self.label_name, h.label, h.count))
+
+
+class Registry:
+    def __init__(self):
+        self.families = []
+        self.values = [] # (name, help, type, read function)
+
+    def family(self, name, help, label_name, buckets=BUCKETS_US):
+        f = Family(name, help, label_name, buckets)
+        self.families.append(f)
+        return f
+
+    def counter(self, name, help, read):
+        """Exposes read() as a counter; it is only called when /metrics is scraped. None skips it."""
+        self.values.append((name.encode(), help.encode(), b'counter', read))
+
+    def gauge(self, name, help, read):
+        self.values.append((name.encode(), help.encode(), b'gauge', read))
+
+    def write(self, conn):
+        for f in self.families:
+            f.write(conn)
+        for name, help, kind, read in self.values:
+            value = read()
+            if value is None: # Not available on this platform
+                continue
+            conn.write(b'# HELP %s %s\n# TYPE %s %s\n%s %d\n' % (name, help, name, kind, name, value))
+
+    async def respond(self, request, writer):
+        """Serves /metrics; written line by line, so the connection closes afterwards."""
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: %s\r\nConnection: close\r\n\r\n' % CONTENT_TYPE)
+        self.write(writer)
+        return False
+
+
+_NO_ARG = object()
+
+
+def timed(histogram, func):
+    """
+    Wraps a function of zero or one arguments so each call is timed into histogram.
+    (No *args, which would allocate a tuple per call.)
+    """
+    def wrapper(arg=_NO_ARG):
+        start = time.ticks_us()
+        if arg is _NO_ARG:
+            result = func()
+        else:
+            result = func(arg)
+        histogram.observe(time.ticks_diff(time.ticks_us(), start))
+        return result
+    return wrapper
+
+
+def timed_handler(histogram, handler):
+    """Wraps an async HTTP handler(request, writer), timing it until the response is written."""
+    async def wrapper(request, writer):
+        start = time.ticks_us()
+        result = await handler(request, writer)
+        histogram.observe(time.ticks_diff(time.ticks_us(), start))
+        return result
+    return wrapper
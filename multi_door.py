@@ -0,0 +1,79 @@
+# multi_door.py - Several doors driven from one Pico W
+# A Door is one RC522 reader (on the shared SPI bus, with a chip select of its
+# own) and one relay, plus everything that belongs to that door alone: its
+# presence tracking, its poll schedule and its challenge. A code issued at a
+# door only opens that door, and its lock and code timers are its own.
+#
+# ReaderScheduler polls at most one reader per call: the one furthest past its
+# due time, ties going round-robin. A pass of the hardware loop therefore costs
+# one SPI exchange however many doors there are, and no reader waits behind
+# more than the other N - 1, so detection latency stays within a reader's
+# interval plus N - 1 polls.
+import timer_wheel
+
+MAX_DOORS = 16 # The event log keeps the door number in 4 bits
+
+
+class Door:
+    """
+    One door. lock_timeout(door) and code_expired(door) are the callbacks of
+    its lock and code timers.
+    """
+    def __init__(self, number, name, reader, relay, presence, schedule, lock_timeout, code_expired):
+        if number >= MAX_DOORS:
+            raise ValueError("at most %d doors" % MAX_DOORS)
+        self.number = number
+        self.name = name
+        self.reader = reader
+        self.relay = relay
+        self.presence = presence # tag_presence.TagPresence
+        self.schedule = schedule # poll_schedule.PollSchedule
+        self.code = ""           # Issued entry code; "" when none is valid
+        self.lock_timer = timer_wheel.Timer(lambda: lock_timeout(self))
+        self.code_timer = timer_wheel.Timer(lambda: code_expired(self))
+
+    def is_open(self):
+        return self.relay.value() == 1
+
+
+class ReaderScheduler:
+    """Deadline-ordered polling of the doors' readers; poll(door) polls one reader."""
+    def __init__(self, doors, poll):
+        self.doors = doors # Shared with the caller, so doors added later are polled too
+        self.poll = poll
+        self._next = 0     # Where the round-robin tie-break starts
+        # Counters
+        self.polls = 0
+        self.max_late_ms = 0 # Furthest past its due time any poll ran
+
+    def run(self):
+        """Polls the most overdue reader, if any is due; returns the door polled, or None."""
+        doors = self.doors
+        n = len(doors)
+        best = -1
+        late = -1
+        for k in range(n):
+            i = (self._next + k) % n
+            overdue = doors[i].schedule.overdue_ms()
+            if overdue > late:
+                best = i
+                late = overdue
+        if best < 0:
+            return None
+        door = doors[best]
+        self._next = (best + 1) % n
+        self.poll(door)
+        door.schedule.next_ms()
+        self.polls += 1
+        if late > self.max_late_ms:
+            self.max_late_ms = late
+        return door
+
+    def next_ms(self):
+        """How long until the next reader is due (0 if one already is)."""
+        wait = None
+        for door in self.doors:
+            ms = -door.schedule.overdue_ms()
+            if wait is None or ms < wait:
+                wait = ms
+        return wait if wait is not None and wait > 0 else 0
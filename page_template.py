@@ -0,0 +1,58 @@
+# page_template.py - Precompiled HTML templates for the web interface
+# A template is split once, at import time, into immutable bytes segments and
+# named slots. Rendering writes the segments and slot values straight to the
+# connection, so no page-sized string is ever built on the heap.
+
+class PageTemplate:
+    """
+    Template with {name} slots, e.g. PageTemplate("<p>{ip}</p>").
+    Literal braces (as used in CSS) are written as {{ and }}.
+    """
+    def __init__(self, source):
+        self.segments = []
+        self.slots = []
+        i = 0
+        while True:
+            start = source.find('{', i)
+            # Skip escaped '{{' pairs; they stay part of the literal text.
+            while start >= 0 and source[start + 1:start + 2] == '{':
+                start = source.find('{', start + 2)
+            if start < 0:
+                break
+            end = source.index('}', start)
+            self.segments.append(self._literal(source[i:start]))
+            self.slots.append(source[start + 1:end])
+            i = end + 1
+        self.segments.append(self._literal(source[i:]))
+        self.static_size = sum(len(seg) for seg in self.segments)
+
+    @staticmethod
+    def _literal(text):
+        return text.replace('{{', '{').replace('}}', '}').encode()
+
+    @staticmethod
+    def _encode(value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def prepare(self, **values):
+        """Encodes the slot values once; the returned dict renders with no further conversion."""
+        encoded = {}
+        for slot in self.slots:
+            encoded[slot] = self._encode(values[slot])
+        return encoded
+
+    def length(self, **values):
+        """Returns the rendered size in bytes, for a Content-Length header."""
+        size = self.static_size
+        for slot in self.slots:
+            size += len(self._encode(values[slot]))
+        return size
+
+    def render(self, conn, **values):
+        """Writes the page to conn (anything with a write() method) slot by slot."""
+        segments = self.segments
+        slots = self.slots
+        for i in range(len(slots)):
+            conn.write(segments[i])
+            conn.write(self._encode(values[slots[i]]))
+        conn.write(segments[-1])
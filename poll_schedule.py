@@ -0,0 +1,50 @@
+# poll_schedule.py - Adaptive polling interval for the RFID reader
+# Nobody needs a 10 ms tag poll in an empty lobby. PollSchedule runs at the
+# fast interval while there is activity (a tag on the reader, a key pressed)
+# and drops to the slow one once nothing has happened for idle_after_ms. The
+# first sign of activity switches straight back to fast.
+import time
+
+FAST_MS = 10
+SLOW_MS = 100
+IDLE_AFTER_MS = 5000
+
+
+class PollSchedule:
+    def __init__(self, fast_ms=FAST_MS, slow_ms=SLOW_MS, idle_after_ms=IDLE_AFTER_MS):
+        self.fast_ms = fast_ms
+        self.slow_ms = slow_ms
+        self.idle_after_ms = idle_after_ms
+        self.interval_ms = fast_ms
+        now = time.ticks_ms()
+        self._last_activity = now
+        self._last_poll = time.ticks_add(now, -fast_ms) # First due() is true
+        # Counters
+        self.polls = 0
+        self.bursts = 0   # Slow -> fast switches
+        self.backoffs = 0 # Fast -> slow switches
+
+    def activity(self):
+        """Something happened at the door: poll fast from now on."""
+        self._last_activity = time.ticks_ms()
+        if self.interval_ms != self.fast_ms:
+            self.interval_ms = self.fast_ms
+            self.bursts += 1
+
+    def next_ms(self):
+        """Counts a poll that has just run; returns how long to wait before the next one."""
+        self.polls += 1
+        now = time.ticks_ms()
+        self._last_poll = now
+        if self.interval_ms != self.slow_ms and time.ticks_diff(now, self._last_activity) >= self.idle_after_ms:
+            self.interval_ms = self.slow_ms
+            self.backoffs += 1
+        return self.interval_ms
+
+    def due(self):
+        """For loops that run at a fixed period: true once the current interval has passed since the last poll."""
+        return self.overdue_ms() >= 0
+
+    def overdue_ms(self):
+        """How long ago the next poll fell due; negative while it is still ahead."""
+        return time.ticks_diff(time.ticks_ms(), self._last_poll) - self.interval_ms
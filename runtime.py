@@ -0,0 +1,79 @@
+# runtime.py - Cooperative task runtime for the lock firmware
+# Runs on uasyncio on the Pico W and on the standard asyncio module on a PC,
+# so the same tasks can be exercised off-device with the stand-ins in host/.
+#
+# Every task runs under a supervisor: a task that raises is logged and started
+# again after a backoff, so one bug in a handler does not leave the door
+# without its keypad or its lock timers until the next reboot.
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+import time
+
+RESTART_MIN_MS = 100     # Wait before the first restart of a failed task...
+RESTART_MAX_MS = 30000   # ...doubling up to this
+RESTART_RESET_MS = 60000 # A task that ran this long before failing starts again from RESTART_MIN_MS
+
+
+def sleep_ms(ms):
+    """Returns an awaitable that yields to other tasks for ms milliseconds."""
+    return asyncio.sleep(ms / 1000)
+
+
+async def every(period_ms, func):
+    """Calls func() forever, yielding to the other tasks for period_ms between calls."""
+    while True:
+        func()
+        await sleep_ms(period_ms)
+
+
+async def paced(schedule, func):
+    """Like every(), but waits schedule.next_ms() between calls, so the period can change as it runs."""
+    while True:
+        func()
+        await sleep_ms(schedule.next_ms())
+
+
+async def serve(callback, port, backlog):
+    """Starts the web server; callback(reader, writer) is run as its own task for each connection."""
+    return await asyncio.start_server(callback, '0.0.0.0', port, backlog=backlog)
+
+
+def restart_delay_ms(failures):
+    """Wait before restarting a task that has failed `failures` times in a row."""
+    delay = RESTART_MIN_MS << min(failures - 1, 16)
+    return delay if delay < RESTART_MAX_MS else RESTART_MAX_MS
+
+
+async def supervise(task):
+    """
+    Runs task() (a coroutine function) until it returns. If it raises, logs the
+    exception and calls task() again after restart_delay_ms(). Cancellation is
+    passed on, so gather() and shutdown still work.
+    """
+    failures = 0
+    while True:
+        started = time.ticks_ms()
+        try:
+            await task()
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if time.ticks_diff(time.ticks_ms(), started) >= RESTART_RESET_MS:
+                failures = 0
+            failures += 1
+            delay = restart_delay_ms(failures)
+            print("Task %s failed (%r); restarting in %d ms" % (getattr(task, '__name__', task), e, delay))
+        await sleep_ms(delay)
+
+
+def run(*tasks):
+    """
+    Runs each task() (a coroutine function, so it can be started again) as a
+    concurrent, supervised task; one of them failing does not stop the others.
+    """
+    async def _main():
+        await asyncio.gather(*[supervise(task) for task in tasks])
+    asyncio.run(_main())
@@ -0,0 +1,100 @@
+# state_store.py - The lock's shared state: typed fields, a version counter and subscribers
+# Every field is declared up front with a type and a start value. set() does
+# nothing when the value is unchanged; otherwise it bumps the store's version,
+# stamps the field with it and calls the subscribers that asked for that field.
+# A View caches whatever is built from a few fields (a JSON body, encoded page
+# values) and rebuilds it only after one of those fields has changed.
+
+
+class StateStore:
+    """
+    fields is a sequence of (name, type, initial value); type may be a tuple
+    of types. Fields are addressed by name; masks (see mask()) select several
+    at once for subscribers and views.
+    """
+    def __init__(self, fields):
+        self.names = tuple(field[0] for field in fields)
+        self._types = tuple(field[1] for field in fields)
+        self._values = [field[2] for field in fields]
+        self._stamps = [0] * len(fields) # Version at which each field last changed
+        self._index = {}
+        for i in range(len(self.names)):
+            self._index[self.names[i]] = i
+        self._subscribers = []
+        self.version = 0
+
+    def mask(self, names):
+        """Bit mask selecting the named fields."""
+        bits = 0
+        for name in names:
+            bits |= 1 << self._index[name]
+        return bits
+
+    def get(self, name):
+        return self._values[self._index[name]]
+
+    def values(self, names):
+        """The named fields' values, as a tuple in the order given."""
+        return tuple(self._values[self._index[name]] for name in names)
+
+    def set(self, name, value):
+        """Stores value; returns True and notifies subscribers only if it changed."""
+        i = self._index[name]
+        if not isinstance(value, self._types[i]):
+            raise TypeError("%s: %r" % (name, value))
+        if value == self._values[i]:
+            return False
+        self._values[i] = value
+        self.version += 1
+        self._stamps[i] = self.version
+        bit = 1 << i
+        for mask, callback in self._subscribers:
+            if mask & bit:
+                callback(name, value)
+        return True
+
+    def touch(self, name):
+        """
+        Calls name's subscribers with its current value although it has not
+        changed, for an event that repeats the last one; the version stays put.
+        """
+        bit = 1 << self._index[name]
+        value = self._values[self._index[name]]
+        for mask, callback in self._subscribers:
+            if mask & bit:
+                callback(name, value)
+
+    def subscribe(self, names, callback):
+        """Calls callback(name, value) after any of the named fields changes."""
+        self._subscribers.append((self.mask(names), callback))
+
+    def changed_since(self, version, mask):
+        """True if any field in mask changed after version."""
+        stamps = self._stamps
+        for i in range(len(stamps)):
+            if mask & (1 << i) and stamps[i] > version:
+                return True
+        return False
+
+
+class View:
+    """
+    build(store) over the named fields, cached: get() returns the last result
+    until one of those fields changes. builds counts the rebuilds.
+    """
+    def __init__(self, store, names, build):
+        self.store = store
+        self.mask = store.mask(names)
+        self._build = build
+        self._seen = -1
+        self.value = None
+        self.builds = 0
+
+    def get(self):
+        store = self.store
+        if self._seen != store.version: # Nothing at all has changed: no need to look at the fields
+            if self._seen < 0 or store.changed_since(self._seen, self.mask):
+                self.value = self._build(store)
+                self.builds += 1
+            self._seen = store.version
+        return self.value
@@ -0,0 +1,12 @@
+// Live updates pushed from /events, so the page never needs a refresh.
+var es = new EventSource('/events');
+var toneClasses = {open: 'lock-open', denied: 'lock-closed'};
+es.addEventListener('status', function (e) {
+    document.getElementById('status').textContent = e.data;
+});
+es.addEventListener('tone', function (e) {
+    document.getElementById('status').className = 'lock-status ' + (toneClasses[e.data] || 'lock-info');
+});
+es.addEventListener('code', function (e) {
+    document.getElementById('code').textContent = e.data;
+});
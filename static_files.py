@@ -0,0 +1,108 @@
+# static_files.py - Static web assets served from flash
+# The stylesheet and script live in static/ and never change at runtime, so
+# browsers are told to cache them for a year. Their URLs carry a version (a
+# CRC of the file), so a new upload still reaches every browser at once. The
+# files are stat()ed on every use and the CRC recomputed when a size or mtime
+# changed, so a file replaced while the board runs is picked up without a reboot.
+#
+# tools/build_assets.py writes a gzip-compressed copy (name + ".gz") next to
+# each file. It is served with Content-Encoding: gzip to every client that
+# accepts it; the plain file is the fallback. Either is streamed from flash in
+# CHUNK_SIZE pieces, never read into memory whole.
+import os
+from binascii import crc32
+import http_router
+
+CHUNK_SIZE = 512
+CACHE_FOREVER = b'Cache-Control: public, max-age=31536000, immutable\r\n'
+
+
+def _base_dir():
+    # static/ sits next to this module (the filesystem root on the Pico W).
+    path = globals().get('__file__', '')
+    i = max(path.rfind('/'), path.rfind('\\'))
+    return path[:i + 1] if i >= 0 else ''
+
+
+BASE_DIR = _base_dir()
+
+
+def _stat(path):
+    # (size, mtime), or None if the file is missing.
+    try:
+        st = os.stat(path)
+        return (st[6], st[8])
+    except OSError:
+        return None
+
+
+def _crc(path):
+    crc = 0
+    buf = bytearray(CHUNK_SIZE)
+    with open(path, 'rb') as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                return crc
+            crc = crc32(memoryview(buf)[:n], crc)
+
+
+class StaticAsset:
+    """
+    One file under static/, e.g. StaticAsset('style.css', b'text/css'). Missing
+    and changed files are looked for again on each use, so they can be uploaded later.
+    """
+    def __init__(self, name, content_type):
+        self.name = name
+        self.url = b'/static/' + name.encode()
+        self.content_type = content_type
+        self.path = BASE_DIR + 'static/' + name
+        self._stats = (None, None) # (size, mtime) of the plain and gzip files at the last _load()
+        self.plain_size = None
+        self.gzip_size = None
+        self.version = b'0'
+
+    def _load(self):
+        """Re-reads the version if either file changed since the last call; False if both are missing."""
+        stats = (_stat(self.path), _stat(self.path + '.gz'))
+        if stats != self._stats:
+            plain, gzip = self._stats = stats
+            self.plain_size = plain and plain[0]
+            self.gzip_size = gzip and gzip[0]
+            if plain or gzip:
+                self.version = b'%08x' % _crc(self.path if plain else self.path + '.gz')
+        return stats != (None, None)
+
+    def link(self):
+        """The asset's versioned URL, for the page to reference."""
+        self._load()
+        return self.url + b'?v=' + self.version
+
+    async def respond(self, request, writer):
+        if not self._load():
+            http_router.write_error(writer, 404)
+            return True
+        gzip = self.gzip_size is not None and (
+            self.plain_size is None or b'gzip' in request.header(b'accept-encoding', b''))
+        etag = b'"%s%s"' % (self.version, b'-gz' if gzip else b'')
+        extra = CACHE_FOREVER + b'ETag: ' + etag + b'\r\nVary: Accept-Encoding\r\n'
+        if request.header(b'if-none-match') == etag:
+            http_router.write_head(writer, 304, extra=extra)
+            return True
+        if gzip:
+            path = self.path + '.gz'
+            size = self.gzip_size
+            extra += b'Content-Encoding: gzip\r\n'
+        else:
+            path = self.path
+            size = self.plain_size
+        http_router.write_head(writer, 200, self.content_type, size, extra)
+        buf = bytearray(CHUNK_SIZE) # Per response: a shared buffer could be refilled before the writer has sent it
+        with open(path, 'rb') as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                writer.write(buf if n == CHUNK_SIZE else buf[:n])
+                await writer.drain()
+        return True
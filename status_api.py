@@ -0,0 +1,62 @@
+# status_api.py - Compact JSON status endpoint with ETag / 304 Not Modified support
+# The JSON body and response header are rebuilt only when a field changes, so a
+# poller that sends back the ETag gets a tiny header-only 304 on every other hit.
+try:
+    import ujson as json
+except ImportError:
+    import json
+import urandom
+
+API_FIELDS = ('ssid', 'bssid', 'ip', 'rssi', 'lock', 'status', 'code', 'events') # events: seq of the latest access event
+
+NOT_MODIFIED = b'HTTP/1.1 304 Not Modified\r\nETag: '
+
+
+def _dumps(obj):
+    try:
+        return json.dumps(obj, separators=(',', ':'))
+    except TypeError: # Older MicroPython builds have no separators argument
+        return json.dumps(obj)
+
+
+class StatusApi:
+    """
+    Serves /api/status. Pass the current field values (in API_FIELDS order)
+    to respond(); the version and ETag advance whenever they differ from the last call.
+    """
+    def __init__(self):
+        # Random per boot, so an ETag cached before a reboot never matches.
+        self.boot_id = urandom.getrandbits(16)
+        self.version = 0
+        self.etag = b''
+        self._values = None
+        self._head = b''
+        self._body = b''
+
+    def update(self, values):
+        """Bumps the version and rebuilds the cached response if any value changed."""
+        if values is self._values or values == self._values: # A state_store.View hands back the same tuple
+            return False
+        self._values = values
+        self.version += 1
+        self.etag = b'"%x-%d"' % (self.boot_id, self.version)
+        self._body = _dumps(dict(zip(API_FIELDS, values))).encode()
+        self._head = (b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                      b'Cache-Control: no-cache\r\nETag: ' + self.etag +
+                      b'\r\nContent-Length: %d\r\n\r\n' % len(self._body))
+        return True
+
+    def respond(self, conn, request, values):
+        """
+        Writes either a 304 (client already has this version) or the full JSON response.
+        request is an http_router.Request. Both responses are length-delimited, so returns True.
+        """
+        self.update(values)
+        if request.header(b'if-none-match') == self.etag:
+            conn.write(NOT_MODIFIED)
+            conn.write(self.etag)
+            conn.write(b'\r\n\r\n')
+            return True
+        conn.write(self._head)
+        conn.write(self._body)
+        return True
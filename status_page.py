@@ -0,0 +1,55 @@
+# status_page.py - The lock's status web page, precompiled into a PageTemplate
+from page_template import PageTemplate
+from static_files import StaticAsset
+
+# The response header is written by the router, which needs the rendered length (see PageTemplate.length).
+STATUS_PAGE = PageTemplate("""<!DOCTYPE html>
+<html>
+<head>
+<title>Pico W Network & Lock Control</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<link rel="stylesheet" href="{style}">
+<script src="{script}" defer></script>
+</head>
+<body>
+<div class="container">
+<h1>Raspberry Pi Pico W Security System</h1>
+<h2>Network Status</h2>
+<div class="network-details">
+<p><b>Connected to:</b> {ssid}</p>
+<p><b>AP MAC (BSSID):</b> {bssid}</p>
+<p><b>IP Address:</b> {ip}</p>
+<p><b>Signal Strength:</b> {rssi} dBm</p>
+</div>
+<h2>Current Code for Entry</h2>
+<div class="random-number" id="code">{code}</div>
+<p class="note">(This code changes upon RFID scan or page refresh. Enter it on the keypad after a valid RFID scan.)</p>
+<h2>Lock Status</h2>
+<div class="lock-status {status_class}" id="status">{status}</div>
+</div>
+</body>
+</html>""")
+
+# The stylesheet and the live-update script are static files (see static_files.py),
+# cached by the browser, so the page itself is only the status markup.
+STYLE = StaticAsset('style.css', b'text/css')
+SCRIPT = StaticAsset('app.js', b'application/javascript')
+
+
+# The firmware sets a tone along with every status message; it picks the status line's colour.
+STATUS_CLASSES = {'info': 'lock-info', 'open': 'lock-open', 'denied': 'lock-closed'}
+
+# State fields the page shows; page_values() runs again only when one of them changes.
+PAGE_FIELDS = ('ssid', 'bssid', 'ip', 'rssi', 'code', 'status', 'tone')
+
+
+def status_class(tone):
+    """Picks the CSS class for a status tone."""
+    return STATUS_CLASSES.get(tone, 'lock-info')
+
+
+def page_values(state):
+    """The page's slot values from a state_store.StateStore, encoded once for STATUS_PAGE."""
+    ssid, bssid, ip, rssi, code, status, tone = state.values(PAGE_FIELDS)
+    return STATUS_PAGE.prepare(style=STYLE.link(), script=SCRIPT.link(), ssid=ssid, bssid=bssid, ip=ip, rssi=rssi,
+                               code=code, status_class=status_class(tone), status=status)
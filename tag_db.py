@@ -0,0 +1,310 @@
+# tag_db.py - Flash-resident binary credential database
+# The file is a small header followed by fixed-size records sorted by tag key
+# (see tag_store.tag_key). Lookups binary-search the file with seek() and
+# readinto() into one preallocated record buffer, so RAM use does not depend
+# on how many badges are stored. DatabaseWriter builds a file record by record
+# for uploads too large to sort in RAM, and CredentialStore swaps a new file in
+# under the readers' feet. Where the filesystem cannot rename over a file
+# (FAT), the old database is first renamed to <database>.bak; a reset between
+# the renames is repaired on the next boot.
+#
+# Header (16 bytes):  magic b'PTDB', format version (u8), record size (u16),
+#                     record count (u32), 5 reserved bytes
+# Record (36 bytes):  tag key (11), valid_from (u32), valid_until (u32),
+#                     flags (u8), label (16, UTF-8, zero padded)
+# Times are Unix seconds; 0 means "no limit". Validity windows are only checked
+# once the clock has been set (see clock_is_set()).
+import os
+import struct
+import time
+import _thread
+from tag_store import KEY_SIZE, tag_key
+
+MAGIC = b'PTDB'
+FORMAT_VERSION = 1
+HEADER_FORMAT = '<4sBHI5s' # Last field is reserved padding
+HEADER_SIZE = 16
+LABEL_SIZE = 16
+RECORD_FORMAT = '<%dsIIB%ds' % (KEY_SIZE, LABEL_SIZE)
+RECORD_SIZE = 36
+
+FLAG_DISABLED = 0x01
+
+WRITE_BATCH = 16 # Records buffered per file write by DatabaseWriter
+BACKUP_SUFFIX = '.bak'
+
+_STRUCT_ERROR = getattr(struct, 'error', ValueError) # MicroPython's struct raises ValueError
+
+# MicroPython ports with a 2000-01-01 epoch need this added to reach Unix time.
+_EPOCH_OFFSET = 946684800 if time.gmtime(0)[0] == 2000 else 0
+
+
+# After a power cut the Pico W's RTC restarts at its default date (2021 on the rp2 port) until
+# NTP or a tool sets it. A clock reading earlier than this has not been set.
+CLOCK_SET_AFTER = 1704067200 # 2024-01-01
+
+
+def unix_time():
+    return int(time.time()) + _EPOCH_OFFSET
+
+
+def clock_is_set():
+    return unix_time() >= CLOCK_SET_AFTER
+
+
+def _label_bytes(label):
+    raw = label.encode()[:LABEL_SIZE]
+    while raw:
+        try:
+            raw.decode() # Do not cut a multi-byte character in half
+            break
+        except UnicodeError:
+            raw = raw[:-1]
+    return raw
+
+
+def pack_record(uid, label='', valid_from=0, valid_until=0, flags=0):
+    """Builds one 36-byte record; used by the CSV tool and the upload endpoint."""
+    return struct.pack(RECORD_FORMAT, tag_key(uid), valid_from, valid_until, flags, _label_bytes(label))
+
+
+def write_database(path, records):
+    """Writes packed records (any order, duplicates keep the last one) as a sorted database file."""
+    by_key = {}
+    for record in records:
+        by_key[bytes(record[:KEY_SIZE])] = record
+    keys = sorted(by_key)
+    with open(path, 'wb') as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, RECORD_SIZE, len(keys), b''))
+        for key in keys:
+            f.write(by_key[key])
+    return len(keys)
+
+
+class DatabaseWriter:
+    """
+    Writes a database file one packed record at a time. Records must come in
+    strictly increasing key order; add() raises ValueError on one that does
+    not (a duplicate included). finish() fills in the header.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._last = None
+        self._batch = bytearray(RECORD_SIZE * WRITE_BATCH)
+        self._used = 0
+        self._file = open(path, 'wb')
+        self._file.write(bytes(HEADER_SIZE)) # Placeholder until the count is known
+
+    def add(self, record):
+        key = bytes(record[:KEY_SIZE])
+        if self._last is not None and key <= self._last:
+            raise ValueError("not in UID order (sort by UID length, then UID) or a duplicate")
+        self._last = key
+        used = self._used
+        self._batch[used:used + RECORD_SIZE] = record
+        self._used = used + RECORD_SIZE
+        if self._used == len(self._batch):
+            self._file.write(self._batch)
+            self._used = 0
+        self.count += 1
+
+    def finish(self):
+        f = self._file
+        if self._used:
+            f.write(memoryview(self._batch)[:self._used])
+        f.seek(0)
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, RECORD_SIZE, self.count, b''))
+        f.close()
+        return self.count
+
+    def abort(self):
+        """Closes and deletes the partly written file."""
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class TagDatabase:
+    """
+    Read-only view of a database file. After a successful find(), the record
+    fields can be read with label(), valid_from(), valid_until() and flags().
+    """
+    def __init__(self, path):
+        self._file = f = open(path, 'rb')
+        try:
+            magic, version, record_size, count, _ = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+        except _STRUCT_ERROR:
+            f.close()
+            raise ValueError("Truncated tag database: %s" % path)
+        if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD_SIZE:
+            f.close()
+            raise ValueError("Not a tag database: %s" % path)
+        size = f.seek(0, 2)
+        if size != HEADER_SIZE + count * RECORD_SIZE: # A cut-short copy would send the search past its end
+            f.close()
+            raise ValueError("Tag database %s has %d bytes, its header says %d records" % (path, size, count))
+        self.count = count
+        self._record = bytearray(RECORD_SIZE)
+        self._key = bytearray(KEY_SIZE)
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._file.close()
+
+    def _compare(self):
+        """Compares the loaded record's key with self._key without allocating."""
+        record = self._record
+        key = self._key
+        for i in range(KEY_SIZE):
+            diff = record[i] - key[i]
+            if diff:
+                return diff
+        return 0
+
+    def find(self, uid):
+        """Binary-searches the file for uid; returns True and leaves the record loaded if found."""
+        n = len(uid)
+        if n >= KEY_SIZE:
+            return False
+        key = self._key
+        key[0] = n
+        for i in range(1, KEY_SIZE):
+            key[i] = uid[i - 1] if i <= n else 0
+        f = self._file
+        lo = 0
+        hi = self.count
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            f.seek(HEADER_SIZE + mid * RECORD_SIZE)
+            f.readinto(self._record)
+            diff = self._compare()
+            if diff < 0:
+                lo = mid + 1
+            elif diff > 0:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def _u32(self, offset):
+        r = self._record
+        return r[offset] | (r[offset + 1] << 8) | (r[offset + 2] << 16) | (r[offset + 3] << 24)
+
+    def valid_from(self):
+        return self._u32(KEY_SIZE)
+
+    def valid_until(self):
+        return self._u32(KEY_SIZE + 4)
+
+    def flags(self):
+        return self._record[KEY_SIZE + 8]
+
+    def label(self):
+        raw = bytes(self._record[KEY_SIZE + 9:RECORD_SIZE])
+        end = raw.find(b'\x00')
+        return (raw if end < 0 else raw[:end]).decode()
+
+    def check(self, uid, now=None):
+        """
+        True if uid is in the database, not disabled and inside its validity window.
+        Without now, the window is skipped while the clock is not set, so a reboot
+        without NTP does not lock out badges whose window has already begun.
+        """
+        if not self.find(uid):
+            return False
+        if self.flags() & FLAG_DISABLED:
+            return False
+        start = self.valid_from()
+        end = self.valid_until()
+        if start or end:
+            if now is None:
+                if not clock_is_set():
+                    return True
+                now = unix_time()
+            if (start and now < start) or (end and now > end):
+                return False
+        return True
+
+    def __contains__(self, uid):
+        return self.check(uid)
+
+
+def _exists(path):
+    try:
+        os.stat(path)
+        return True
+    except OSError:
+        return False
+
+
+def open_database(path):
+    """Opens the database at path, or returns None if there is no such file or it is damaged."""
+    try:
+        return TagDatabase(path)
+    except OSError:
+        return None
+    except ValueError as e:
+        print("Ignoring tag database:", e)
+        return None
+
+
+class CredentialStore:
+    """
+    The badges the firmware checks against: the database file when there is
+    one, fallback (anything supporting `in`) otherwise. replace() moves a new
+    file into place; lookups from the other core wait for the swap.
+    """
+    def __init__(self, path, fallback):
+        self.path = path
+        self._fallback = fallback
+        self._lock = _thread.allocate_lock()
+        self._recover()
+        self._db = open_database(path)
+
+    def _recover(self):
+        """Finishes a replace() that a reset cut short between its renames."""
+        backup = self.path + BACKUP_SUFFIX
+        if not _exists(backup):
+            return
+        if _exists(self.path):
+            os.remove(backup) # The new file was already in place
+        else:
+            print("Restoring tag database from", backup)
+            os.rename(backup, self.path)
+
+    def __contains__(self, uid):
+        with self._lock:
+            return uid in (self._fallback if self._db is None else self._db)
+
+    def __len__(self):
+        return len(self._fallback if self._db is None else self._db)
+
+    def replace(self, new_path):
+        """Renames new_path over the database file and opens it; on failure the old file stays in use."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            try:
+                try:
+                    os.rename(new_path, self.path) # Atomic on littlefs
+                except OSError:
+                    if not _exists(self.path):
+                        raise
+                    # FAT will not rename over an existing file. Move the old one aside
+                    # rather than deleting it, so there is always a database to boot with.
+                    backup = self.path + BACKUP_SUFFIX
+                    os.rename(self.path, backup)
+                    try:
+                        os.rename(new_path, self.path)
+                    except OSError:
+                        os.rename(backup, self.path)
+                        raise
+                    os.remove(backup)
+            finally:
+                self._db = open_database(self.path)
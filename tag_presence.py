@@ -0,0 +1,95 @@
+# tag_presence.py - Presence tracking for the RFID reader
+# A badge resting on the reader answers every poll. scan() turns that stream
+# of reads into presentations: only a tag that was not already on the reader
+# is reported, so one tap is one authorize-and-challenge, however long the
+# badge stays there.
+#
+# A card answers REQA only from its IDLE state; once selected it ignores the
+# next one. So every card that was read is sent HLTA (rdr.halt()) and polls
+# use REQALL (WUPA), which wakes a halted card too: a badge left on the reader
+# then answers every poll. While it does, it is the card already selected
+# (taking it away makes at least one poll come back empty), so the
+# anticollision/select exchange is skipped. After a miss the next card is
+# selected again; if it is a UID seen within HOLD_GAP_MS, the miss was just a
+# flicker of the same presentation. With a driver that has no halt(), every
+# other poll misses and the card is selected again each time; the UID cache
+# still keeps that one presentation.
+import time
+
+CACHE_SIZE = 4      # Recently seen UIDs kept
+HOLD_GAP_MS = 500   # Reads further apart than this start a new presentation
+
+
+def _halt(rdr):
+    """Sends HLTA; returns False if the driver cannot, so the card will not answer the next poll."""
+    halt = getattr(rdr, 'halt', None)
+    if halt is None:
+        return False
+    halt()
+    return True
+
+
+class TagPresence:
+    def __init__(self, size=CACHE_SIZE, gap_ms=HOLD_GAP_MS):
+        self.gap_ms = gap_ms
+        self._uids = [None] * size
+        self._seen = [0] * size # ticks_ms of the last read, per slot
+        self._current = -1      # Slot of the tag on the reader while holding
+        self.holding = False    # The last request() found a card
+        # Counters
+        self.requests = 0       # request() calls
+        self.selects = 0        # SelectTag() calls
+        self.selects_skipped = 0
+        self.repeats = 0        # Reads that continued a presentation after a flicker
+        self.presentations = 0
+
+    def scan(self, rdr):
+        """Polls rdr once; returns the UID of a new presentation, otherwise None."""
+        self.requests += 1
+        (status, tag_type) = rdr.request(rdr.REQALL)
+        if status != rdr.OK:
+            self.holding = False
+            return None
+        now = time.ticks_ms()
+        if self.holding:
+            self.selects_skipped += 1
+            self._seen[self._current] = now
+            rdr.halt() # Back to HALT, so the next WUPA is answered again
+            return None
+        self.selects += 1
+        (status, uid) = rdr.SelectTag(tag_type)
+        if status != rdr.OK:
+            return None
+        self.holding = _halt(rdr)
+        slot = self._find(uid)
+        if slot >= 0 and time.ticks_diff(now, self._seen[slot]) <= self.gap_ms:
+            self.repeats += 1
+            self._current = slot
+            self._seen[slot] = now
+            return None
+        if slot < 0:
+            slot = self._oldest()
+            self._uids[slot] = uid
+        self._current = slot
+        self._seen[slot] = now
+        self.presentations += 1
+        return uid
+
+    def _find(self, uid):
+        for i in range(len(self._uids)):
+            if self._uids[i] == uid:
+                return i
+        return -1
+
+    def _oldest(self):
+        now = time.ticks_ms()
+        oldest = 0
+        age = -1
+        for i in range(len(self._uids)):
+            if self._uids[i] is None:
+                return i
+            a = time.ticks_diff(now, self._seen[i])
+            if a > age:
+                oldest = i
+                age = a
+        return oldest
@@ -0,0 +1,73 @@
+# tag_store.py - Compact in-RAM index of authorized RFID tag UIDs
+# Every UID is stored as a fixed-width key (length byte + UID padded with
+# zeros) in one sorted bytearray, and looked up by binary search. Thousands of
+# badges cost KEY_SIZE bytes each, instead of a Python list of ints per tag.
+
+MAX_UID_LEN = 10 # ISO 14443 UIDs are 4, 7 or 10 bytes
+KEY_SIZE = MAX_UID_LEN + 1
+
+
+def tag_key(uid):
+    """Packs a UID (list of ints or bytes) into its fixed-width index key."""
+    n = len(uid)
+    if n > MAX_UID_LEN:
+        raise ValueError("UID longer than %d bytes" % MAX_UID_LEN)
+    key = bytearray(KEY_SIZE)
+    key[0] = n
+    key[1:n + 1] = bytes(uid)
+    return bytes(key)
+
+
+class TagIndex:
+    """Sorted packed array of tag keys with O(log n) membership tests."""
+    def __init__(self, uids=()):
+        keys = sorted(set(tag_key(uid) for uid in uids))
+        self._data = bytearray(b''.join(keys))
+
+    def __len__(self):
+        return len(self._data) // KEY_SIZE
+
+    def _find(self, key):
+        """Returns (found, position) for key using binary search."""
+        data = self._data
+        lo = 0
+        hi = len(data) // KEY_SIZE
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            off = mid * KEY_SIZE
+            probe = bytes(data[off:off + KEY_SIZE])
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return (True, mid)
+        return (False, lo)
+
+    def __contains__(self, uid):
+        return self._find(tag_key(uid))[0]
+
+    def add(self, uid):
+        """Adds a UID; returns False if it was already present."""
+        key = tag_key(uid)
+        found, pos = self._find(key)
+        if found:
+            return False
+        off = pos * KEY_SIZE
+        self._data[off:off] = key
+        return True
+
+    def remove(self, uid):
+        """Removes a UID; returns False if it was not present."""
+        found, pos = self._find(tag_key(uid))
+        if not found:
+            return False
+        off = pos * KEY_SIZE
+        self._data[off:off + KEY_SIZE] = b''
+        return True
+
+    def uids(self):
+        """Yields every stored UID as bytes, in index order."""
+        data = self._data
+        for off in range(0, len(data), KEY_SIZE):
+            yield bytes(data[off + 1:off + 1 + data[off]])
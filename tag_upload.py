@@ -0,0 +1,160 @@
+# tag_upload.py - PUT /api/tags: replace the badge database with an uploaded list
+# The body (Content-Length or chunked) is one badge per line, in the CSV
+# tool's column order:
+#   uid_hex[,label[,valid_from[,valid_until[,disabled]]]]
+# Blank lines and lines starting with '#' are skipped. The body is read in
+# pieces of at most BUFFER_SIZE and every complete line is packed and appended
+# to <database>.tmp straight away, so RAM use does not grow with the number of
+# badges. Lines must come sorted the way the database is (UID length, then
+# UID; tools/upload_tags.py sorts for you). Only a body that parses to the
+# end replaces the database; anything else, including a failure to move the
+# new file into place (answered 500), leaves the old one in place.
+# One upload runs at a time: a second one, while the first is still being
+# received into the temporary file, is answered 409.
+from binascii import unhexlify
+
+import http_router
+import tag_db
+
+BUFFER_SIZE = 512 # Also the longest line accepted
+TMP_SUFFIX = '.tmp'
+_ENOSPC = 28
+
+_CLOSE = b'Connection: close\r\n'
+
+_receiving = set() # Temporary files an upload is writing to right now
+
+
+def authorized(request, token):
+    """True if the request carries 'Authorization: Bearer <token>'; compares in constant time."""
+    given = request.header(b'authorization', b'')
+    expected = b'Bearer ' + token
+    if len(given) != len(expected):
+        return False
+    diff = 0
+    for i in range(len(expected)):
+        diff |= given[i] ^ expected[i]
+    return not diff
+
+
+def parse_line(line):
+    """Packs one body line into a record; returns None for blank and comment lines."""
+    line = line.decode().strip()
+    if not line or line[0] == '#':
+        return None
+    fields = line.split(',')
+    if len(fields) > 5:
+        raise ValueError("too many fields")
+    uid = unhexlify(fields[0].strip().replace(':', ''))
+    label = fields[1].strip() if len(fields) > 1 else ''
+    valid_from = int(fields[2]) if len(fields) > 2 and fields[2].strip() else 0
+    valid_until = int(fields[3]) if len(fields) > 3 and fields[3].strip() else 0
+    disabled = len(fields) > 4 and fields[4].strip().lower() in ('1', 'yes', 'true')
+    return tag_db.pack_record(uid, label, valid_from, valid_until, tag_db.FLAG_DISABLED if disabled else 0)
+
+
+def _add(out, line, line_no):
+    try:
+        record = parse_line(line)
+        if record is not None:
+            out.add(record)
+    except ValueError as e:
+        raise ValueError("line %d: %s" % (line_no, e))
+
+
+async def _read_records(body, out):
+    """Feeds every line of the body to out; returns the number of lines read."""
+    tail = bytearray(BUFFER_SIZE) # Start of a line split across reads
+    used = 0
+    line_no = 0
+    while True:
+        data = await body.read(BUFFER_SIZE)
+        if not data:
+            if used:
+                line_no += 1
+                _add(out, bytes(tail[:used]), line_no) # Last line without a newline
+            return line_no
+        start = 0
+        while True:
+            end = data.find(b'\n', start)
+            if end < 0:
+                break
+            line_no += 1
+            if used:
+                _add(out, bytes(tail[:used]) + data[start:end], line_no)
+                used = 0
+            else:
+                _add(out, data[start:end], line_no)
+            start = end + 1
+        rest = len(data) - start
+        if used + rest > BUFFER_SIZE:
+            raise ValueError("line %d: longer than %d bytes" % (line_no + 1, BUFFER_SIZE))
+        tail[used:used + rest] = memoryview(data)[start:]
+        used += rest
+
+
+def _write_text(writer, status, text):
+    body = text.encode()
+    http_router.write_head(writer, status, b'text/plain', len(body), _CLOSE)
+    writer.write(body)
+
+
+async def receive(request, writer, store, token):
+    """
+    Serves PUT /api/tags into store (a tag_db.CredentialStore). Answers 200
+    with the badge count as JSON. Every error closes the connection, as the
+    rest of the body is never read.
+    """
+    if not authorized(request, token):
+        http_router.write_error(writer, 401, b'WWW-Authenticate: Bearer\r\n' + _CLOSE)
+        return False
+    tmp_path = store.path + TMP_SUFFIX
+    if tmp_path in _receiving:
+        _write_text(writer, 409, "another upload is in progress\n")
+        return False
+    _receiving.add(tmp_path)
+    try:
+        return await _receive(request, writer, store, tmp_path)
+    finally:
+        _receiving.discard(tmp_path)
+
+
+async def _receive(request, writer, store, tmp_path):
+    try:
+        body = http_router.BodyReader(request)
+    except ValueError:
+        http_router.write_error(writer, 400, _CLOSE)
+        return False
+    if not body.has_length:
+        http_router.write_error(writer, 411, _CLOSE)
+        return False
+    if request.header(b'expect', b'').lower() == b'100-continue':
+        writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+        await writer.drain()
+
+    out = tag_db.DatabaseWriter(tmp_path)
+    count = None
+    try:
+        await _read_records(body, out)
+        count = out.finish()
+    except ValueError as e:
+        _write_text(writer, 400, "%s\n" % (e.args[0] if e.args else "malformed body"))
+        return False
+    except OSError as e:
+        if not e.args or e.args[0] != _ENOSPC:
+            raise # A dropped or timed-out connection, not a full flash
+        _write_text(writer, 413, "not enough flash for %d badges\n" % out.count)
+        return False
+    finally:
+        if count is None:
+            out.abort()
+    try:
+        store.replace(out.path)
+    except OSError as e:
+        out.abort() # The old database is still in place and in use
+        _write_text(writer, 500, "could not install the new database: %s\n" % e)
+        return False
+    reply = b'{"tags":%d}' % count
+    http_router.write_head(writer, 200, b'application/json', len(reply))
+    writer.write(reply)
+    return True
@@ -0,0 +1,94 @@
+# conftest.py - Runs the tests on CPython against the firmware modules, with the stand-ins in host/
+import asyncio
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'host'))
+
+import hostenv  # noqa: E402
+import sim  # noqa: E402
+
+hostenv.install()
+
+class Reader:
+    """
+    A client's stream. Hands out data in pieces no larger than asked for and
+    counts what was taken. endless is repeated once data runs out (a client
+    that never sends a newline); with stall_at, reads past that many bytes
+    wait for the hold event.
+    """
+    def __init__(self, data, endless=b'', stall_at=None):
+        self.data = data
+        self.endless = endless
+        self.stall_at = stall_at
+        self.hold = asyncio.Event() if stall_at is not None else None
+        self.consumed = 0
+
+    async def read(self, n):
+        if self.hold is not None:
+            if self.consumed >= self.stall_at:
+                await self.hold.wait()
+            else:
+                n = min(n, self.stall_at - self.consumed)
+        if not self.data and self.endless:
+            self.data = self.endless * (n // len(self.endless) + 1)
+        piece, self.data = self.data[:n], self.data[n:]
+        self.consumed += len(piece)
+        return piece
+
+
+class Writer:
+    """A client's end of the response: collects everything written in out."""
+    def __init__(self):
+        self.out = b''
+
+    def write(self, data):
+        self.out += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+LOOP_MS = 1 # Loop period of the simulated doors: deadlines are seen to the millisecond
+
+
+def _simulator(script):
+    with contextlib.redirect_stdout(io.StringIO()):
+        s = sim.Simulator(script, loop_period_ms=LOOP_MS)
+    s.step(100) # Past boot, idle at the door
+    return s
+
+
+@pytest.fixture(params=['main.py', 'LCD version.py'])
+def door(request):
+    """A simulated door running each of the two firmware scripts in turn."""
+    s = _simulator(request.param)
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def lcd_door():
+    """A simulated door running the LCD version."""
+    s = _simulator('LCD version.py')
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def clock():
+    """A virtual clock in place of time.ticks_*, advanced by hand."""
+    clock = hostenv.VirtualClock()
+    hostenv.install(clock)
+    yield clock
+    hostenv.install()
@@ -0,0 +1,39 @@
+# test_dual_core.py - The second core's loop survives a failing pass; state crosses over without loss
+import time
+
+import dual_core
+import runtime
+
+
+def test_loop_keeps_ticking_after_an_exception(monkeypatch):
+    monkeypatch.setattr(runtime, 'RESTART_MIN_MS', 5)
+    ticks = []
+
+    def hardware_loop():
+        ticks.append(1)
+        if len(ticks) == 3:
+            raise RuntimeError("handler bug")
+
+    failures = dual_core.failures
+    dual_core.start(hardware_loop, 1)
+    try:
+        deadline = time.monotonic() + 2
+        while len(ticks) < 20 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        dual_core.stop()
+    assert len(ticks) >= 20
+    assert dual_core.failures == failures + 1
+
+
+def test_state_is_not_lost_when_the_reader_falls_behind():
+    values = dual_core.LatestValues(('lock', 'status'))
+    for i in range(100):
+        values.put('status', "message %d" % i)
+    values.put('lock', "open")
+    values.put('lock', "closed")
+    seen = []
+    assert values.drain(lambda name, value: seen.append((name, value))) == 2
+    assert seen == [('lock', "closed"), ('status', "message 99")]
+    assert values.coalesced == 100
+    assert values.drain(lambda name, value: seen.append((name, value))) == 0
@@ -0,0 +1,67 @@
+# test_fleet.py - Access events survive a later page timing out; malformed answers fail the poll
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools'))
+
+import fleet  # noqa: E402
+
+
+def _page(first, last, latest):
+    events = [{"seq": seq} for seq in range(first, last)]
+    return (200, {}, json.dumps({"events": events, "next": last, "latest": latest}).encode())
+
+
+def test_pages_already_read_are_kept_when_a_later_one_times_out():
+    controller = fleet.Controller('door')
+    controller.events_seq = 0
+    controller.events_due = True
+    stalled = [True]
+
+    async def fetch(path):
+        since = int(path.split(b'since=')[1])
+        if since == 0:
+            return _page(0, 2, 4)
+        if stalled[0]:
+            await asyncio.sleep(10) # The controller stops answering before the second page
+        return _page(2, 4, 4)
+    controller.fetch = fetch
+    controller.poll_status = lambda: asyncio.sleep(0, [])
+
+    seen = []
+    fleet_ = fleet.Fleet([controller], timeout=0.05,
+                         on_event=lambda c, kind, detail: seen.append(detail['seq']) if kind == 'access' else None)
+    asyncio.run(fleet_.poll(controller))
+    assert seen == [0, 1]
+    assert controller.events_seq == 2 and controller.events_due
+    assert fleet_.timeouts == 1
+
+    stalled[0] = False
+    asyncio.run(fleet_.poll(controller))
+    assert seen == [0, 1, 2, 3] # Each event exactly once
+    assert controller.events_seq == 4 and not controller.events_due
+
+
+def test_malformed_answers_mark_the_controller_offline_and_are_retried():
+    controller = fleet.Controller('door')
+    answers = [b'[]', b'{"events": "7"}', b'{"events": 1}']
+    pages = [b'{"latest": 1}', b'{"events": [1], "next": 1, "latest": 1}', _page(0, 1, 1)[2]]
+
+    async def get(path, extra=b''):
+        return (200, {}, answers.pop(0) if len(answers) > 1 else answers[0])
+
+    async def fetch(path):
+        return (200, {}, pages.pop(0))
+    controller.get = get
+    controller.fetch = fetch
+    controller.events_seq = 0
+
+    seen = []
+    fleet_ = fleet.Fleet([controller], timeout=1, on_event=lambda c, kind, detail: seen.append(kind))
+    for _ in range(5):
+        asyncio.run(fleet_.poll(controller))
+    # Bad status twice (offline once), then a page missing keys and one with a bad event.
+    assert seen == ['offline', 'online', 'offline', 'online', 'offline', 'online', 'access']
+    assert controller.online and not pages
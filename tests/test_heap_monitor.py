@@ -0,0 +1,47 @@
+# test_heap_monitor.py - The largest free block is probed during idle collections only
+import heap_monitor
+from conftest import Writer
+
+
+def _fake_heap(monkeypatch):
+    """MicroPython-like heap figures on CPython; every probe is recorded in the returned list."""
+    figures = {'mem_free': 64 * 1024, 'mem_alloc': 0}
+    probes = []
+    monkeypatch.setattr(heap_monitor, '_heap', lambda name: figures[name])
+    monkeypatch.setattr(heap_monitor.HeapMonitor, 'largest_free_block', lambda self: probes.append(1) or 4096)
+    return figures, probes
+
+
+def test_memory_report_does_not_probe(monkeypatch):
+    figures, probes = _fake_heap(monkeypatch)
+    monitor = heap_monitor.HeapMonitor(interval_ms=0)
+    writer = Writer()
+    for _ in range(5):
+        monitor.respond(writer, None)
+    assert not probes
+    assert b'"largest_free_block": null' in writer.out
+
+
+def test_idle_collection_updates_the_cached_block(monkeypatch):
+    figures, probes = _fake_heap(monkeypatch)
+    monitor = heap_monitor.HeapMonitor(interval_ms=0)
+    monitor.collect_if_idle(False) # Someone at the door: no collection, no probe
+    assert not probes and monitor.largest_block is None
+    monitor.collect_if_idle(True) # Nothing allocated yet, but there is no figure at all
+    assert len(probes) == 1 and monitor.largest_block == 4096
+    monitor.collect_if_idle(True) # Still nothing allocated: the figure still holds
+    assert len(probes) == 1
+    figures['mem_alloc'] = heap_monitor.IDLE_COLLECT_MIN_BYTES
+    monitor.collect_if_idle(True)
+    assert len(probes) == 2 and monitor.collections == 1
+    assert monitor.stats()['largest_free_block'] == 4096
+
+
+def test_no_probe_while_the_other_core_allocates(monkeypatch):
+    figures, probes = _fake_heap(monkeypatch)
+    monitor = heap_monitor.HeapMonitor(interval_ms=0, probe=False) # As main.py builds it with DUAL_CORE
+    monitor.collect_if_idle(True)
+    figures['mem_alloc'] = heap_monitor.IDLE_COLLECT_MIN_BYTES
+    monitor.collect_if_idle(True)
+    assert monitor.collections == 1 and not probes
+    assert monitor.stats()['largest_free_block'] is None
@@ -0,0 +1,102 @@
+# test_http_router.py - Bounded line reads and the body handoff in http_router
+import asyncio
+
+import http_router
+from conftest import Reader, Writer
+
+
+def _serve(router, reader):
+    writer = Writer()
+    asyncio.run(router.serve_connection(reader, writer))
+    return writer.out
+
+
+def test_overlong_header_line_is_rejected_after_max_line():
+    reader = Reader(b'GET / HTTP/1.1\r\nX-Filler: ', endless=b'a')
+    out = _serve(http_router.Router(), reader)
+    assert out.startswith(b'HTTP/1.1 431 Request Header Fields Too Large\r\n')
+    assert b'Connection: close' in out
+    assert reader.consumed <= len(b'GET / HTTP/1.1\r\n') + http_router.MAX_LINE
+
+
+def test_overlong_request_line_is_rejected():
+    reader = Reader(b'GET /', endless=b'x')
+    out = _serve(http_router.Router(), reader)
+    assert out.startswith(b'HTTP/1.1 414 URI Too Long\r\n')
+    assert reader.consumed <= http_router.MAX_LINE
+
+
+def test_body_and_next_request_read_with_the_head_are_kept():
+    bodies = []
+
+    async def echo(request, writer):
+        body = http_router.BodyReader(request)
+        data = b''
+        while True:
+            piece = await body.read(7)
+            if not piece:
+                break
+            data += piece
+        bodies.append(data)
+        http_router.write_error(writer, 204)
+        return True
+
+    router = http_router.Router()
+    router.route(b'/echo', echo, methods=(b'POST',))
+    # Both requests arrive in the first read, together with the chunked body
+    reader = Reader(b'POST /echo HTTP/1.1\r\nContent-Length: 11\r\n\r\nhello world'
+                          b'POST /echo HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n'
+                          b'5\r\nabcde\r\n3\r\nfgh\r\n0\r\n\r\n')
+    out = _serve(router, reader)
+    assert bodies == [b'hello world', b'abcdefgh']
+    assert out.count(b'HTTP/1.1 204 ') == 2
+
+
+def _collect(router, reader):
+    out = _serve(router, reader)
+    return [line for line in out.split(b'\r\n') if line.startswith(b'HTTP/1.1 ')]
+
+
+def test_unread_body_is_not_taken_for_the_next_request():
+    served = []
+
+    async def page(request, writer): # Ignores any body
+        served.append(request.path)
+        http_router.write_error(writer, 204)
+        return True
+
+    router = http_router.Router()
+    router.route(b'/', page)
+    router.route(b'/secret', page)
+    smuggled = b'GET /secret HTTP/1.1\r\n\r\n'
+    for first in (b'POST /missing HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s' % (len(smuggled), smuggled),
+                  b'GET / HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s' % (len(smuggled), smuggled),
+                  b'GET / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n%x\r\n%s\r\n0\r\n\r\n' % (len(smuggled), smuggled)):
+        del served[:]
+        statuses = _collect(router, Reader(first + b'GET / HTTP/1.1\r\nConnection: close\r\n\r\n'))
+        assert len(statuses) == 2 # The body was skipped; the request after it was answered
+        assert b'/secret' not in served
+
+
+def test_long_unread_body_closes_the_connection():
+    served = []
+
+    async def page(request, writer):
+        served.append(request.path)
+        http_router.write_error(writer, 204)
+        return True
+
+    router = http_router.Router()
+    router.route(b'/', page, methods=(b'GET', b'POST'))
+    body = b'GET / HTTP/1.1\r\n\r\n' * (http_router.MAX_SKIPPED_BODY // 10)
+    reader = Reader(b'POST / HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+    assert len(_collect(router, reader)) == 1
+    assert served == [b'/']
+    assert reader.consumed < 2 * http_router.MAX_SKIPPED_BODY
+
+
+def test_bad_content_length_closes_the_connection():
+    router = http_router.Router()
+    for length in (b'-5', b'x'):
+        reader = Reader(b'POST /missing HTTP/1.1\r\nContent-Length: %s\r\n\r\nGET / HTTP/1.1\r\n\r\n' % length)
+        assert len(_collect(router, reader)) == 1
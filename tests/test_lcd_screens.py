@@ -0,0 +1,64 @@
+# test_lcd_screens.py - The LCD version's screens follow the shared state
+import contextlib
+import io
+
+UNKNOWN_TAG = b'\x01\x02\x03\x04'
+
+
+def _screen(s):
+    return tuple(bytes(line).decode().rstrip() for line in s.fw.lcd._shadow)
+
+
+def _fit(s, lines):
+    """lines as the display shows them: cut to its width."""
+    return tuple(line[:s.fw.lcd.num_columns] for line in lines)
+
+
+def _quiet(func, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+
+
+def test_lock_open_and_auto_close(lcd_door):
+    fw = lcd_door.fw
+    _quiet(lcd_door.present, fw.AUTHORIZED_TAGS[0])
+    assert _screen(lcd_door) == _fit(lcd_door, ("RFID Authorized!", "Code: " + fw.active_door.code))
+    _quiet(lcd_door.enter, fw.active_door.code)
+    assert _screen(lcd_door) == _fit(lcd_door, ("Lock OPENED!", fw.active_door.name))
+    _quiet(lcd_door.step, fw.LOCK_OPEN_DURATION_MS)
+    assert _screen(lcd_door) == _fit(lcd_door, ("Lock Closed!", "Timeout"))
+    _quiet(lcd_door.step, fw.MESSAGE_HOLD_MS + 20)
+    assert _screen(lcd_door) == fw.IDLE_SCREEN
+
+
+def test_wrong_code_and_code_expiry(lcd_door):
+    fw = lcd_door.fw
+    _quiet(lcd_door.present, fw.AUTHORIZED_TAGS[0])
+    wrong = "00000" if fw.active_door.code != "00000" else "11111"
+    _quiet(lcd_door.enter, wrong)
+    assert _screen(lcd_door) == _fit(lcd_door, ("Incorrect Code!", "Try Again"))
+    _quiet(lcd_door.present, fw.AUTHORIZED_TAGS[0])
+    _quiet(lcd_door.step, fw.CODE_VALID_MS)
+    assert _screen(lcd_door) == _fit(lcd_door, ("Code Expired!", "Scan RFID again"))
+
+
+def test_input_timeout_and_clear(lcd_door):
+    fw = lcd_door.fw
+    _quiet(lcd_door.enter, "12")
+    assert _screen(lcd_door)[0] == "Enter Code:"
+    _quiet(lcd_door.step, fw.INPUT_TIMEOUT_MS)
+    assert _screen(lcd_door) == _fit(lcd_door, ("Input Timeout!", ""))
+    _quiet(lcd_door.press, '*')
+    assert _screen(lcd_door) == _fit(lcd_door, ("Input Cleared!", ""))
+
+
+def test_repeated_event_is_shown_again(lcd_door):
+    fw = lcd_door.fw
+    _quiet(lcd_door.present, UNKNOWN_TAG)
+    assert _screen(lcd_door) == _fit(lcd_door, ("Unauthorized Tag!", "Access Denied"))
+    _quiet(lcd_door.step, fw.MESSAGE_HOLD_MS + 20)
+    assert _screen(lcd_door) == fw.IDLE_SCREEN
+    version = fw.state.version
+    _quiet(lcd_door.present, UNKNOWN_TAG) # Same status as before: nothing changes, but it is a new scan
+    assert _screen(lcd_door) == _fit(lcd_door, ("Unauthorized Tag!", "Access Denied"))
+    assert not fw.state.changed_since(version, fw.state.mask(('status', 'tone')))
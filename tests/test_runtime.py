@@ -0,0 +1,60 @@
+# test_runtime.py - Task supervision in runtime.run()
+import asyncio
+
+import runtime
+
+
+def test_failing_task_does_not_stop_the_others():
+    ticks = []
+
+    async def failing():
+        await runtime.sleep_ms(5)
+        raise RuntimeError("handler bug")
+
+    async def door(): # Stands in for the RFID/keypad/lock tasks
+        for _ in range(10):
+            ticks.append(1)
+            await runtime.sleep_ms(2)
+
+    async def main():
+        task = asyncio.ensure_future(runtime.supervise(failing))
+        await runtime.supervise(door)
+        task.cancel()
+
+    asyncio.run(main())
+    assert len(ticks) == 10
+
+
+def test_failed_task_is_restarted_with_backoff(monkeypatch):
+    monkeypatch.setattr(runtime, 'RESTART_MIN_MS', 10)
+    starts = []
+
+    async def flaky():
+        starts.append(asyncio.get_event_loop().time())
+        if len(starts) < 4:
+            raise RuntimeError("handler bug")
+
+    runtime.run(flaky) # Returns once the task finishes without raising
+    assert len(starts) == 4
+    gaps = [starts[i + 1] - starts[i] for i in range(3)]
+    assert gaps[0] >= 0.009 and gaps[1] >= 0.019 and gaps[2] >= 0.039
+
+
+def test_restart_delay_doubles_up_to_the_limit():
+    assert runtime.restart_delay_ms(1) == runtime.RESTART_MIN_MS
+    assert runtime.restart_delay_ms(2) == 2 * runtime.RESTART_MIN_MS
+    assert runtime.restart_delay_ms(100) == runtime.RESTART_MAX_MS
+
+
+def test_cancellation_is_not_swallowed():
+    async def main():
+        task = asyncio.ensure_future(runtime.supervise(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(main())
@@ -0,0 +1,34 @@
+# test_static_files.py - Versioned URLs of the static assets
+import os
+
+import static_files
+
+
+def _asset(tmp_path, monkeypatch):
+    (tmp_path / 'static').mkdir()
+    monkeypatch.setattr(static_files, 'BASE_DIR', str(tmp_path) + '/')
+    return static_files.StaticAsset('style.css', b'text/css')
+
+
+def _write(path, data, mtime):
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_link_follows_a_file_replaced_at_runtime(tmp_path, monkeypatch):
+    asset = _asset(tmp_path, monkeypatch)
+    css = tmp_path / 'static' / 'style.css'
+    assert asset.link() == b'/static/style.css?v=0' # Not uploaded yet
+
+    _write(css, b'body{color:red}', 1000)
+    first = asset.link()
+    assert first != b'/static/style.css?v=0'
+    assert asset.link() == first
+
+    _write(css, b'body{color:blue}', 2000)
+    second = asset.link()
+    assert second != first
+    assert asset.plain_size == len(b'body{color:blue}')
+
+    _write(css, b'body{color:lime}', 3000) # Same size: the mtime tells
+    assert asset.link() not in (first, second)
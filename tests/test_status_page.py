@@ -0,0 +1,42 @@
+# test_status_page.py - The served page against the cached page values, and the code it shows
+import re
+
+
+def _code(page):
+    return re.search(rb'id="code">(\d*)</div>', page).group(1)
+
+
+def test_decoy_code_does_not_leak_into_the_cached_page(door):
+    fw = door.fw
+    fw.set_code(fw.active_door, "")
+    pages = [door.get(fw.serve_web_page) for _ in range(5)]
+    decoys = set(_code(page) for page in pages)
+    assert all(len(code) == 5 for code in decoys)
+    assert len(decoys) > 1 # A new decoy on every visit
+    assert fw.page_view.get()['code'] == b''
+
+    fw.set_code(fw.active_door, "12345")
+    assert _code(door.get(fw.serve_web_page)) == b'12345'
+
+
+def test_scans_at_another_door_leave_the_shown_code_alone(door):
+    fw = door.fw
+    back = fw.add_door("Back door", 100, 200)
+    door.present(fw.AUTHORIZED_TAGS[0]) # Front door: the keypad now answers its code
+    code = fw.doors[0].code
+    assert fw.state.get('code') == code
+
+    back.reader.present([9, 9, 9, 9]) # Unauthorized at the back door
+    door.step(50)
+    back.reader.remove()
+    door.step(50)
+    assert fw.state.get('status') == "Back door: Unauthorized RFID Tag."
+    assert fw.active_door is fw.doors[0]
+    assert fw.state.get('code') == code
+    assert _code(door.get(fw.serve_web_page)) == code.encode()
+
+    back.reader.present(fw.AUTHORIZED_TAGS[0]) # Authorized there: now the back door's code is shown
+    assert door.run_until(lambda: fw.active_door is back) is not None
+    back.reader.remove()
+    assert fw.active_door is back
+    assert fw.state.get('code') == back.code != ""
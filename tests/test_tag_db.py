@@ -0,0 +1,162 @@
+# test_tag_db.py - Flash tag database: lookups, validity windows and the disabled flag
+import tag_db
+
+NOW = 1750000000 # A set clock: mid 2025
+
+
+def _write(tmp_path, records, name='tags.db'):
+    path = str(tmp_path / name)
+    tag_db.write_database(path, records)
+    return path
+
+
+def test_windows_are_checked_against_a_set_clock(tmp_path, monkeypatch):
+    monkeypatch.setattr(tag_db, 'unix_time', lambda: NOW)
+    path = _write(tmp_path, [
+        tag_db.pack_record(b'\x01\x02\x03\x04', 'future', valid_from=NOW + 3600),
+        tag_db.pack_record(b'\x05\x06\x07\x08', 'expired', valid_until=NOW - 3600),
+        tag_db.pack_record(b'\x09\x0a\x0b\x0c', 'current', valid_from=NOW - 3600, valid_until=NOW + 3600),
+    ])
+    db = tag_db.TagDatabase(path)
+    try:
+        assert b'\x01\x02\x03\x04' not in db
+        assert b'\x05\x06\x07\x08' not in db
+        assert b'\x09\x0a\x0b\x0c' in db
+    finally:
+        db.close()
+
+
+def test_windows_are_skipped_until_the_clock_is_set(tmp_path, monkeypatch):
+    monkeypatch.setattr(tag_db, 'unix_time', lambda: 1609459200) # rp2 RTC default, 2021-01-01
+    path = _write(tmp_path, [
+        tag_db.pack_record(b'\x01\x02\x03\x04', 'from 2025', valid_from=NOW),
+        tag_db.pack_record(b'\x05\x06\x07\x08', 'disabled', flags=tag_db.FLAG_DISABLED),
+    ])
+    db = tag_db.TagDatabase(path)
+    try:
+        assert not tag_db.clock_is_set()
+        assert b'\x01\x02\x03\x04' in db
+        assert b'\x05\x06\x07\x08' not in db # Disabled does not depend on the clock
+        assert not db.check(b'\x01\x02\x03\x04', now=NOW - 1) # An explicit time is always honoured
+    finally:
+        db.close()
+
+
+def test_binary_search_finds_every_tag_and_nothing_else(tmp_path):
+    import random
+    rng = random.Random(9)
+    uids = set()
+    while len(uids) < 500:
+        uids.add(bytes(rng.getrandbits(8) for _ in range(rng.choice((4, 7, 10)))))
+    uids = sorted(uids)
+    path = _write(tmp_path, [tag_db.pack_record(uid, 'badge %d' % i) for i, uid in enumerate(uids)])
+    db = tag_db.TagDatabase(path)
+    try:
+        assert len(db) == 500
+        for i, uid in enumerate(uids):
+            assert db.find(uid)
+            assert db.label() == 'badge %d' % i
+        others = 0
+        while others < 200:
+            uid = bytes(rng.getrandbits(8) for _ in range(rng.choice((4, 7, 10))))
+            if uid not in uids:
+                assert not db.find(uid)
+                others += 1
+        assert not db.find(b'\x01' * 11) # Longer than any key
+        assert not db.find(b'')
+    finally:
+        db.close()
+
+
+def test_disabled_flag_refuses_the_tag(tmp_path):
+    path = _write(tmp_path, [
+        tag_db.pack_record(b'\x01\x02\x03\x04', 'on'),
+        tag_db.pack_record(b'\x05\x06\x07\x08', 'off', flags=tag_db.FLAG_DISABLED),
+    ])
+    db = tag_db.TagDatabase(path)
+    try:
+        assert b'\x01\x02\x03\x04' in db
+        assert db.find(b'\x05\x06\x07\x08') and db.flags() & tag_db.FLAG_DISABLED
+        assert b'\x05\x06\x07\x08' not in db
+    finally:
+        db.close()
+
+
+def test_damaged_files_fall_back_instead_of_raising(tmp_path, capsys):
+    good = _write(tmp_path, [tag_db.pack_record(bytes([i, 1, 2, 3]), 'x') for i in range(10)])
+    with open(good, 'rb') as f:
+        data = f.read()
+    damaged = {
+        'empty': b'',
+        'short header': data[:10],
+        'bad magic': b'XXXX' + data[4:],
+        'cut records': data[:-20],
+        'extra bytes': data + b'\x00' * 7,
+    }
+    for name, content in damaged.items():
+        path = str(tmp_path / name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        assert tag_db.open_database(path) is None, name
+    assert tag_db.open_database(str(tmp_path / 'missing.db')) is None
+    assert 'Ignoring tag database' in capsys.readouterr().out
+
+    with open(str(tmp_path / 'tags.db'), 'wb') as f:
+        f.write(data[:-20])
+    store = tag_db.CredentialStore(str(tmp_path / 'tags.db'), {b'\xaa\xbb\xcc\xdd'})
+    assert b'\xaa\xbb\xcc\xdd' in store # AUTHORIZED_TAGS stand-in
+    assert bytes([0, 1, 2, 3]) not in store
+
+
+def _fat_rename(monkeypatch, fail_on=None):
+    """Makes os.rename refuse to overwrite, as on FAT; fail_on=(src, dst) also fails that one rename."""
+    import os
+    rename = os.rename
+
+    def fat(src, dst):
+        if os.path.exists(dst) or (src, dst) == fail_on:
+            raise OSError(17, 'EEXIST')
+        rename(src, dst)
+    monkeypatch.setattr(tag_db.os, 'rename', fat)
+
+
+def test_replace_on_fat_keeps_a_backup_until_the_new_file_is_in_place(tmp_path, monkeypatch):
+    old = _write(tmp_path, [tag_db.pack_record(b'\x01\x02\x03\x04', 'old')])
+    new = _write(tmp_path, [tag_db.pack_record(b'\x05\x06\x07\x08', 'new')], name='tags.db.tmp')
+    _fat_rename(monkeypatch)
+    store = tag_db.CredentialStore(old, set())
+    store.replace(new)
+    assert b'\x05\x06\x07\x08' in store and b'\x01\x02\x03\x04' not in store
+    assert not (tmp_path / 'tags.db.bak').exists()
+
+
+def test_failed_replace_on_fat_keeps_the_old_database(tmp_path, monkeypatch):
+    old = _write(tmp_path, [tag_db.pack_record(b'\x01\x02\x03\x04', 'old')])
+    new = _write(tmp_path, [tag_db.pack_record(b'\x05\x06\x07\x08', 'new')], name='tags.db.tmp')
+    _fat_rename(monkeypatch, fail_on=(new, old))
+    store = tag_db.CredentialStore(old, set())
+    try:
+        store.replace(new)
+    except OSError:
+        pass
+    else:
+        assert False, "replace() should have failed"
+    assert b'\x01\x02\x03\x04' in store
+    assert not (tmp_path / 'tags.db.bak').exists()
+
+
+def test_boot_restores_the_backup_of_an_interrupted_replace(tmp_path):
+    # A reset after the old file was moved aside, before the new one took its place.
+    _write(tmp_path, [tag_db.pack_record(b'\x01\x02\x03\x04', 'old')], name='tags.db.bak')
+    store = tag_db.CredentialStore(str(tmp_path / 'tags.db'), set())
+    assert b'\x01\x02\x03\x04' in store
+    assert (tmp_path / 'tags.db').exists() and not (tmp_path / 'tags.db.bak').exists()
+
+
+def test_boot_drops_the_backup_once_the_new_file_is_in_place(tmp_path):
+    # A reset after the new file was renamed into place, before the backup was removed.
+    _write(tmp_path, [tag_db.pack_record(b'\x01\x02\x03\x04', 'old')], name='tags.db.bak')
+    path = _write(tmp_path, [tag_db.pack_record(b'\x05\x06\x07\x08', 'new')])
+    store = tag_db.CredentialStore(path, set())
+    assert b'\x05\x06\x07\x08' in store and b'\x01\x02\x03\x04' not in store
+    assert not (tmp_path / 'tags.db.bak').exists()
@@ -0,0 +1,55 @@
+# test_tag_presence.py - A badge resting on the reader, against ISO 14443-3 card states
+import mfrc522
+import tag_presence
+
+UID = b'\x01\x02\x03\x04'
+
+
+def _reader(halts=True):
+    rdr = mfrc522.MFRC522()
+    if not halts:
+        rdr.halt = None # A driver without HLTA
+    rdr.present(UID)
+    return rdr
+
+
+def test_selected_card_ignores_the_next_reqa():
+    rdr = _reader()
+    answers = []
+    for _ in range(6):
+        status, tag_type = rdr.request(rdr.REQIDL)
+        answers.append(status == rdr.OK)
+        if status == rdr.OK:
+            rdr.SelectTag(tag_type)
+    assert answers == [True, False, True, False, True, False]
+
+
+def test_held_card_is_selected_once():
+    rdr = _reader()
+    presence = tag_presence.TagPresence()
+    uids = [presence.scan(rdr) for _ in range(50)]
+    assert uids[0] == list(UID) and uids[1:] == [None] * 49
+    assert presence.selects == 1 and presence.selects_skipped == 49
+    assert presence.holding and rdr.state == mfrc522.HALT
+
+
+def test_held_card_without_halt_is_still_one_presentation():
+    rdr = _reader(halts=False)
+    presence = tag_presence.TagPresence()
+    uids = [presence.scan(rdr) for _ in range(50)]
+    assert uids.count(list(UID)) == 1
+    assert presence.presentations == 1 and presence.selects == 25 # Every other poll is a miss
+
+
+def test_card_taken_away_and_back_is_a_new_presentation(monkeypatch):
+    now = [0]
+    monkeypatch.setattr(tag_presence.time, 'ticks_ms', lambda: now[0])
+    rdr = _reader()
+    presence = tag_presence.TagPresence()
+    assert presence.scan(rdr) == list(UID)
+    rdr.remove()
+    assert presence.scan(rdr) is None and not presence.holding
+    now[0] += tag_presence.HOLD_GAP_MS + 1
+    rdr.present(UID)
+    assert presence.scan(rdr) == list(UID)
+    assert presence.presentations == 2
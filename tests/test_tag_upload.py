@@ -0,0 +1,107 @@
+# test_tag_upload.py - PUT /api/tags: streaming a new badge database into place
+import asyncio
+
+import http_router
+import tag_db
+import tag_store
+import tag_upload
+from conftest import Reader, Writer
+
+TOKEN = b'secret'
+FALLBACK = [b'\xaa\xbb\xcc\xdd']
+
+
+def _request(body, token=TOKEN, length=None):
+    return (b'PUT /api/tags HTTP/1.1\r\nAuthorization: Bearer %s\r\nContent-Length: %d\r\n\r\n%s'
+            % (token, len(body) if length is None else length, body))
+
+
+async def _put(store, reader):
+    request = http_router.Request(reader)
+    assert await request.read_head(1000)
+    writer = Writer()
+    await tag_upload.receive(request, writer, store, TOKEN)
+    return writer.out
+
+
+def _store(tmp_path):
+    return tag_db.CredentialStore(str(tmp_path / 'tags.db'), tag_store.TagIndex(FALLBACK))
+
+
+def test_second_upload_is_refused_while_one_is_running(tmp_path):
+    store = _store(tmp_path)
+    first_body = b'01020304,first\n05060708,second\n'
+
+    async def main():
+        first = Reader(_request(first_body), stall_at=len(_request(first_body)) - 10)
+        running = asyncio.ensure_future(_put(store, first))
+        await asyncio.sleep(0.01) # First upload is now waiting for the rest of its body
+        refused = await _put(store, Reader(_request(b'0a0b0c0d,other\n')))
+        first.hold.set()
+        return refused, await running
+
+    refused, accepted = asyncio.run(main())
+    assert refused.startswith(b'HTTP/1.1 409 ')
+    assert accepted.startswith(b'HTTP/1.1 200 ')
+    assert b'\x01\x02\x03\x04' in store and b'\x0a\x0b\x0c\x0d' not in store
+    assert asyncio.run(_put(store, Reader(_request(b'0a0b0c0d,other\n')))).startswith(b'HTTP/1.1 200 ')
+
+
+def _installed(tmp_path):
+    """A store already holding one uploaded badge, 01020304."""
+    store = _store(tmp_path)
+    assert asyncio.run(_put(store, Reader(_request(b'01020304,first\n')))).startswith(b'HTTP/1.1 200 ')
+    return store
+
+
+def _assert_unchanged(store, tmp_path):
+    assert b'\x01\x02\x03\x04' in store and b'\x05\x06\x07\x08' not in store
+    assert not (tmp_path / ('tags.db' + tag_upload.TMP_SUFFIX)).exists()
+
+
+def test_upload_replaces_the_database(tmp_path):
+    store = _installed(tmp_path)
+    out = asyncio.run(_put(store, Reader(_request(b'# badges\n05060708,new\n\n0a0b0c0d,other,,,yes\n'))))
+    assert out.startswith(b'HTTP/1.1 200 ') and out.endswith(b'{"tags":2}')
+    assert b'\x05\x06\x07\x08' in store and b'\x01\x02\x03\x04' not in store
+    assert b'\x0a\x0b\x0c\x0d' not in store # Uploaded as disabled
+    assert b'\xaa\xbb\xcc\xdd' not in store # The fallback list no longer applies
+
+
+def test_wrong_token_is_refused(tmp_path):
+    store = _installed(tmp_path)
+    for token in (b'wrong!', b'secret2', b''):
+        out = asyncio.run(_put(store, Reader(_request(b'05060708,new\n', token=token))))
+        assert out.startswith(b'HTTP/1.1 401 ')
+        assert b'WWW-Authenticate: Bearer' in out
+    _assert_unchanged(store, tmp_path)
+
+
+def test_truncated_body_keeps_the_old_database(tmp_path):
+    store = _installed(tmp_path)
+    body = b'05060708,new\n0a0b0c0d,other\n'
+    out = asyncio.run(_put(store, Reader(_request(body[:20], length=len(body))))) # Connection closes early
+    assert out.startswith(b'HTTP/1.1 400 ')
+    _assert_unchanged(store, tmp_path)
+
+
+def test_unsorted_lines_are_rejected(tmp_path):
+    store = _installed(tmp_path)
+    out = asyncio.run(_put(store, Reader(_request(b'05060708,b\n0a0b0c0d,c\n0a0b0c,short uid sorts first\n'))))
+    assert out.startswith(b'HTTP/1.1 400 ')
+    assert b'line 3: not in UID order' in out
+    out = asyncio.run(_put(store, Reader(_request(b'05060708,b\n05060708,again\n'))))
+    assert out.startswith(b'HTTP/1.1 400 ') and b'line 2' in out # Duplicates are refused too
+    _assert_unchanged(store, tmp_path)
+
+
+def test_failed_replace_answers_500_and_removes_the_upload(tmp_path, monkeypatch):
+    store = _installed(tmp_path)
+
+    def full(src, dst):
+        raise OSError(28, 'ENOSPC')
+    monkeypatch.setattr(tag_db.os, 'rename', full)
+    out = asyncio.run(_put(store, Reader(_request(b'05060708,new\n'))))
+    assert out.startswith(b'HTTP/1.1 500 ')
+    assert b'Connection: close' in out
+    _assert_unchanged(store, tmp_path)
@@ -0,0 +1,89 @@
+# test_timers.py - Lock, code, input and LCD deadlines against their settings, on a virtual clock
+import contextlib
+import io
+
+import timer_wheel
+from conftest import LOOP_MS
+
+
+def _tolerance(fw):
+    # Deadlines fire on the timer wheel, which the hardware loop advances every TIMER_TICK_MS.
+    return fw.TIMER_TICK_MS + 2 * LOOP_MS
+
+
+def _assert_close(taken, expected, fw):
+    assert taken is not None, "deadline never fired"
+    assert expected <= taken <= expected + _tolerance(fw)
+
+
+def test_lock_auto_close(door):
+    fw = door.fw
+    relay = fw.doors[0].relay
+    with contextlib.redirect_stdout(io.StringIO()):
+        door.present(fw.AUTHORIZED_TAGS[0])
+        code = fw.active_door.code
+        door.enter(code[:-1])
+        door.matrix.down(code[-1])
+        assert door.run_until(lambda: relay.value() == 1) is not None
+        door.matrix.up(code[-1])
+        taken = door.run_until(lambda: relay.value() == 0, fw.LOCK_OPEN_DURATION_MS * 2)
+    _assert_close(taken, fw.LOCK_OPEN_DURATION_MS, fw)
+
+
+def test_code_expiry(door):
+    fw = door.fw
+    with contextlib.redirect_stdout(io.StringIO()):
+        door.reader.present(fw.AUTHORIZED_TAGS[0])
+        assert door.run_until(lambda: fw.doors[0].presence.holding) is not None
+        door.reader.remove()
+        taken = door.run_until(lambda: fw.active_door.code == "", fw.CODE_VALID_MS * 2)
+    # Measured from the scan being accepted, which is when the code's timer starts.
+    _assert_close(taken, fw.CODE_VALID_MS, fw)
+
+
+def test_input_timeout(door):
+    fw = door.fw
+    with contextlib.redirect_stdout(io.StringIO()):
+        door.press('4', 60, 0)
+        assert fw.entry.count == 1
+        taken = door.run_until(lambda: fw.entry.count == 0, fw.INPUT_TIMEOUT_MS * 2)
+    # The timeout runs from the key being accepted, KEYPAD_DEBOUNCE_MS after it went down.
+    _assert_close(60 + taken - fw.KEYPAD_DEBOUNCE_MS, fw.INPUT_TIMEOUT_MS, fw)
+
+
+def test_lcd_message_reverts(lcd_door):
+    fw = lcd_door.fw
+
+    def lcd_shows(text):
+        return bytes(fw.lcd._shadow[0]).startswith(text)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        lcd_door.matrix.down('*')
+        assert lcd_door.run_until(lambda: lcd_shows(b"Input Cleared!")) is not None
+        lcd_door.matrix.up('*')
+        taken = lcd_door.run_until(lambda: lcd_shows(fw.IDLE_SCREEN[0].encode()), fw.MESSAGE_HOLD_MS * 2)
+    _assert_close(taken, fw.MESSAGE_HOLD_MS, fw)
+
+
+def test_timer_scheduled_by_a_callback_after_a_stall_is_not_early(clock):
+    wheel = timer_wheel.TimerWheel(10)
+    fired_at = []
+
+    def second():
+        fired_at.append(clock.us / 1000)
+
+    follow_up = timer_wheel.Timer(second)
+    scheduled_at = []
+
+    def first():
+        scheduled_at.append(clock.us / 1000)
+        wheel.schedule(follow_up, 50)
+
+    wheel.schedule(timer_wheel.Timer(first), 10)
+    clock.advance_ms(200) # The loop stalled: one advance() covers 20 ticks
+    wheel.advance()
+    assert scheduled_at == [200] and fired_at == []
+    while not fired_at:
+        clock.advance_ms(1)
+        wheel.advance()
+    assert 50 <= fired_at[0] - scheduled_at[0] <= 50 + wheel.tick_ms
@@ -0,0 +1,51 @@
+# test_wifi_supervisor.py - The cached IP configuration is confirmed with DHCP
+import asyncio
+
+import network
+import wifi_supervisor
+
+DHCP_CONFIG = ('127.0.0.1', '255.255.255.0', '127.0.0.1', '127.0.0.1') # What the stand-in's DHCP hands out
+
+
+def _run(supervisor, until, timeout_s=2):
+    async def main():
+        task = asyncio.ensure_future(supervisor.run())
+        for _ in range(int(timeout_s * 1000)):
+            await asyncio.sleep(0.001)
+            if until():
+                break
+        task.cancel()
+    asyncio.run(main())
+
+
+def test_cached_configuration_is_rechecked_with_dhcp(tmp_path, monkeypatch):
+    monkeypatch.setattr(wifi_supervisor, 'LINK_CHECK_INTERVAL_MS', 1)
+    monkeypatch.setattr(wifi_supervisor, 'CACHE_RECHECK_MS', 20)
+    path = tmp_path / 'wifi.cfg'
+    path.write_text('10.0.0.5 255.255.255.0 10.0.0.1 10.0.0.1') # Left over from another network
+    ups = []
+
+    async def on_up(supervisor):
+        ups.append((supervisor.static, supervisor.ip))
+
+    wlan = network.WLAN(network.STA_IF)
+    supervisor = wifi_supervisor.WifiSupervisor(wlan, 'ssid', 'password', on_up=on_up, cache_path=str(path))
+    _run(supervisor, lambda: len(ups) == 2)
+    assert ups == [(True, '10.0.0.5'), (False, '127.0.0.1')]
+    assert supervisor.drops == 0 # The re-check is not counted as a lost link
+    assert wlan.static_config is None
+    assert tuple(path.read_text().split()) == DHCP_CONFIG
+
+
+def test_dhcp_link_is_not_rechecked(tmp_path, monkeypatch):
+    monkeypatch.setattr(wifi_supervisor, 'LINK_CHECK_INTERVAL_MS', 1)
+    monkeypatch.setattr(wifi_supervisor, 'CACHE_RECHECK_MS', 5)
+    ups = []
+
+    async def on_up(supervisor):
+        ups.append(supervisor.static)
+
+    supervisor = wifi_supervisor.WifiSupervisor(network.WLAN(network.STA_IF), 'ssid', 'password', on_up=on_up,
+                                                cache_path=str(tmp_path / 'wifi.cfg'))
+    _run(supervisor, lambda: False, timeout_s=0.1)
+    assert ups == [False]
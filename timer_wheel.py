@@ -0,0 +1,115 @@
+# timer_wheel.py - Hashed timer wheel for the firmware's timeouts
+# Lock auto-close, code expiry, input timeouts and LCD message reversion are
+# Timer objects on one wheel instead of timestamps polled in every loop or
+# blocking sleeps. Scheduling and cancelling are O(1): each slot is a
+# circular doubly linked list, and a timer more than one turn away carries a
+# rounds count instead of being sorted anywhere. advance() is called
+# regularly and fires whatever has come due since the last call.
+#
+# Timers never fire early: a delay is rounded up to whole ticks, counting the
+# part of the current tick that has already passed.
+import time
+
+TICK_MS = 10
+SLOTS = 64
+
+_DUE = -1 # rounds value of a timer taken off its slot, about to fire
+
+
+class Timer:
+    """A reusable timeout: callback() runs once each time it comes due."""
+    def __init__(self, callback):
+        self.callback = callback
+        self.rounds = 0
+        self.prev = None
+        self.next = None
+        self._due_next = None
+
+    def pending(self):
+        return self.next is not None
+
+
+class TimerWheel:
+    def __init__(self, tick_ms=TICK_MS, slots=SLOTS):
+        self.tick_ms = tick_ms
+        self._slots = []
+        for _ in range(slots):
+            head = Timer(None) # Sentinel: an empty slot points at itself
+            head.prev = head
+            head.next = head
+            self._slots.append(head)
+        self._cursor = 0
+        self._last_ms = time.ticks_ms() # Start of the current tick
+        self.pending = 0
+        self.fired = 0
+
+    def schedule(self, timer, delay_ms):
+        """(Re)arms timer to fire delay_ms from now."""
+        self.cancel(timer)
+        into_tick = time.ticks_diff(time.ticks_ms(), self._last_ms)
+        ticks = (delay_ms + into_tick + self.tick_ms - 1) // self.tick_ms
+        if ticks < 1:
+            ticks = 1
+        n = len(self._slots)
+        timer.rounds = (ticks - 1) // n
+        head = self._slots[(self._cursor + ticks) % n]
+        timer.prev = head.prev
+        timer.next = head
+        head.prev.next = timer
+        head.prev = timer
+        self.pending += 1
+
+    def cancel(self, timer):
+        """Disarms timer; harmless if it is not pending."""
+        if timer.next is None:
+            timer.rounds = 0 # Also stops it if it is due in the advance() now running
+            return
+        timer.prev.next = timer.next
+        timer.next.prev = timer.prev
+        timer.prev = None
+        timer.next = None
+        self.pending -= 1
+
+    def advance(self):
+        """Runs the callbacks of every timer that has come due; returns how many fired."""
+        elapsed = time.ticks_diff(time.ticks_ms(), self._last_ms)
+        if elapsed < self.tick_ms:
+            return 0
+        steps = elapsed // self.tick_ms
+        fired = 0
+        slots = self._slots
+        n = len(slots)
+        for _ in range(steps):
+            # The cursor and the tick start move together, so a callback that schedules a timer
+            # counts from the tick being fired, not from a later one (which would fire it early).
+            self._cursor = (self._cursor + 1) % n
+            self._last_ms = time.ticks_add(self._last_ms, self.tick_ms)
+            if not self.pending:
+                continue # Still turn the cursor, so slots stay relative to now
+            # Take the due timers off the slot first, so callbacks can schedule and cancel freely.
+            head = slots[self._cursor]
+            due = last = None
+            timer = head.next
+            while timer is not head:
+                following = timer.next
+                if timer.rounds:
+                    timer.rounds -= 1
+                else:
+                    self.cancel(timer)
+                    timer.rounds = _DUE
+                    if last is None:
+                        due = timer
+                    else:
+                        last._due_next = timer
+                    last = timer
+                timer = following
+            while due is not None:
+                timer = due
+                due = timer._due_next
+                timer._due_next = None
+                if timer.rounds == _DUE:
+                    timer.rounds = 0
+                    fired += 1
+                    timer.callback()
+        self.fired += fired
+        return fired
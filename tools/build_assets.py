@@ -0,0 +1,35 @@
+# build_assets.py - Gzip-compresses the web assets in static/
+# Usage: python tools/build_assets.py [static directory]
+#
+# Writes name.gz next to every file in static/ (existing .gz files are
+# rebuilt). Upload the whole static/ folder to the Pico W; the firmware serves
+# the .gz copy to browsers that accept gzip and the plain file otherwise.
+import gzip
+import os
+import sys
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+def compress(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    # mtime=0 keeps the output identical between builds, so the asset version only changes with the content.
+    packed = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(path + '.gz', 'wb') as f:
+        f.write(packed)
+    return (len(data), len(packed))
+
+
+def main(argv):
+    directory = argv[1] if len(argv) > 1 else STATIC_DIR
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith('.gz') or not os.path.isfile(path):
+            continue
+        plain, packed = compress(path)
+        print("%-12s %6d -> %5d bytes" % (name, plain, packed))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
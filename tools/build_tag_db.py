@@ -0,0 +1,56 @@
+# build_tag_db.py - Builds a tags.db credential file from a CSV badge list
+# Usage: python tools/build_tag_db.py badges.csv tags.db
+#
+# CSV columns (header row required, only uid is mandatory):
+#   uid          hex bytes, e.g. 04:1A:2B:3C:4D:5E:6F or 041A2B3C4D5E6F
+#   label        up to 16 bytes of UTF-8, e.g. a name or badge number
+#   valid_from   Unix seconds or YYYY-MM-DD[THH:MM[:SS]] (UTC); empty = no limit
+#   valid_until  same format; empty = no limit
+#   disabled     1/yes/true to keep the badge on file but refuse it
+# Upload the resulting file to the Pico W next to main.py.
+import csv
+import os
+import sys
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tag_db  # noqa: E402
+
+
+def parse_uid(text):
+    digits = text.replace(':', '').replace('-', '').replace(' ', '')
+    if digits.lower().startswith('0x'):
+        digits = digits[2:]
+    return bytes.fromhex(digits)
+
+
+def parse_time(text):
+    text = (text or '').strip()
+    if not text:
+        return 0
+    if text.isdigit():
+        return int(text)
+    return int(datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp())
+
+
+def read_records(csv_file):
+    for line, row in enumerate(csv.DictReader(csv_file), start=2):
+        try:
+            flags = tag_db.FLAG_DISABLED if (row.get('disabled') or '').strip().lower() in ('1', 'yes', 'true') else 0
+            yield tag_db.pack_record(parse_uid(row['uid']), (row.get('label') or '').strip(),
+                                     parse_time(row.get('valid_from')), parse_time(row.get('valid_until')), flags)
+        except (KeyError, ValueError) as e:
+            raise SystemExit("line %d: %s" % (line, e))
+
+
+def main(argv):
+    if len(argv) != 3:
+        raise SystemExit("usage: build_tag_db.py badges.csv tags.db")
+    with open(argv[1], newline='') as csv_file:
+        count = tag_db.write_database(argv[2], read_records(csv_file))
+    print("Wrote %d tags to %s (%d bytes)" % (count, argv[2], tag_db.HEADER_SIZE + count * tag_db.RECORD_SIZE))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,378 @@
+# fleet.py - Watches many lock controllers from one PC
+# Usage: python tools/fleet.py [options] hosts.txt | host[:port] ...
+#
+# hosts.txt holds one "host[:port] [name]" per line; blank lines and
+# # comments are skipped.
+#
+# Every controller is polled concurrently on one asyncio loop. Each has one
+# kept-alive connection for GET /api/status and sends back the last ETag, so
+# an unchanged controller costs a header-only 304 per poll. The status carries
+# the number of the latest access event; only when it moves is /api/events
+# read, from the last event already seen, so the merged event stream gets
+# every access event exactly once. A
+# controller that does not answer within the timeout is marked offline and
+# retried with backoff; the others are never held up by it.
+#
+# Output is one event stream for the whole fleet (status changes, access
+# events, controllers going on/offline) and, with --table or --once, a status
+# table with a row per controller.
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+DEFAULT_PORT = 80
+INTERVAL_S = 2.0      # Between polls of one controller; below the firmware's 5 s keep-alive timeout
+TIMEOUT_S = 3.0       # Per request
+MAX_BACKOFF_S = 60.0  # Longest wait between attempts at an offline controller
+CONCURRENCY = 100     # Requests in flight at once, across the whole fleet
+
+WATCHED_FIELDS = ('lock', 'status', 'code', 'ip', 'rssi') # Changes to these go into the event stream
+
+
+class HttpError(Exception):
+    pass
+
+
+def _json_object(body, what):
+    """Parses a JSON object; anything else is a ValueError, so a malformed answer fails the poll like bad JSON."""
+    value = json.loads(body)
+    if not isinstance(value, dict):
+        raise ValueError("%s: not a JSON object" % what)
+    return value
+
+
+async def read_response(reader):
+    """Reads one HTTP response; returns (status, headers, body, bytes read). Header names are lower case."""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    size = len(line)
+    parts = line.split(None, 2)
+    if len(parts) < 2 or not parts[1].isdigit():
+        raise HttpError("bad status line %r" % line[:40])
+    status = int(parts[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("connection closed in headers")
+        size += len(line)
+        if line == b'\r\n' or line == b'\n':
+            break
+        name, _, value = line.partition(b':')
+        headers[name.strip().lower()] = value.strip()
+    if b'content-length' in headers:
+        body = await reader.readexactly(int(headers[b'content-length']))
+    elif status == 304 or status == 204:
+        body = b''
+    else:
+        body = await reader.read() # Delimited by the server closing the connection
+    return (status, headers, body, size + len(body))
+
+
+class Controller:
+    """One lock controller and what is known about it."""
+    def __init__(self, host, port=DEFAULT_PORT, name=None):
+        self.host = host
+        self.port = port
+        self.name = name or (host if port == DEFAULT_PORT else '%s:%d' % (host, port))
+        self.fields = {}        # Last /api/status body
+        self.etag = None
+        self.online = None      # None until the first answer or failure
+        self.error = ''
+        self.failures = 0       # In a row
+        self.last_seen = 0.0    # time.time() of the last answer
+        self.events_seq = None  # Last access event seen; None until the log has been looked at
+        self.events_due = False # There are access events not read yet
+        self._reader = None
+        self._writer = None
+        # Counters
+        self.requests = 0
+        self.not_modified = 0
+        self.connections = 0    # TCP connections opened
+        self.bytes = 0          # Response bytes read
+
+    @classmethod
+    def parse(cls, text):
+        """Builds a Controller from "host[:port] [name]"."""
+        address, _, name = text.strip().partition(' ')
+        host, _, port = address.rpartition(':') if ':' in address else (address, '', '')
+        return cls(host, int(port) if port else DEFAULT_PORT, name.strip() or None)
+
+    async def close(self):
+        writer = self._writer
+        self._reader = self._writer = None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    def _request(self, path, extra=b''):
+        return b'GET %s HTTP/1.1\r\nHost: %s\r\n%s\r\n' % (path, self.host.encode(), extra)
+
+    async def get(self, path, extra=b''):
+        """
+        GETs path on the kept-alive connection, opening one if needed. A reused
+        connection the controller has meanwhile closed is replaced once.
+        """
+        for retry in (False, True):
+            fresh = self._writer is None or self._reader.at_eof()
+            if fresh:
+                await self.close()
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+                self.connections += 1
+            self._writer.write(self._request(path, extra))
+            try:
+                await self._writer.drain()
+                status, headers, body, size = await read_response(self._reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if fresh or retry:
+                    raise
+                continue
+            self.requests += 1
+            self.bytes += size
+            if headers.get(b'connection', b'').lower() == b'close':
+                await self.close()
+            return (status, headers, body)
+
+    async def fetch(self, path):
+        """GETs path on a connection of its own, for responses that end by closing it."""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        self.connections += 1
+        try:
+            writer.write(self._request(path, b'Connection: close\r\n'))
+            await writer.drain()
+            status, headers, body, size = await read_response(reader)
+        finally:
+            writer.close()
+        self.requests += 1
+        self.bytes += size
+        return (status, headers, body)
+
+    async def poll_status(self):
+        """Polls /api/status; returns the changed fields as (field, old, new) tuples."""
+        status, headers, body = await self.get(b'/api/status', b'If-None-Match: %s\r\n' % self.etag if self.etag else b'')
+        if status == 304:
+            self.not_modified += 1
+            return []
+        if status != 200:
+            raise HttpError("/api/status: HTTP %d" % status)
+        fields = _json_object(body, "/api/status")
+        if not isinstance(fields.get('events', 0), int):
+            raise ValueError("/api/status: malformed events")
+        self.etag = headers.get(b'etag')
+        old = self.fields
+        self.fields = fields
+        changes = [(k, old.get(k), fields.get(k)) for k in WATCHED_FIELDS if old.get(k) != fields.get(k)]
+        latest = fields.get('events')
+        if latest is None:
+            self.events_due = self.events_due or bool(changes) # Older firmware: look whenever the status changed
+        elif self.events_seq is None or latest < self.events_seq:
+            self.events_seq = latest # First look (history is not replayed), or the log was wiped
+        else:
+            self.events_due = latest != self.events_seq
+        return changes
+
+    async def poll_events(self, emit, timeout=TIMEOUT_S):
+        """
+        Calls emit(event) for each access event logged since the last call,
+        oldest first, a page at a time as the pages arrive. events_seq moves
+        past a page only once it has been emitted, and each request has its own
+        timeout, so a later page timing out loses nothing: the next call
+        carries on from there. The first call only notes where the log ends:
+        history is not replayed.
+        """
+        while True:
+            if self.events_seq is None:
+                path = b'/api/events?limit=0' # Only where the log ends
+            else:
+                path = b'/api/events?since=%d' % self.events_seq
+            status, headers, body = await asyncio.wait_for(self.fetch(path), timeout)
+            if status != 200:
+                raise HttpError("/api/events: HTTP %d" % status)
+            page = _json_object(body, "/api/events")
+            if not (isinstance(page.get('latest'), int) and isinstance(page.get('next'), int)
+                    and isinstance(page.get('events'), list) and all(isinstance(e, dict) for e in page['events'])):
+                raise ValueError("/api/events: malformed page")
+            if self.events_seq is None or page['latest'] < self.events_seq or not page['events']:
+                # First look, a wiped log, or events rotated out before they were read.
+                self.events_seq = page['latest']
+                return
+            for event in page['events']:
+                emit(event)
+            self.events_seq = page['next']
+            if page['next'] >= page['latest']:
+                return
+
+
+class Fleet:
+    """
+    Polls every controller concurrently. on_event(controller, kind, detail) is
+    called for each change: kind is a status field name, 'access' (detail is
+    the /api/events record), 'online' or 'offline' (detail is the error).
+    """
+    def __init__(self, controllers, interval=INTERVAL_S, timeout=TIMEOUT_S, concurrency=CONCURRENCY, on_event=None):
+        self.controllers = controllers
+        self.interval = interval
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.on_event = on_event or (lambda controller, kind, detail: None)
+        self._slots = None
+        # Counters
+        self.polls = 0
+        self.timeouts = 0
+
+    async def poll(self, controller):
+        """Polls one controller once and reports what changed."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        async with self._slots:
+            self.polls += 1
+            try:
+                changes = await asyncio.wait_for(controller.poll_status(), self.timeout)
+                self._answered(controller, changes)
+                if controller.events_due:
+                    await controller.poll_events(lambda event: self.on_event(controller, 'access', event), self.timeout)
+                    controller.events_due = False
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                await controller.close() # A request may be half done on it
+                self._failed(controller, "timeout")
+            except (OSError, ValueError, HttpError, asyncio.IncompleteReadError) as e:
+                await controller.close()
+                self._failed(controller, str(e) or e.__class__.__name__)
+
+    def _answered(self, controller, changes):
+        first = controller.online is None
+        controller.last_seen = time.time()
+        controller.failures = 0
+        if not controller.online:
+            controller.online = True
+            controller.error = ''
+            self.on_event(controller, 'online', controller.fields.get('ip', ''))
+        if not first: # The first status is the baseline, not a change
+            for field, old, new in changes:
+                self.on_event(controller, field, new)
+
+    def _failed(self, controller, error):
+        controller.failures += 1
+        controller.error = error
+        if controller.online is not False:
+            controller.online = False
+            self.on_event(controller, 'offline', error)
+
+    async def poll_all(self):
+        """One poll of every controller, all at once."""
+        await asyncio.gather(*[self.poll(c) for c in self.controllers])
+
+    async def _watch(self, controller):
+        await asyncio.sleep(random.uniform(0, self.interval)) # Spread the fleet over the interval
+        while True:
+            await self.poll(controller)
+            if controller.online:
+                await asyncio.sleep(self.interval)
+            else:
+                await asyncio.sleep(min(self.interval * 2 ** controller.failures, MAX_BACKOFF_S))
+
+    async def run(self, table_every=0):
+        """Polls forever; with table_every > 0, prints the status table that often (seconds)."""
+        tasks = [asyncio.ensure_future(self._watch(c)) for c in self.controllers]
+        try:
+            while True:
+                await asyncio.sleep(table_every or 3600)
+                if table_every:
+                    print(format_table(self.controllers))
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.close()
+
+    async def close(self):
+        await asyncio.gather(*[c.close() for c in self.controllers])
+
+
+# --- Output ---
+
+def format_event(controller, kind, detail, now=None):
+    stamp = time.strftime('%H:%M:%S', time.localtime(now or time.time()))
+    if kind == 'access':
+        detail = ('door %s %s %s' % (detail.get('door', 0), detail.get('type', '?'), detail.get('uid', ''))).rstrip()
+    return '%s  %-20s %-8s %s' % (stamp, controller.name, kind, detail)
+
+
+def print_event(controller, kind, detail):
+    print(format_event(controller, kind, detail), flush=True)
+
+
+def format_table(controllers):
+    lines = ['%-20s %-8s %-7s %5s  %s' % ('controller', 'state', 'lock', 'rssi', 'status')]
+    now = time.time()
+    for c in sorted(controllers, key=lambda c: c.name):
+        if c.online:
+            state = 'online'
+        elif c.online is None:
+            state = '?'
+        else:
+            state = 'offline'
+        status = c.fields.get('status', '')
+        if not c.online and c.error:
+            status = c.error if not c.last_seen else '%s (last seen %ds ago)' % (c.error, now - c.last_seen)
+        lines.append('%-20s %-8s %-7s %5s  %s' % (c.name, state, c.fields.get('lock', ''), c.fields.get('rssi', ''), status))
+    online = sum(1 for c in controllers if c.online)
+    opened = sum(1 for c in controllers if c.online and c.fields.get('lock') == 'open')
+    lines.append('%d controllers, %d online, %d open' % (len(controllers), online, opened))
+    return '\n'.join(lines)
+
+
+def read_hosts(args):
+    controllers = []
+    for arg in args:
+        if os.path.isfile(arg):
+            with open(arg) as f:
+                for line in f:
+                    line = line.split('#', 1)[0].strip()
+                    if line:
+                        controllers.append(Controller.parse(line))
+        else:
+            controllers.append(Controller.parse(arg))
+    return controllers
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Poll many lock controllers and merge their state.")
+    parser.add_argument('hosts', nargs='+', help="host[:port] or a file with one per line")
+    parser.add_argument('--interval', type=float, default=INTERVAL_S, help="seconds between polls of a controller")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_S, help="seconds to wait for a controller")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help="requests in flight at once")
+    parser.add_argument('--table', type=float, default=0, help="print the status table every this many seconds")
+    parser.add_argument('--once', action='store_true', help="poll every controller once, print the table and exit")
+    args = parser.parse_intermixed_args(argv[1:])
+    controllers = read_hosts(args.hosts)
+
+    if args.once:
+        fleet = Fleet(controllers, args.interval, args.timeout, args.concurrency)
+
+        async def once():
+            await fleet.poll_all()
+            await fleet.close()
+        asyncio.run(once())
+        print(format_table(controllers))
+        return
+
+    fleet = Fleet(controllers, args.interval, args.timeout, args.concurrency, print_event)
+    try:
+        asyncio.run(fleet.run(args.table))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main(sys.argv)
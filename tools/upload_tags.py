@@ -0,0 +1,80 @@
+# upload_tags.py - Replaces a running controller's badge database from a CSV badge list
+# Usage: UPLOAD_TOKEN=... python tools/upload_tags.py badges.csv host[:port]
+#
+# Reads the same CSV as build_tag_db.py, sorts it the way the database is kept
+# and streams it, chunked, to PUT /api/tags (see tag_upload.py). The token is
+# the firmware's UPLOAD_TOKEN; it is taken from the environment so it does not
+# end up in shell history.
+import http.client
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tag_db  # noqa: E402
+from build_tag_db import read_records  # noqa: E402
+
+LINES_PER_CHUNK = 200
+
+
+def sorted_records(records):
+    """Duplicates keep the last one, as with build_tag_db.py."""
+    by_key = {}
+    for record in records:
+        by_key[bytes(record[:tag_db.KEY_SIZE])] = record
+    return [by_key[key] for key in sorted(by_key)]
+
+
+def record_line(record):
+    """One packed record as a line of the upload body."""
+    key, valid_from, valid_until, flags, label = struct.unpack(tag_db.RECORD_FORMAT, record)
+    uid = key[1:1 + key[0]]
+    label = label.rstrip(b'\x00').decode().replace(',', ' ')
+    return '%s,%s,%d,%d,%d\n' % (uid.hex(), label, valid_from, valid_until, flags & tag_db.FLAG_DISABLED)
+
+
+def body_chunks(records):
+    lines = []
+    for record in records:
+        lines.append(record_line(record))
+        if len(lines) == LINES_PER_CHUNK:
+            yield ''.join(lines).encode()
+            lines = []
+    if lines:
+        yield ''.join(lines).encode()
+
+
+def upload(host, token, records, timeout=30):
+    """Streams records to host ('ip[:port]'); returns (status, response body)."""
+    conn = http.client.HTTPConnection(host, timeout=timeout)
+    try:
+        conn.request('PUT', '/api/tags', body=body_chunks(records), encode_chunked=True,
+                     headers={'Authorization': 'Bearer ' + token, 'Content-Type': 'text/plain'})
+        response = conn.getresponse()
+        return response.status, response.read().decode(errors='replace')
+    finally:
+        conn.close()
+
+
+def main(argv):
+    if len(argv) != 3:
+        raise SystemExit("usage: UPLOAD_TOKEN=... upload_tags.py badges.csv host[:port]")
+    token = os.environ.get('UPLOAD_TOKEN')
+    if not token:
+        raise SystemExit("set UPLOAD_TOKEN to the firmware's UPLOAD_TOKEN")
+    with open(argv[1], newline='') as csv_file:
+        records = sorted_records(read_records(csv_file))
+    start = time.monotonic()
+    status, text = upload(argv[2], token, records)
+    elapsed = time.monotonic() - start
+    if status != 200:
+        raise SystemExit("%s answered %d: %s" % (argv[2], status, text.strip()))
+    print("Uploaded %d tags to %s in %.1f s (%d tags/s)" % (len(records), argv[2], elapsed,
+                                                          len(records) / elapsed if elapsed else 0))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
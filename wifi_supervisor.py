@@ -0,0 +1,192 @@
+# wifi_supervisor.py - Background WiFi connection supervisor
+# Runs as one task next to the hardware tasks: connects without blocking,
+# watches the link and the signal strength, and reconnects with jittered
+# exponential backoff. Callbacks let the firmware start and stop the web
+# server as the link comes and goes.
+#
+# With a cache_path, the last DHCP-assigned configuration is kept on flash and
+# applied as a static configuration on the next connect, which skips the DHCP
+# exchange. If a connect with the cached configuration fails, the cache is
+# dropped and the next attempt goes back to DHCP. A link that did come up on
+# the cached configuration is reconnected with DHCP after CACHE_RECHECK_MS,
+# so the lease is renewed and a changed network updates the cache.
+import os
+import time
+import urandom
+from runtime import sleep_ms
+
+# --- States ---
+DOWN = 0
+CONNECTING = 1
+UP = 2
+
+# --- Timing ---
+CONNECT_TIMEOUT_MS = 10000   # Give up on one attempt after this long
+CONNECT_POLL_MS = 100        # How often a pending attempt is checked
+LINK_CHECK_INTERVAL_MS = 1000
+RSSI_INTERVAL_MS = 10000
+BACKOFF_MIN_MS = 1000        # Wait before the first retry...
+BACKOFF_MAX_MS = 60000       # ...doubling up to this
+CACHE_RECHECK_MS = 120000    # Time on the cached configuration before confirming it with DHCP
+
+
+def backoff_ms(failures, low=BACKOFF_MIN_MS, high=BACKOFF_MAX_MS):
+    """Retry delay after `failures` failed attempts: a random point in the upper half of the doubled window."""
+    window = low << min(failures, 16)
+    if window > high:
+        window = high
+    half = window >> 1
+    return half + ((urandom.getrandbits(16) * half) >> 16)
+
+
+class WifiSupervisor:
+    """
+    Keeps wlan connected to ssid. on_up(supervisor) and on_down(supervisor) are
+    coroutine functions awaited when the link comes up or goes away. ip and rssi
+    hold the last known values ("N/A" while down).
+    """
+    def __init__(self, wlan, ssid, password, bssid=None, on_up=None, on_down=None, cache_path=None):
+        self.wlan = wlan
+        self.ssid = ssid
+        self.password = password
+        self.bssid = bssid
+        self.on_up = on_up
+        self.on_down = on_down
+        self.state = DOWN
+        self.ip = "N/A"
+        self.rssi = "N/A"
+        self.failures = 0   # Consecutive failed attempts; resets once connected
+        self.attempts = 0
+        self.drops = 0      # Links lost after being up
+        self.cache_path = cache_path
+        self.cached = self._load_cache() if cache_path else None
+        self.static = False # Current link uses the cached configuration
+        self.recheck = False # Next connect asks DHCP even though there is a cache
+
+    async def run(self):
+        self.wlan.active(True)
+        while True:
+            if await self._connect():
+                self.failures = 0
+                await self._link_up()
+                if await self._watch():
+                    self.drops += 1
+                await self._link_down()
+            else:
+                self.failures += 1
+                delay = backoff_ms(self.failures - 1)
+                print("WiFi attempt %d failed, retrying in %d ms" % (self.attempts, delay))
+                await sleep_ms(delay)
+
+    async def _connect(self):
+        wlan = self.wlan
+        self.state = CONNECTING
+        self.attempts += 1
+        self.static = False
+        if wlan.isconnected():
+            return True
+        if self.cached and not self.recheck:
+            try:
+                wlan.ifconfig(self.cached)
+                self.static = True
+            except (OSError, ValueError):
+                self._forget_cache()
+        try:
+            if self.bssid:
+                wlan.connect(self.ssid, self.password, bssid=self.bssid)
+            else:
+                wlan.connect(self.ssid, self.password)
+        except OSError as e:
+            print("WiFi connect failed: %s" % e)
+            self.state = DOWN
+            return False
+        start = time.ticks_ms()
+        while time.ticks_diff(time.ticks_ms(), start) < CONNECT_TIMEOUT_MS:
+            if wlan.isconnected():
+                return True
+            if wlan.status() < 0: # Wrong password, AP not found, ...: no point waiting
+                break
+            await sleep_ms(CONNECT_POLL_MS)
+        print("WiFi connection status:", wlan.status())
+        try:
+            wlan.disconnect()
+        except OSError:
+            pass
+        if self.static:
+            self._forget_cache() # Maybe the network changed; use DHCP from now on
+        self.state = DOWN
+        return False
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                config = tuple(f.read().split())
+        except OSError:
+            return None
+        return config if len(config) == 4 else None
+
+    def _save_cache(self, config):
+        if tuple(config) == self.cached:
+            return
+        try:
+            with open(self.cache_path, "w") as f:
+                f.write(" ".join(config))
+            self.cached = tuple(config)
+        except OSError as e:
+            print("Could not cache IP configuration: %s" % e)
+
+    def _use_dhcp(self):
+        self.static = False
+        try:
+            self.wlan.ifconfig('dhcp')
+        except (OSError, ValueError, TypeError):
+            pass # Older firmware: DHCP comes back on the next wlan.active(True)
+
+    def _forget_cache(self):
+        self.cached = None
+        self._use_dhcp()
+        try:
+            os.remove(self.cache_path)
+        except OSError:
+            pass
+
+    async def _watch(self):
+        """
+        Refreshes rssi while the link is up. Returns True once the link is lost,
+        False after disconnecting a cached-configuration link to re-check it with DHCP.
+        """
+        up_since = last_rssi = time.ticks_ms()
+        while True:
+            await sleep_ms(LINK_CHECK_INTERVAL_MS)
+            if not self.wlan.isconnected():
+                return True
+            if self.static and time.ticks_diff(time.ticks_ms(), up_since) >= CACHE_RECHECK_MS:
+                print("Re-checking the cached IP configuration with DHCP")
+                self.recheck = True
+                try:
+                    self.wlan.disconnect()
+                except OSError:
+                    pass
+                self._use_dhcp()
+                return False
+            if time.ticks_diff(time.ticks_ms(), last_rssi) >= RSSI_INTERVAL_MS:
+                last_rssi = time.ticks_ms()
+                self.rssi = self.wlan.status('rssi')
+
+    async def _link_up(self):
+        self.state = UP
+        self.recheck = False
+        config = self.wlan.ifconfig()
+        self.ip = config[0]
+        if self.cache_path and not self.static:
+            self._save_cache(config)
+        self.rssi = self.wlan.status('rssi')
+        if self.on_up:
+            await self.on_up(self)
+
+    async def _link_down(self):
+        self.state = DOWN
+        self.ip = "N/A"
+        self.rssi = "N/A"
+        if self.on_down:
+            await self.on_down(self)